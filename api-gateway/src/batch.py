@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple, Union
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.tokenizer import TokenCounter, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# generate_batch(model, prompts, max_tokens) -> {"results": [...]} or {"error": ...}
+BatchBackend = Callable[[str, List[str], int], Dict[str, Any]]
+
+
+def messages_to_prompt(messages: List[Dict[str, Any]]) -> str:
+    """Flatten chat messages into the prompt format the inference pool expects."""
+    return "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+
+
+def parse_batch_payload(payload: Union[str, bytes, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalize a JSONL body or ``{"requests": [...]}`` payload into batch items.
+
+    Each item may be a plain chat request or an OpenAI batch-style line
+    (``{"custom_id": ..., "body": {...}}``). Other top-level fields of a
+    dict payload (``model``, ``max_tokens``, ...) are defaults for every item.
+    """
+    defaults: Dict[str, Any] = {}
+    if isinstance(payload, (str, bytes)):
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        raw_items = [json.loads(line) for line in payload.splitlines() if line.strip()]
+    else:
+        raw_items = payload.get("requests") or []
+        defaults = {k: v for k, v in payload.items() if k not in ("requests", "stream")}
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        body = raw.get("body", raw)
+        items.append({
+            "index": index,
+            "custom_id": raw.get("custom_id", f"request-{index}"),
+            "request": {**defaults, **body},
+        })
+    return items
+
+
+class BatchJob:
+    """State of one submitted batch; results are published as they complete."""
+
+    def __init__(self, total: int):
+        self.id = f"batch-{uuid.uuid4().hex[:24]}"
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.created_at = int(time.time())
+        self.completed_at: Optional[int] = None
+        self.results: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    @property
+    def status(self) -> str:
+        return "completed" if self.completed_at is not None else "in_progress"
+
+    def publish(self, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.results.append(result)
+            self.completed += 1
+            if "error" in result:
+                self.failed += 1
+            if self.completed == self.total:
+                self.completed_at = int(time.time())
+            self._updated.notify_all()
+
+    def iter_results(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yield results in completion order until the batch is finished.
+
+        Every call replays the results stored so far, so a batch can be
+        streamed any number of times. ``timeout`` bounds each wait for the
+        next result and raises TimeoutError when it passes.
+        """
+        for index in range(self.total):
+            with self._updated:
+                if not self._updated.wait_for(lambda: len(self.results) > index, timeout):
+                    raise TimeoutError(f"No result from batch {self.id} within {timeout}s")
+                result = self.results[index]
+            yield result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "object": "batch",
+            "status": self.status,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "request_counts": {
+                "total": self.total,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+        }
+
+
+class BatchScheduler:
+    """Groups batch items by model and runs them through the pool's batching path.
+
+    Items sharing a model and ``max_tokens`` are packed into micro-batches of
+    up to ``max_batch_size`` prompts so each inference call amortizes one
+    forward pass across many requests. Finished jobs are kept for
+    ``retention`` seconds so their results can still be fetched.
+    """
+
+    def __init__(self, backend: BatchBackend, max_batch_size: Optional[int] = None,
+                 max_workers: Optional[int] = None, max_items: Optional[int] = None,
+                 token_counter: Optional[TokenCounter] = None, retention: Optional[float] = None):
+        self.backend = backend
+        self.token_counter = token_counter or get_token_counter()
+        self.max_batch_size = max_batch_size or int(os.getenv('BATCH_MAX_SIZE', 16))
+        self.max_items = max_items or int(os.getenv('BATCH_MAX_ITEMS', 50000))
+        self.retention = retention if retention is not None else float(os.getenv('BATCH_RETENTION_SECONDS', 3600))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('BATCH_WORKERS', 4)),
+            thread_name_prefix="batch"
+        )
+        self.jobs: Dict[str, BatchJob] = {}
+
+    def submit(self, items: List[Dict[str, Any]]) -> BatchJob:
+        if len(items) > self.max_items:
+            raise ValueError(f"Batch exceeds {self.max_items} requests")
+
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        invalid: List[Dict[str, Any]] = []
+        for item in items:
+            request = item["request"]
+            if not request.get("model") or not request.get("messages"):
+                invalid.append(self._error_result(item, "Missing required fields: model, messages"))
+                continue
+            max_tokens = request.get("max_tokens", 150)
+            if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0:
+                invalid.append(self._error_result(item, "max_tokens must be a positive integer"))
+                continue
+            groups.setdefault((request["model"], max_tokens), []).append(item)
+
+        self._evict_finished()
+        job = BatchJob(len(items))
+        self.jobs[job.id] = job
+        for result in invalid:
+            job.publish(result)
+
+        for (model, max_tokens), group in groups.items():
+            for start in range(0, len(group), self.max_batch_size):
+                chunk = group[start:start + self.max_batch_size]
+                self.executor.submit(self._run_chunk, job, model, max_tokens, chunk)
+
+        logger.info(f"Batch {job.id} scheduled: {len(items)} requests")
+        return job
+
+    def _evict_finished(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self.jobs.items()):
+            if job.completed_at is not None and job.completed_at < cutoff:
+                self.jobs.pop(job_id, None)
+
+    def _run_chunk(self, job: BatchJob, model: str, max_tokens: int,
+                   chunk: List[Dict[str, Any]]) -> None:
+        # Every item must be published exactly once, or readers of the job wait forever.
+        try:
+            results = self._complete_chunk(model, max_tokens, chunk)
+        except Exception as e:
+            logger.error(f"Error in batch chunk for {model}: {e}")
+            results = [self._error_result(item, str(e)) for item in chunk]
+        for result in results:
+            job.publish(result)
+
+    def _complete_chunk(self, model: str, max_tokens: int,
+                        chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        prompts = [messages_to_prompt(item["request"]["messages"]) for item in chunk]
+        try:
+            output = self.backend(model, prompts, max_tokens)
+        except Exception as e:
+            output = {"error": str(e)}
+
+        if "error" in output:
+            return [self._error_result(item, output["error"]) for item in chunk]
+        if len(output.get("results") or []) != len(chunk):
+            raise ValueError(f"Inference returned {len(output.get('results') or [])} results for {len(chunk)} prompts")
+
+        created = int(time.time())
+        prompt_counts = [self.token_counter.count_messages(model, item["request"]["messages"]) for item in chunk]
+        responses = []
+        for item, prompt_tokens, result in zip(chunk, prompt_counts, output["results"]):
+            completion_tokens = result["tokens_used"]
+            responses.append({
+                "index": item["index"],
+                "custom_id": item["custom_id"],
+                "response": {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": result["generated_text"]},
+                            "finish_reason": "stop"
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                }
+            })
+        return responses
+
+    @staticmethod
+    def _error_result(item: Dict[str, Any], message: str) -> Dict[str, Any]:
+        return {"index": item["index"], "custom_id": item["custom_id"], "error": message}
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
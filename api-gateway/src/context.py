@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.tokenizer import TOKENS_PER_MESSAGE, TokenCounter, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# Prompt budgets (tokens) per model; CONTEXT_BUDGET_DEFAULT covers the rest.
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-4": 8192,
+    "claude-v1": 9000,
+    "llama-2-70b": 4096,
+}
+
+
+def extractive_summary(messages: List[Dict[str, Any]], max_chars: int) -> str:
+    """First sentence of each dropped turn, oldest first, cut to ``max_chars``."""
+    parts = []
+    for message in messages:
+        content = str(message.get("content", "")).strip().replace("\n", " ")
+        first = content.split(". ")[0][:200]
+        if first:
+            parts.append(f"{message.get('role', 'user')}: {first}")
+    summary = " | ".join(parts)
+    return summary if len(summary) <= max_chars else summary[:max(max_chars - 3, 0)] + "..."
+
+
+class ContextCompressor:
+    """Fits chat history into a per-model prompt budget before inference.
+
+    Leading system messages and the newest turns are always kept; older
+    turns are dropped oldest-first until the prompt fits the model's budget
+    minus the requested ``max_tokens``. With ``summarize`` the dropped turns
+    are replaced by one short system message. Counts come from the shared
+    ``TokenCounter``, whose per-message cache means an ever-growing
+    conversation is only tokenized once per new message.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        default_budget: Optional[int] = None,
+        summarize: bool = True,
+        summary_max_tokens: int = 256,
+        min_recent_messages: int = 2,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        self.budgets = dict(MODEL_CONTEXT_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget or int(os.getenv('CONTEXT_BUDGET_DEFAULT', 4096))
+        self.summarize = summarize
+        self.summary_max_tokens = summary_max_tokens
+        self.min_recent_messages = min_recent_messages
+        self.token_counter = token_counter or get_token_counter()
+        self.tokens_saved = 0
+        self.requests_compressed = 0
+        self._lock = threading.Lock()
+
+    def budget_for(self, model: str, max_tokens: int = 0) -> int:
+        return max(self.budgets.get(model, self.default_budget) - max_tokens, 0)
+
+    def compress(self, model: str, messages: List[Dict[str, Any]],
+                 max_tokens: int = 0) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Return the messages to send and ``{"original_tokens", "prompt_tokens", "tokens_saved", ...}``."""
+        counts = self.token_counter.count_message_tokens(model, messages)
+        original = sum(counts)
+        budget = self.budget_for(model, max_tokens)
+        stats = {"original_tokens": original, "prompt_tokens": original, "tokens_saved": 0, "dropped_messages": 0}
+        if original <= budget:
+            return messages, stats
+
+        head = 0
+        while head < len(messages) and messages[head].get("role") == "system":
+            head += 1
+        pinned = sum(counts[:head])
+        recent_floor = max(len(messages) - self.min_recent_messages, head)
+
+        # Walk back from the newest turn, keeping turns while they fit.
+        summary_reserve = (self.summary_max_tokens + TOKENS_PER_MESSAGE) if self.summarize else 0
+        used = pinned
+        start = len(messages)
+        while start > head:
+            cost = counts[start - 1]
+            if start - 1 < recent_floor and used + cost + summary_reserve > budget:
+                break
+            used += cost
+            start -= 1
+
+        dropped = messages[head:start]
+        if not dropped:
+            return messages, stats
+
+        kept = list(messages[:head])
+        if self.summarize:
+            summary = self._summary_message(model, dropped)
+            kept.append(summary)
+            used += self.token_counter.count_message_tokens(model, [summary])[0]
+        kept.extend(messages[start:])
+
+        saved = max(original - used, 0)
+        stats.update(prompt_tokens=used, tokens_saved=saved, dropped_messages=len(dropped))
+        with self._lock:
+            self.tokens_saved += saved
+            self.requests_compressed += 1
+        logger.debug("Compressed %s context: %d -> %d tokens", model, original, used)
+        return kept, stats
+
+    def _summary_message(self, model: str, dropped: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Extractive summary of ``dropped`` cut down to ``summary_max_tokens``."""
+        max_chars = self.summary_max_tokens * 4
+        while True:
+            content = "Summary of earlier conversation: " + extractive_summary(dropped, max_chars)
+            tokens = self.token_counter.count(model, content)
+            if tokens <= self.summary_max_tokens or max_chars <= 0:
+                return {"role": "system", "content": content}
+            max_chars = min(max_chars - 1, max_chars * self.summary_max_tokens // tokens)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests_compressed": self.requests_compressed,
+            "tokens_saved": self.tokens_saved,
+        }
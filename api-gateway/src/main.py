@@ -5,7 +5,16 @@ import sys
 import json
 import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+
+from batch import BatchScheduler, messages_to_prompt, parse_batch_payload
+from context import ContextCompressor
+from router import ReplicaRouter, affinity_key
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.tokenizer import get_token_counter
+from common.tracing import Tracer, extract, inject
 
 # Configure logging
 logging.basicConfig(
@@ -17,9 +26,34 @@ logger = logging.getLogger(__name__)
 class APIGateway:
     """Simple API Gateway implementation for testing purposes."""
     
-    def __init__(self):
+    def __init__(self, inference_pool: Optional[Any] = None,
+                 context_compressor: Optional[ContextCompressor] = None,
+                 replicas: Optional[List[Any]] = None,
+                 routing_policy: Optional[str] = None,
+                 tracer: Optional[Tracer] = None,
+                 monitoring: Optional[Any] = None):
         self.port = int(os.getenv('API_GATEWAY_PORT', 8080))
         self.health_status = "healthy"
+        self.inference_pool = inference_pool
+        if replicas is None and inference_pool is not None:
+            replicas = [inference_pool]
+        self.router = ReplicaRouter(replicas, policy=routing_policy) if replicas else None
+        # When set, every router refresh reports inference-pool replicas and queue depth for autoscaling
+        self.monitoring = monitoring
+        if self.router is not None:
+            if monitoring is not None:
+                self.router.listeners.append(self._report_load)
+                self._report_load(self.router.replicas)
+            self.router.start()
+        self.token_counter = get_token_counter()
+        # Loading can download vocabularies, so offline deployments keep it lazy
+        if os.getenv('TOKENIZER_PRELOAD', 'false').lower() == 'true':
+            self.token_counter.preload()
+        self.batch_scheduler = BatchScheduler(self._generate_batch, token_counter=self.token_counter)
+        if context_compressor is None and os.getenv('CONTEXT_COMPRESSION', 'false').lower() == 'true':
+            context_compressor = ContextCompressor()
+        self.context_compressor = context_compressor
+        self.tracer = tracer or Tracer("api-gateway")
         
     def health_check(self) -> Dict[str, Any]:
         """Health check endpoint."""
@@ -30,15 +64,81 @@ class APIGateway:
             "version": "1.0.0"
         }
     
-    def chat_completions(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Mock chat completions endpoint."""
+    def chat_completions(self, request_data: Dict[str, Any],
+                         headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Mock chat completions endpoint; ``headers`` may carry trace context."""
+        with self.tracer.span("gateway.chat_completions", extract(headers),
+                              model=request_data.get("model")) as span:
+            response = self._chat_completions(request_data, headers or {})
+            if "error" in response:
+                span.set_error(response["error"])
+            return response
+
+    def chat_completions_http(self, body: Union[str, bytes],
+                              headers: Optional[Dict[str, str]] = None) -> Tuple[bytes, Dict[str, str]]:
+        """HTTP form of chat_completions: JSON body in, JSON body and response headers out.
+
+        The response headers carry ``traceparent`` so a caller can look the
+        request up in the trace collector.
+        """
+        headers = headers or {}
+        with self.tracer.span("gateway.chat_completions", extract(headers)) as span:
+            try:
+                request_data = json.loads(body)
+            except ValueError as e:
+                response = {"error": f"Invalid JSON body: {e}"}
+            else:
+                if not isinstance(request_data, dict):
+                    response = {"error": "Request body must be a JSON object"}
+                else:
+                    span.set_attribute("model", request_data.get("model"))
+                    response = self._chat_completions(request_data, headers)
+            if "error" in response:
+                span.set_error(response["error"])
+            with self.tracer.span("serialization"):
+                payload = json.dumps(response).encode("utf-8")
+            return payload, inject({"Content-Type": "application/json"}, span)
+
+    def _chat_completions(self, request_data: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        received = time.monotonic()
         try:
             # Validate request
             if not request_data.get("model") or not request_data.get("messages"):
                 return {"error": "Missing required fields: model, messages"}
-            
-            # Mock response
-            return {
+
+            model = request_data["model"]
+            messages = request_data["messages"]
+            context_stats = None
+            if self.context_compressor is not None:
+                messages, context_stats = self.context_compressor.compress(
+                    model, messages, request_data.get("max_tokens") or 0
+                )
+
+            prompt_tokens = self.token_counter.count_messages(model, messages)
+            if self.router is not None:
+                max_tokens = request_data.get("max_tokens") or 150
+                timeout = self._client_timeout(request_data, headers)
+                if timeout is not None:
+                    timeout = max(timeout - (time.monotonic() - received), 0.0)
+                with self.tracer.span("inference", model=model):
+                    result = self.router.call(
+                        model,
+                        lambda pool: pool.generate_text(
+                            model, messages_to_prompt(messages), max_tokens,
+                            tenant=request_data.get("user") or "default", timeout=timeout,
+                            metadata=inject({})
+                        ),
+                        key=affinity_key(model, messages),
+                    )
+                if "error" in result:
+                    return {"error": result["error"]}
+                content = result["generated_text"]
+                completion_tokens = result["tokens_used"]
+            else:
+                # Mock response
+                content = "This is a mock response from HelixFlow API Gateway."
+                completion_tokens = self.token_counter.count(model, content)
+            response = {
                 "id": f"chatcmpl-{int(time.time())}",
                 "object": "chat.completion",
                 "created": int(time.time()),
@@ -48,21 +148,77 @@ class APIGateway:
                         "index": 0,
                         "message": {
                             "role": "assistant",
-                            "content": "This is a mock response from HelixFlow API Gateway."
+                            "content": content
                         },
                         "finish_reason": "stop"
                     }
                 ],
                 "usage": {
-                    "prompt_tokens": 10,
-                    "completion_tokens": 15,
-                    "total_tokens": 25
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
                 }
             }
+            if context_stats is not None:
+                response["usage"]["prompt_tokens_saved"] = context_stats["tokens_saved"]
+            return response
         except Exception as e:
             logger.error(f"Error in chat_completions: {e}")
             return {"error": str(e)}
     
+    def _report_load(self, replicas: List[Any]) -> None:
+        """Feed the live replica count and total queue depth to the autoscaler."""
+        self.monitoring.record_replicas("inference-pool", sum(1 for r in replicas if r.healthy))
+        self.monitoring.record_queue_depth("inference-pool", sum(r.queue_depth for r in replicas))
+
+    @staticmethod
+    def _client_timeout(request_data: Dict[str, Any], headers: Dict[str, str]) -> Optional[float]:
+        """Seconds the client will wait: the body's "timeout" or an X-Request-Timeout header."""
+        value = request_data.get("timeout")
+        if value is None:
+            value = next((v for k, v in headers.items() if k.lower() == "x-request-timeout"), None)
+        return float(value) if value is not None else None
+
+    def chat_completions_batch(self, payload: Union[str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
+        """Submit a batch of chat completions (JSONL body or {"requests": [...]})."""
+        try:
+            items = parse_batch_payload(payload)
+            if not items:
+                return {"error": "Batch contains no requests"}
+            return self.batch_scheduler.submit(items).to_dict()
+        except (ValueError, AttributeError) as e:
+            return {"error": f"Invalid batch payload: {e}"}
+        except Exception as e:
+            logger.error(f"Error in chat_completions_batch: {e}")
+            return {"error": str(e)}
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Batch status; completed results are included once the batch is done."""
+        job = self.batch_scheduler.jobs.get(batch_id)
+        if job is None:
+            return {"error": f"Batch {batch_id} not found"}
+        status = job.to_dict()
+        if job.status == "completed":
+            status["results"] = sorted(job.results, key=lambda r: r["index"])
+        return status
+
+    def stream_batch_results(self, batch_id: str) -> Iterator[str]:
+        """JSONL lines for each batch result, in completion order."""
+        job = self.batch_scheduler.jobs.get(batch_id)
+        if job is None:
+            yield json.dumps({"error": f"Batch {batch_id} not found"}) + "\n"
+            return
+        for result in job.iter_results():
+            yield json.dumps(result) + "\n"
+
+    def _generate_batch(self, model: str, prompts: list, max_tokens: int) -> Dict[str, Any]:
+        """Run one micro-batch on the inference pool (mock output when none is attached)."""
+        if self.router is not None:
+            return self.router.call(model, lambda pool: pool.generate_batch(model, prompts, max_tokens))
+        text = "This is a mock response from HelixFlow API Gateway."
+        tokens = self.token_counter.count(model, text)
+        return {"results": [{"generated_text": text, "tokens_used": tokens} for _ in prompts]}
+
     def list_models(self) -> Dict[str, Any]:
         """List available models."""
         return {
@@ -83,6 +239,12 @@ class APIGateway:
             ]
         }
 
+    def shutdown(self) -> None:
+        """Stop the replica refresher and the batch workers."""
+        if self.router is not None:
+            self.router.stop()
+        self.batch_scheduler.shutdown()
+
 def main():
     """Main function for testing."""
     gateway = APIGateway()
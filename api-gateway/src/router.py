@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import time
+import random
+import hashlib
+import logging
+import itertools
+import threading
+from typing import Dict, Any, List, Optional, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICIES = ("p2c", "least_outstanding", "round_robin", "affinity")
+
+
+def affinity_key(model: str, messages: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Routing key for cache affinity: the model plus a hash of its system prompt(s)."""
+    system = "\x00".join(
+        str(m.get("content", "")) for m in messages or [] if m.get("role") == "system"
+    )
+    return f"{model}:{hashlib.sha1(system.encode('utf-8')).hexdigest()}"
+
+
+def _rendezvous_score(key: str, name: str) -> int:
+    digest = hashlib.blake2b(f"{key}\x00{name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class Replica:
+    """Gateway-side view of one inference-pool replica."""
+
+    def __init__(self, name: str, client: Any):
+        self.name = name
+        self.client = client
+        self.outstanding = 0
+        self.reported_in_flight = 0
+        self.queue_depth = 0
+        self.models: Optional[Set[str]] = None  # None until the replica reports its models
+        self.healthy = True
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.last_refresh: Optional[float] = None
+
+    @property
+    def load(self) -> int:
+        """Outstanding work: our own in-flight requests or the replica's report, plus its queue."""
+        return max(self.outstanding, self.reported_in_flight) + self.queue_depth
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def record(self, latency: float, ok: bool, alpha: float = 0.2) -> None:
+        self.requests += 1
+        if ok:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += alpha * (latency - self.latency_ewma)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "reported_in_flight": self.reported_in_flight,
+            "queue_depth": self.queue_depth,
+            "models": sorted(self.models) if self.models is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ewma": self.latency_ewma,
+        }
+
+
+class ReplicaRouter:
+    """Routes inference calls across replicas by live load, with model affinity.
+
+    Replicas that have the requested model loaded are preferred; among
+    them ``p2c`` samples two at random and takes the less loaded one,
+    ``least_outstanding`` scans for the minimum and ``round_robin`` is
+    kept for comparison. ``affinity`` uses rendezvous hashing on the
+    request's ``affinity_key`` so requests sharing a model and system
+    prompt land on the replica whose caches are warm for that prefix; a
+    replica above ``load_factor`` times the mean load is skipped for the
+    next one in the key's ranking, and adding or removing a replica only
+    remaps the keys that ranked it first.
+
+    Load is the gateway's own outstanding count for the replica,
+    corrected by the in-flight and queue depth the replica reports from
+    ``health_check``. ``refresh`` polls those, and the loaded models from
+    ``list_models``; ``start`` refreshes periodically and each refresh is
+    passed to ``listeners`` (e.g. to report load for autoscaling).
+
+    A replica whose last ``max_failures`` calls failed is marked unhealthy
+    until a refresh reports it healthy again. Only transport and server
+    errors count: admission rejections and invalid requests do not.
+    """
+
+    def __init__(self, replicas: List[Any], policy: Optional[str] = None,
+                 refresh_interval: Optional[float] = None, load_factor: float = 1.25,
+                 max_failures: int = 3):
+        policy = policy or os.getenv('ROUTING_POLICY', 'p2c')
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        self.policy = policy
+        self.load_factor = load_factor
+        self.max_failures = max_failures
+        self.refresh_interval = refresh_interval or float(os.getenv('ROUTER_REFRESH_INTERVAL', 1.0))
+        self.replicas = [
+            r if isinstance(r, Replica) else Replica(f"replica-{i}", r)
+            for i, r in enumerate(replicas)
+        ]
+        self._names = itertools.count(len(self.replicas))
+        self.listeners: List[Callable[[List[Replica]], None]] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    def add_replica(self, client: Any, name: Optional[str] = None) -> Replica:
+        replica = client if isinstance(client, Replica) else Replica(name or f"replica-{next(self._names)}", client)
+        self._refresh_replica(replica)
+        with self._lock:
+            self.replicas = self.replicas + [replica]
+        return replica
+
+    def remove_replica(self, name: str) -> None:
+        with self._lock:
+            self.replicas = [r for r in self.replicas if r.name != name]
+
+    def refresh(self) -> None:
+        """Poll every replica's health and loaded models."""
+        replicas = self.replicas
+        for replica in replicas:
+            self._refresh_replica(replica)
+        for listener in self.listeners:
+            try:
+                listener(replicas)
+            except Exception as e:
+                logger.error(f"Error in replica refresh listener: {e}")
+
+    def _refresh_replica(self, replica: Replica) -> None:
+        health = getattr(replica.client, "health_check", None)
+        if health is None:
+            return
+        try:
+            status = health()
+            replica.healthy = status.get("status") == "healthy"
+            if replica.healthy:
+                replica.consecutive_failures = 0
+            replica.reported_in_flight = int(status.get("in_flight", 0))
+            replica.queue_depth = int(status.get("queue_depth", 0))
+            list_models = getattr(replica.client, "list_models", None)
+            if list_models is not None:
+                replica.models = {m["id"] for m in list_models().get("models", []) if m.get("loaded")}
+        except Exception as e:
+            logger.error(f"Error refreshing replica {replica.name}: {e}")
+            replica.healthy = False
+        replica.last_refresh = time.time()
+
+    def start(self) -> None:
+        """Refresh replica state in the background every ``refresh_interval`` seconds."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, name="replica-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def choose(self, model: str, key: Optional[str] = None) -> Replica:
+        """Pick the replica for a request to ``model``; ``key`` drives ``affinity`` routing."""
+        healthy = [r for r in self.replicas if r.healthy] or self.replicas
+        candidates = [r for r in healthy if r.serves(model)] or healthy
+
+        with self._lock:
+            if self.policy == "round_robin" or len(candidates) == 1:
+                replica = candidates[self._next % len(candidates)]
+                self._next += 1
+            elif self.policy == "affinity":
+                replica = self._bounded_rendezvous(candidates, key or affinity_key(model))
+            elif self.policy == "least_outstanding":
+                replica = min(candidates, key=self._rank)
+            else:
+                replica = min(random.sample(candidates, 2), key=self._rank)
+            replica.outstanding += 1
+        return replica
+
+    def _bounded_rendezvous(self, candidates: List[Replica], key: str) -> Replica:
+        """Highest-scoring replica for ``key`` whose load stays under the bound."""
+        total = sum(r.load for r in candidates) + 1
+        bound = math.ceil(self.load_factor * total / len(candidates))
+        ranked = sorted(candidates, key=lambda r: _rendezvous_score(key, r.name), reverse=True)
+        for replica in ranked:
+            if replica.load < bound:
+                return replica
+        return ranked[0]
+
+    @staticmethod
+    def _rank(replica: Replica) -> tuple:
+        return (replica.load, replica.latency_ewma or 0.0)
+
+    def release(self, replica: Replica, latency: float, ok: bool) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+            replica.record(latency, ok)
+            if replica.consecutive_failures >= self.max_failures and replica.healthy:
+                logger.warning(f"Replica {replica.name} failed {replica.consecutive_failures} calls in a row")
+                replica.healthy = False
+
+    def call(self, model: str, fn: Callable[[Any], Dict[str, Any]],
+             key: Optional[str] = None) -> Dict[str, Any]:
+        """Run ``fn(client)`` on the chosen replica; exceptions and server errors count as failures."""
+        replica = self.choose(model, key)
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = fn(replica.client)
+            ok = not self._is_failure(result)
+            return result
+        finally:
+            self.release(replica, time.perf_counter() - started, ok)
+
+    @staticmethod
+    def _is_failure(result: Dict[str, Any]) -> bool:
+        """An error the replica is to blame for, not a rejection or a bad request."""
+        return "error" in result and not result.get("rejected") and not result.get("invalid_request")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"policy": self.policy, "replicas": [r.to_dict() for r in self.replicas]}
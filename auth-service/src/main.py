@@ -8,12 +8,16 @@ import logging
 import hashlib
 from typing import Dict, Any, Optional
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.log import configure_logging, get_logger
+from common.tracing import Tracer, extract
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+# Logins are an audit trail, so they are rate limited but not sampled
+events = get_logger(__name__)
 
 class AuthService:
     """Simple Auth Service implementation for testing purposes."""
@@ -22,6 +26,7 @@ class AuthService:
         self.port = int(os.getenv('AUTH_SERVICE_PORT', 8081))
         self.health_status = "healthy"
         self.users = {}  # Simple in-memory user store for testing
+        self.tracer = Tracer("auth-service")
         
     def health_check(self) -> Dict[str, Any]:
         """Health check endpoint."""
@@ -58,8 +63,16 @@ class AuthService:
             logger.error(f"Error registering user: {e}")
             return {"error": str(e)}
     
-    def login_user(self, username: str, password: str) -> Dict[str, Any]:
+    def login_user(self, username: str, password: str,
+                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """Login a user."""
+        with self.tracer.span("auth.login", extract(headers)) as span:
+            result = self._login_user(username, password)
+            if "error" in result:
+                span.set_error(result["error"])
+            return result
+
+    def _login_user(self, username: str, password: str) -> Dict[str, Any]:
         try:
             if username not in self.users:
                 return {"error": "Invalid credentials"}
@@ -73,7 +86,7 @@ class AuthService:
             # Generate simple token (not for production)
             token = hashlib.sha256(f"{username}{time.time()}".encode()).hexdigest()
             
-            logger.info(f"User logged in: {username}")
+            events.info("user_logged_in", username=username)
             return {
                 "access_token": token,
                 "token_type": "bearer",
@@ -0,0 +1,41 @@
+"""
+HelixFlow shared Python modules
+
+Code reused by the Python services (api-gateway, auth-service,
+inference-pool, monitoring). Services put the repository root on
+``sys.path`` and import from here.
+"""
+
+from .database import (
+    DatabasePools,
+    PoolStats,
+    PostgresPool,
+    RedisPool,
+    SQLitePool,
+    get_pools,
+)
+from .log import EventLogger, configure_logging, get_logger
+from .metrics import Histogram
+from .query import QueryRunner, QueryStats
+from .tokenizer import TokenCounter, get_token_counter
+from .tracing import Span, SpanContext, Tracer
+
+__all__ = [
+    "DatabasePools",
+    "EventLogger",
+    "Histogram",
+    "PoolStats",
+    "PostgresPool",
+    "QueryRunner",
+    "QueryStats",
+    "RedisPool",
+    "SQLitePool",
+    "Span",
+    "SpanContext",
+    "TokenCounter",
+    "Tracer",
+    "configure_logging",
+    "get_logger",
+    "get_pools",
+    "get_token_counter",
+]
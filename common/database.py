@@ -0,0 +1,520 @@
+"""
+HelixFlow shared connection pools
+
+Python counterpart of ``internal/database``: one asyncpg pool for
+PostgreSQL, a WAL-mode SQLite pool for ``data/helixflow.db`` and a Redis
+pool. Every pool health-checks idle connections before handing them out
+and keeps saturation statistics so callers can see when a pool is the
+bottleneck.
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from urllib.parse import quote
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - optional in development
+    asyncpg = None
+
+try:
+    import aioredis
+except ImportError:  # pragma: no cover - optional in development
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+def _get_env(key: str, default: str) -> str:
+    return os.getenv(key) or default
+
+
+def _get_env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, default))
+    except ValueError:
+        return default
+
+
+class PoolStats:
+    """Saturation counters for a single pool."""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connections_discarded = 0
+        self.health_check_failures = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of the pool currently checked out."""
+        if self.max_size <= 0:
+            return 0.0
+        return self.in_use / self.max_size
+
+    def record_acquire(self, wait_time: float) -> None:
+        self.acquisitions += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def record_release(self) -> None:
+        if self.in_use > 0:
+            self.in_use -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        average_wait = 0.0
+        if self.acquisitions:
+            average_wait = self.total_wait_time / self.acquisitions
+        return {
+            "pool": self.name,
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "waiting": self.waiting,
+            "saturation": round(self.saturation, 4),
+            "acquisitions": self.acquisitions,
+            "timeouts": self.timeouts,
+            "connections_opened": self.connections_opened,
+            "connections_discarded": self.connections_discarded,
+            "health_check_failures": self.health_check_failures,
+            "average_wait_time": round(average_wait, 6),
+            "max_wait_time": round(self.max_wait_time, 6),
+        }
+
+
+class _HealthCheckedPool(abc.ABC):
+    """Shared acquire/release bookkeeping for the concrete pools.
+
+    Subclasses implement ``_open``, ``_close``, ``_checkout``, ``_checkin``,
+    ``_ping`` and ``_discard``; this class adds timeouts, saturation stats
+    and health checks of connections that have been idle for longer than
+    ``health_check_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        acquire_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.stats = PoolStats(name, max_size)
+        self._last_used: Dict[int, float] = {}
+        self._started = False
+
+    async def start(self) -> None:
+        if not self._started:
+            await self._open()
+            self._started = True
+            logger.info("Connection pool started: %s (max_size=%d)", self.name, self.max_size)
+
+    async def close(self) -> None:
+        if self._started:
+            await self._close()
+            self._started = False
+            self._last_used.clear()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Check a healthy connection out of the pool for the duration of the block."""
+        if not self._started:
+            await self.start()
+
+        started = time.monotonic()
+        self.stats.waiting += 1
+        try:
+            conn = await asyncio.wait_for(self._checkout_healthy(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+
+        self.stats.record_acquire(time.monotonic() - started)
+        try:
+            yield conn
+        finally:
+            self.stats.record_release()
+            self._last_used[self.connection_key(conn)] = time.monotonic()
+            await self._checkin(conn)
+
+    async def _checkout_healthy(self) -> Any:
+        while True:
+            conn = await self._checkout()
+            key = self.connection_key(conn)
+            last_used = self._last_used.get(key)
+            if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+                return conn
+            try:
+                await self._ping(conn)
+                return conn
+            except Exception as e:
+                self.stats.health_check_failures += 1
+                self.stats.connections_discarded += 1
+                self._last_used.pop(key, None)
+                logger.warning("Discarding unhealthy %s connection: %s", self.name, e)
+                await self._discard(conn)
+
+    def connection_key(self, conn: Any) -> int:
+        """Stable identity of a pooled connection across acquires."""
+        return id(conn)
+
+    @abc.abstractmethod
+    async def _open(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _close(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _checkout(self) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def _checkin(self, conn: Any) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _ping(self, conn: Any) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _discard(self, conn: Any) -> None:
+        ...
+
+
+class PostgresPool(_HealthCheckedPool):
+    """asyncpg connection pool configured from the same ``DB_*`` variables as the Go services."""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = 5,
+        max_size: int = 25,
+        max_inactive_connection_lifetime: float = 300.0,
+        statement_cache_size: int = 100,
+        **kwargs: Any,
+    ):
+        super().__init__("postgres", max_size, **kwargs)
+        self.dsn = dsn or self.dsn_from_env()
+        self.min_size = min_size
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self.statement_cache_size = statement_cache_size
+        self._pool = None
+
+    @staticmethod
+    def dsn_from_env() -> str:
+        # Credentials may contain URL delimiters such as "@", "/" or ":".
+        return "postgresql://{user}:{password}@{host}:{port}/{name}?sslmode={sslmode}".format(
+            user=quote(_get_env("DB_USER", "helixflow"), safe=""),
+            password=quote(_get_env("DB_PASSWORD", "helixflow123"), safe=""),
+            host=_get_env("DB_HOST", "localhost"),
+            port=_get_env_int("DB_PORT", 5432),
+            name=quote(_get_env("DB_NAME", "helixflow"), safe=""),
+            sslmode=_get_env("DB_SSL_MODE", "require"),
+        )
+
+    async def _init_connection(self, conn: Any) -> None:
+        self.stats.connections_opened += 1
+
+    async def _open(self) -> None:
+        if asyncpg is None:
+            raise RuntimeError("asyncpg is required for the PostgreSQL pool")
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+            statement_cache_size=self.statement_cache_size,
+            init=self._init_connection,
+        )
+
+    async def _close(self) -> None:
+        await self._pool.close()
+        self._pool = None
+
+    def connection_key(self, conn: Any) -> int:
+        # Pool proxies are recreated on every acquire; the backend pid is stable.
+        return conn.get_server_pid()
+
+    async def _checkout(self) -> Any:
+        return await self._pool.acquire()
+
+    async def _checkin(self, conn: Any) -> None:
+        await self._pool.release(conn)
+
+    async def _ping(self, conn: Any) -> None:
+        await conn.execute("SELECT 1")
+
+    async def _discard(self, conn: Any) -> None:
+        conn.terminate()
+        await self._pool.release(conn)
+
+
+class SQLiteConnection:
+    """Async facade over a ``sqlite3`` connection.
+
+    Mirrors the asyncpg ``execute``/``fetch``/``fetchrow``/``fetchval``
+    methods so data-access code can target either backend. Statements run
+    on a worker thread; the pool guarantees one task per connection.
+    """
+
+    def __init__(self, raw: sqlite3.Connection):
+        self.raw = raw
+
+    async def execute(self, query: str, *args: Any) -> str:
+        cursor = await asyncio.to_thread(self.raw.execute, query, args)
+        return f"ROWS {cursor.rowcount}"
+
+    async def executemany(self, query: str, args: Sequence[Sequence[Any]]) -> None:
+        await asyncio.to_thread(self._run_many, query, args)
+
+    async def fetch(self, query: str, *args: Any) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self._fetch, query, args)
+
+    async def fetchrow(self, query: str, *args: Any) -> Optional[sqlite3.Row]:
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0) -> Any:
+        row = await self.fetchrow(query, *args)
+        return row[column] if row is not None else None
+
+    def _run_many(self, query: str, args: Sequence[Sequence[Any]]) -> None:
+        # Connections are in autocommit mode; batch the rows into one transaction.
+        self.raw.execute("BEGIN")
+        try:
+            self.raw.executemany(query, args)
+        except Exception:
+            self.raw.execute("ROLLBACK")
+            raise
+        self.raw.execute("COMMIT")
+
+    def _fetch(self, query: str, args: Sequence[Any]) -> List[sqlite3.Row]:
+        return self.raw.execute(query, args).fetchall()
+
+
+class SQLitePool(_HealthCheckedPool):
+    """Pool of WAL-mode SQLite connections.
+
+    WAL lets readers proceed while a writer holds the database, so several
+    pooled connections are useful even though SQLite has a single writer.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_size: int = 5,
+        busy_timeout: float = 5.0,
+        statement_cache_size: int = 128,
+        **kwargs: Any,
+    ):
+        super().__init__("sqlite", max_size, **kwargs)
+        self.db_path = db_path or _get_env("DB_PATH", "./data/helixflow.db")
+        self.busy_timeout = busy_timeout
+        self.statement_cache_size = statement_cache_size
+        self._idle: Optional[asyncio.LifoQueue] = None
+        self._all: List[SQLiteConnection] = []
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _connect(self) -> SQLiteConnection:
+        raw = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=self.statement_cache_size,
+        )
+        raw.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            raw.execute(pragma)
+        self.stats.connections_opened += 1
+        return SQLiteConnection(raw)
+
+    async def _open(self) -> None:
+        directory = os.path.dirname(self.db_path)
+        if directory and self.db_path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        # LIFO keeps the most recently used (warm, healthy) connections in rotation.
+        self._idle = asyncio.LifoQueue()
+        self._lock = asyncio.Lock()
+
+    async def _close(self) -> None:
+        for conn in self._all:
+            conn.raw.close()
+        self._all.clear()
+        self._idle = None
+
+    async def _checkout(self) -> SQLiteConnection:
+        if self._idle.empty():
+            async with self._lock:
+                if len(self._all) < self.max_size:
+                    conn = await asyncio.to_thread(self._connect)
+                    self._all.append(conn)
+                    return conn
+        return await self._idle.get()
+
+    async def _checkin(self, conn: SQLiteConnection) -> None:
+        if conn.raw.in_transaction:
+            conn.raw.execute("ROLLBACK")
+        self._idle.put_nowait(conn)
+
+    async def _ping(self, conn: SQLiteConnection) -> None:
+        await conn.fetchval("SELECT 1")
+
+    async def _discard(self, conn: SQLiteConnection) -> None:
+        try:
+            conn.raw.close()
+        finally:
+            self._all.remove(conn)
+
+
+class RedisPool(_HealthCheckedPool):
+    """aioredis connection pool.
+
+    aioredis checks a socket out per command, so ``acquire`` hands back a
+    client bound to the shared pool and the stats report the pool's own
+    in-use socket count.
+    """
+
+    def __init__(self, url: Optional[str] = None, max_size: int = 50, **kwargs: Any):
+        super().__init__("redis", max_size, **kwargs)
+        self.url = url or self.url_from_env()
+        self._pool = None
+        self._client = None
+
+    @staticmethod
+    def url_from_env() -> str:
+        password = os.getenv("REDIS_PASSWORD", "")
+        auth = f":{quote(password, safe='')}@" if password else ""
+        return "redis://{auth}{host}:{port}/{db}".format(
+            auth=auth,
+            host=_get_env("REDIS_HOST", "localhost"),
+            port=_get_env_int("REDIS_PORT", 6379),
+            db=_get_env_int("REDIS_DB", 0),
+        )
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    async def _open(self) -> None:
+        if aioredis is None:
+            raise RuntimeError("aioredis is required for the Redis pool")
+        self._pool = aioredis.ConnectionPool.from_url(
+            self.url, max_connections=self.max_size, health_check_interval=int(self.health_check_interval)
+        )
+        self._client = aioredis.Redis(connection_pool=self._pool)
+
+    async def _close(self) -> None:
+        await self._pool.disconnect()
+        self._pool = None
+        self._client = None
+
+    async def _checkout(self) -> Any:
+        return self._client
+
+    async def _checkin(self, conn: Any) -> None:
+        return None
+
+    async def _ping(self, conn: Any) -> None:
+        await conn.ping()
+
+    async def _discard(self, conn: Any) -> None:
+        await self._pool.disconnect(inuse_connections=False)
+
+    def socket_stats(self) -> Dict[str, int]:
+        if self._pool is None:
+            return {"in_use": 0, "available": 0}
+        return {
+            "in_use": len(getattr(self._pool, "_in_use_connections", ())),
+            "available": len(getattr(self._pool, "_available_connections", ())),
+        }
+
+
+class DatabasePools:
+    """The pools a service needs, selected the same way as ``internal/database``.
+
+    ``DATABASE_TYPE`` picks PostgreSQL or SQLite (the default, for
+    development); Redis is only opened when ``REDIS_HOST`` is set or a URL
+    is passed explicitly.
+    """
+
+    def __init__(
+        self,
+        database_type: Optional[str] = None,
+        sqlite_path: Optional[str] = None,
+        postgres_dsn: Optional[str] = None,
+        redis_url: Optional[str] = None,
+    ):
+        self.database_type = database_type or _get_env("DATABASE_TYPE", "sqlite")
+        if self.database_type == "postgres":
+            self.database: _HealthCheckedPool = PostgresPool(
+                dsn=postgres_dsn,
+                max_size=_get_env_int("DB_POOL_MAX_SIZE", 25),
+                min_size=_get_env_int("DB_POOL_MIN_SIZE", 5),
+            )
+        else:
+            self.database = SQLitePool(
+                db_path=sqlite_path,
+                max_size=_get_env_int("DB_POOL_MAX_SIZE", 5),
+            )
+
+        self.redis: Optional[RedisPool] = None
+        if redis_url or os.getenv("REDIS_HOST"):
+            self.redis = RedisPool(url=redis_url, max_size=_get_env_int("REDIS_POOL_MAX_SIZE", 50))
+
+    async def start(self) -> None:
+        await self.database.start()
+        if self.redis is not None:
+            await self.redis.start()
+
+    async def close(self) -> None:
+        await self.database.close()
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> Dict[str, Any]:
+        pools = {"database": self.database.stats.snapshot()}
+        if self.redis is not None:
+            pools["redis"] = {**self.redis.stats.snapshot(), **self.redis.socket_stats()}
+        return pools
+
+
+_pools: Optional[DatabasePools] = None
+
+
+def get_pools() -> DatabasePools:
+    """Return the process-wide pools, creating them on first use."""
+    global _pools
+    if _pools is None:
+        _pools = DatabasePools()
+    return _pools
@@ -0,0 +1,245 @@
+"""
+HelixFlow structured logging
+
+Request paths log events, not sentences: ``log.info("text_generated",
+model=model_id, tokens=n)``. Records are handed to a bounded queue and
+rendered (JSON by default) and written by one background listener
+thread, so the calling thread never formats a message or touches a
+file descriptor. Chatty events are sampled per event name and every
+event is rate limited, with the number of suppressed records carried on
+the next one that gets through.
+
+structlog renders the output when it is installed; otherwise the same
+JSON lines come from a small stdlib formatter.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+try:
+    import structlog
+except ImportError:  # pragma: no cover - optional dependency
+    structlog = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[str, float]:
+    """Parse ``"event=0.1,other=0.5"`` (the ``LOG_SAMPLE_RATES`` format)."""
+    rates: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            event, rate = part.split("=", 1)
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks and never formats in the caller.
+
+    The stock ``QueueHandler.prepare`` renders the message in the emitting
+    thread; here the record is enqueued as-is and the listener formats it.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    data = {
+        "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+        "level": record.levelname.lower(),
+        "logger": record.name,
+    }
+    data.update(getattr(record, "fields", {}))
+    return data
+
+
+class StructuredFormatter(logging.Formatter):
+    """JSON lines (or the classic text format plus ``key=value`` fields) from stdlib records."""
+
+    def __init__(self, json_output: bool = True):
+        super().__init__(TEXT_FORMAT)
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        if not self.json_output:
+            line = super().format(record)
+            return line + "".join(f" {k}={v}" for k, v in fields.items())
+        data = _record_fields(record)
+        data["event"] = record.getMessage()
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def _structlog_formatter(json_output: bool) -> logging.Formatter:
+    def add_record_fields(logger: Any, method: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        record = event_dict.get("_record")
+        if record is not None:
+            for key, value in _record_fields(record).items():
+                event_dict.setdefault(key, value)
+        return event_dict
+
+    renderer = structlog.processors.JSONRenderer(default=str) if json_output else structlog.dev.ConsoleRenderer(colors=False)
+    return structlog.stdlib.ProcessorFormatter(
+        processors=[
+            add_record_fields,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.format_exc_info,
+            renderer,
+        ],
+        foreign_pre_chain=[],
+    )
+
+
+def configure_logging(level: Optional[str] = None, json_output: Optional[bool] = None,
+                      queue_size: Optional[int] = None, force: bool = False,
+                      stream: Optional[Any] = None) -> None:
+    """Route the root logger through a background queue listener.
+
+    Like ``logging.basicConfig`` this does nothing when the root logger
+    already has handlers, unless ``force`` is set. ``LOG_LEVEL``,
+    ``LOG_FORMAT`` (``json`` or ``text``) and ``LOG_QUEUE_SIZE`` provide
+    the defaults; output goes to ``stream`` (stderr by default).
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    if json_output is None:
+        json_output = os.getenv('LOG_FORMAT', 'json').lower() != 'text'
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
+        queue_size or int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    )
+
+    output = logging.StreamHandler(stream)
+    if structlog is not None:
+        output.setFormatter(_structlog_formatter(json_output))
+        structlog.configure(
+            processors=[
+                structlog.stdlib.filter_by_level,
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ],
+            logger_factory=structlog.stdlib.LoggerFactory(),
+            wrapper_class=structlog.stdlib.BoundLogger,
+            cache_logger_on_first_use=True,
+        )
+    else:
+        output.setFormatter(StructuredFormatter(json_output))
+
+    _queue_handler = DroppingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Stop the listener after writing everything already queued."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class EventLogger:
+    """Sampled, rate-limited structured events on top of a stdlib logger.
+
+    ``sample_rates`` maps event names to the fraction of debug/info
+    records kept (``LOG_SAMPLE_RATES`` overrides them); warnings and
+    errors are never sampled. Every event is limited to ``rate_limit``
+    records per second. Nothing is formatted here: the event name and
+    fields travel on the record and are rendered by the listener.
+    """
+
+    def __init__(self, name: str, sample_rates: Optional[Dict[str, float]] = None,
+                 rate_limit: Optional[float] = None):
+        self.logger = logging.getLogger(name)
+        self._struct = structlog.get_logger(name) if structlog is not None else None
+        self.sample_rates = {**(sample_rates or {}), **parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))}
+        self.rate_limit = rate_limit or float(os.getenv('LOG_RATE_LIMIT', 100))
+        # event -> [tokens, last refill, suppressed since last emit]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def _admit(self, event: str) -> int:
+        """Suppressed count to report if the record may be emitted, else -1."""
+        now = time.monotonic()
+        bucket = self._buckets.get(event)
+        if bucket is None:
+            bucket = self._buckets[event] = [self.rate_limit, now, 0]
+        bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return -1
+        bucket[0] -= 1
+        suppressed, bucket[2] = int(bucket[2]), 0
+        return suppressed
+
+    def log(self, level: int, event: str, **fields: Any) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            rate = self.sample_rates.get(event, 1.0)
+            if rate < 1.0:
+                if random.random() >= rate:
+                    return
+                fields["sample_rate"] = rate
+        suppressed = self._admit(event)
+        if suppressed < 0:
+            return
+        if suppressed:
+            fields["suppressed"] = suppressed
+        if self._struct is not None:
+            self._struct.log(level, event, **fields)
+        else:
+            self.logger.log(level, event, extra={"fields": fields})
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log(logging.ERROR, event, **fields)
+
+
+def get_logger(name: str, sample_rates: Optional[Dict[str, float]] = None,
+               rate_limit: Optional[float] = None) -> EventLogger:
+    return EventLogger(name, sample_rates, rate_limit)
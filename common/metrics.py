@@ -0,0 +1,66 @@
+"""
+HelixFlow in-process metrics primitives
+
+Small, dependency-free counters and histograms for hot paths. Values are
+plain attributes so snapshots can be exported to Prometheus or returned
+from health endpoints without extra locking.
+"""
+
+import bisect
+from typing import Any, Dict, List, Optional, Sequence
+
+# Seconds; roughly matches prometheus_client's default latency buckets.
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cheap percentile estimates."""
+
+    def __init__(self, buckets: Optional[Sequence[float]] = None):
+        self.buckets: List[float] = sorted(buckets or DEFAULT_LATENCY_BUCKETS)
+        # One extra slot for observations above the largest bucket.
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.mean, 6),
+            "max": round(self.max, 6),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
@@ -0,0 +1,158 @@
+"""
+HelixFlow instrumented query layer
+
+Runs SQL through the shared pools. Statements are prepared once per
+connection and cached by SQL text by the drivers themselves: asyncpg's
+per-connection statement cache (``PostgresPool(statement_cache_size=...)``)
+and ``sqlite3``'s ``cached_statements``. Both caches live and die with
+their connection, so nothing here can outlive a recycled connection.
+Every query records a latency histogram and returned-row counts; queries
+slower than a threshold are logged together with their plan.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .database import PostgresPool, _HealthCheckedPool
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+ROW_COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+class QueryStats:
+    """Latency and row-count statistics for one SQL text."""
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.slow_calls = 0
+        self.rows = 0
+        self.latency = Histogram()
+        self.rows_per_call = Histogram(ROW_COUNT_BUCKETS)
+
+    def record(self, elapsed: float, rows: int) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.latency.observe(elapsed)
+        self.rows_per_call.observe(rows)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow_calls": self.slow_calls,
+            "rows": self.rows,
+            "latency": self.latency.snapshot(),
+            "rows_per_call": self.rows_per_call.snapshot(),
+        }
+
+
+def _affected_rows(status: Any) -> int:
+    """Row count from an ``execute`` status such as ``UPDATE 3``."""
+    try:
+        return int(str(status).rsplit(" ", 1)[-1])
+    except ValueError:
+        return 0
+
+
+def _row_count(method: str, result: Any) -> int:
+    if method == "fetch":
+        return len(result)
+    if method == "execute":
+        return _affected_rows(result)
+    return 0 if result is None else 1
+
+
+class QueryRunner:
+    """Executes queries against a pool with instrumentation.
+
+    Use ``$1``-style placeholders for PostgreSQL and ``?`` for SQLite.
+    Statement caching is left to the pool's connections (see the module
+    docstring).
+    """
+
+    def __init__(
+        self,
+        pool: _HealthCheckedPool,
+        slow_query_threshold: float = 0.25,
+        explain_slow_queries: bool = True,
+    ):
+        self.pool = pool
+        self.slow_query_threshold = slow_query_threshold
+        self.explain_slow_queries = explain_slow_queries
+        self.stats: Dict[str, QueryStats] = {}
+        self._is_postgres = isinstance(pool, PostgresPool)
+
+    async def fetch(self, sql: str, *args: Any) -> List[Any]:
+        return await self._run("fetch", sql, args)
+
+    async def fetchrow(self, sql: str, *args: Any) -> Optional[Any]:
+        return await self._run("fetchrow", sql, args)
+
+    async def fetchval(self, sql: str, *args: Any) -> Any:
+        return await self._run("fetchval", sql, args)
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        return await self._run("execute", sql, args)
+
+    def report(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Statistics for the queries with the highest total time."""
+        ranked = sorted(self.stats.values(), key=lambda s: s.latency.sum, reverse=True)
+        return [s.snapshot() for s in ranked[:limit]]
+
+    async def pg_stat_statements(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Server-side view of the hottest statements (PostgreSQL only)."""
+        if not self._is_postgres:
+            return []
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT query, calls, total_exec_time, mean_exec_time, rows "
+                "FROM pg_stat_statements ORDER BY total_exec_time DESC LIMIT $1",
+                limit,
+            )
+        return [dict(row) for row in rows]
+
+    async def _run(self, method: str, sql: str, args: Sequence[Any]) -> Any:
+        stats = self.stats.get(sql)
+        if stats is None:
+            stats = self.stats[sql] = QueryStats(sql)
+
+        async with self.pool.acquire() as conn:
+            started = time.perf_counter()
+            try:
+                result = await getattr(conn, method)(sql, *args)
+            except Exception:
+                stats.errors += 1
+                raise
+            elapsed = time.perf_counter() - started
+
+            rows = _row_count(method, result)
+            stats.record(elapsed, rows)
+            if elapsed >= self.slow_query_threshold:
+                stats.slow_calls += 1
+                await self._log_slow_query(conn, sql, args, elapsed, rows)
+        return result
+
+    async def _log_slow_query(
+        self, conn: Any, sql: str, args: Sequence[Any], elapsed: float, rows: int
+    ) -> None:
+        plan = None
+        if self.explain_slow_queries:
+            try:
+                plan = await self._explain(conn, sql, args)
+            except Exception as e:
+                plan = f"<unavailable: {e}>"
+        logger.warning(
+            "Slow query (%.1f ms, %d rows): %s\nPlan: %s", elapsed * 1000, rows, sql, plan
+        )
+
+    async def _explain(self, conn: Any, sql: str, args: Sequence[Any]) -> str:
+        if self._is_postgres:
+            return await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+        rows = await conn.fetch(f"EXPLAIN QUERY PLAN {sql}", *args)
+        return "; ".join(str(row[-1]) for row in rows)
@@ -0,0 +1,206 @@
+"""
+Token counting for usage accounting and context-length checks
+
+Each model maps to a tokenizer spec. Tokenizers are loaded once, on first
+use, and shared by every caller in the process; with TOKENIZER_PRELOAD=true
+services call ``preload`` at startup to load every configured one up front
+(loading may download vocabularies, so it is off by default). Specs that cannot be loaded fall back to
+approximate counts, logged and reported in ``stats()["fallbacks"]``. Counts are
+memoized in an LRU keyed by model and text hash, so re-sent conversation
+history costs a dictionary lookup rather than a re-tokenization.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+try:
+    from tokenizers import Tokenizer as HFTokenizer
+except ImportError:  # pragma: no cover - optional dependency
+    HFTokenizer = None
+
+logger = logging.getLogger(__name__)
+
+# model -> (kind, name); kind is "tiktoken", "hf" or "approx"
+MODEL_TOKENIZERS: Dict[str, Tuple[str, str]] = {
+    "gpt-3.5-turbo": ("tiktoken", "cl100k_base"),
+    "gpt-4": ("tiktoken", "cl100k_base"),
+    "claude-v1": ("approx", "approx"),
+    "llama-2-70b": ("hf", "hf-internal-testing/llama-tokenizer"),
+}
+DEFAULT_TOKENIZER = ("tiktoken", "cl100k_base")
+
+# Chat formatting overhead, as in OpenAI's accounting: role/separators per
+# message plus the priming of the assistant reply.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class ApproxTokenizer:
+    """Dependency-free BPE approximation: one token per word or symbol, ~4 characters each."""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return sum(max(1, (len(piece) + 2) // 4) for piece in _PIECE_RE.findall(text))
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [self.count(text) for text in texts]
+
+
+class TiktokenTokenizer:
+    """Exact counts for OpenAI BPE encodings."""
+
+    def __init__(self, encoding: str):
+        if tiktoken is None:
+            raise ImportError("tiktoken is required for TiktokenTokenizer (pip install tiktoken)")
+        self.name = encoding
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [len(ids) for ids in self.encoding.encode_ordinary_batch(list(texts))]
+
+
+class HuggingFaceTokenizer:
+    """Counts with a Hugging Face ``tokenizers`` vocabulary (Rust, batched)."""
+
+    def __init__(self, name: str):
+        if HFTokenizer is None:
+            raise ImportError("tokenizers is required for HuggingFaceTokenizer (pip install tokenizers)")
+        self.name = name
+        self.tokenizer = HFTokenizer.from_pretrained(name)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        encodings = self.tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return [len(e.ids) for e in encodings]
+
+
+def load_tokenizer(kind: str, name: str) -> Any:
+    """Build a tokenizer, falling back to ``ApproxTokenizer`` if it cannot be loaded."""
+    try:
+        if kind == "tiktoken":
+            return TiktokenTokenizer(name)
+        if kind == "hf":
+            return HuggingFaceTokenizer(name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {kind}:{name} unavailable, using approximate counts: {e}")
+    return ApproxTokenizer()
+
+
+def _text_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class TokenCounter:
+    """Per-model token counts with an LRU cache keyed by text hash."""
+
+    def __init__(self, model_tokenizers: Optional[Dict[str, Tuple[str, str]]] = None,
+                 cache_size: int = 65536):
+        self.model_tokenizers = dict(MODEL_TOKENIZERS if model_tokenizers is None else model_tokenizers)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._tokenizers: Dict[Tuple[str, str], Any] = {}
+        self.fallbacks: List[str] = []
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def preload(self) -> None:
+        """Load the tokenizer of every configured model (and the default) now."""
+        for spec in {DEFAULT_TOKENIZER, *self.model_tokenizers.values()}:
+            self._load(spec)
+
+    def tokenizer_for(self, model: str) -> Any:
+        """The model's tokenizer; specs missed by ``preload`` are loaded on first use."""
+        spec = self.model_tokenizers.get(model, DEFAULT_TOKENIZER)
+        tokenizer = self._tokenizers.get(spec)
+        if tokenizer is None:
+            tokenizer = self._load(spec)
+        return tokenizer
+
+    def _load(self, spec: Tuple[str, str]) -> Any:
+        with self._load_lock:
+            tokenizer = self._tokenizers.get(spec)
+            if tokenizer is None:
+                tokenizer = self._tokenizers[spec] = load_tokenizer(*spec)
+                if isinstance(tokenizer, ApproxTokenizer) and spec[0] != "approx":
+                    self.fallbacks.append(f"{spec[0]}:{spec[1]}")
+        return tokenizer
+
+    def count(self, model: str, text: str) -> int:
+        """Token count of one text."""
+        return self.count_tokens(model, [text])[0]
+
+    def count_tokens(self, model: str, texts: Sequence[str]) -> List[int]:
+        """Token counts for many texts; cache misses are tokenized in one batch."""
+        keys = [_text_key(model, text) for text in texts]
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                count = self._cache.get(key)
+                if count is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    counts[i] = count
+            self.hits += len(texts) - sum(len(v) for v in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            positions = list(missing.values())
+            fresh = self.tokenizer_for(model).count_batch([texts[p[0]] for p in positions])
+            with self._lock:
+                for key, indexes, count in zip(missing, positions, fresh):
+                    self._cache[key] = count
+                    for i in indexes:
+                        counts[i] = count
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return counts  # type: ignore[return-value]
+
+    def count_message_tokens(self, model: str, messages: Sequence[Dict[str, Any]]) -> List[int]:
+        """Per-message counts, including the role/separator overhead."""
+        texts = [str(m.get("content") or "") for m in messages]
+        return [c + TOKENS_PER_MESSAGE for c in self.count_tokens(model, texts)]
+
+    def count_messages(self, model: str, messages: Sequence[Dict[str, Any]]) -> int:
+        """Prompt tokens for a chat request."""
+        return sum(self.count_message_tokens(model, messages)) + TOKENS_PER_REPLY
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokenizers": sorted(f"{kind}:{name}" for kind, name in self._tokenizers),
+            "fallbacks": sorted(self.fallbacks),
+        }
+
+
+_token_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter, creating it on first use."""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = TokenCounter()
+    return _token_counter
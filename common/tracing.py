@@ -0,0 +1,288 @@
+"""
+HelixFlow distributed tracing
+
+A small tracer shared by the Python services. Trace context travels as a
+W3C ``traceparent`` entry in HTTP headers or in the ``metadata`` map of
+``InferenceRequest``/``InferenceResponse``, so a request can be followed
+from the gateway through auth and inference. Sampling is decided once,
+at the root (``TRACE_SAMPLE_RATE``), and inherited by every child; an
+unsampled span still propagates its ids but records nothing.
+
+Finished spans are exported in batches from a background thread to the
+destination named by ``TRACE_EXPORTER``: ``file:<path>`` appends JSON
+lines, an ``http(s)://`` URL posts ``{"spans": [...]}`` to a local
+collector, and anything else (the default) disables export.
+"""
+
+import os
+import json
+import time
+import atexit
+import random
+import logging
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+
+# exporter(spans) ships one batch of finished span dicts
+Exporter = Callable[[List[Dict[str, Any]]], None]
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("helixflow_span", default=None)
+
+
+class SpanContext:
+    """The part of a span that crosses process boundaries."""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Optional[str]) -> Optional["SpanContext"]:
+        parts = (value or "").strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            trace_id, span_id, flags = (int(part, 16) for part in parts[1:])
+        except ValueError:
+            return None
+        if not trace_id or not span_id:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+
+def inject(carrier: MutableMapping[str, str], span: Optional["Span"] = None) -> MutableMapping[str, str]:
+    """Write the context of ``span`` (default: the current span) into headers or metadata."""
+    span = span or current_span()
+    if span is not None:
+        carrier[TRACEPARENT] = span.context.to_traceparent()
+    return carrier
+
+
+def extract(carrier: Optional[Mapping[str, str]]) -> Optional[SpanContext]:
+    """Context from headers or metadata; header names are matched case-insensitively."""
+    if not carrier:
+        return None
+    value = carrier.get(TRACEPARENT)
+    if value is None:
+        value = next((v for k, v in carrier.items() if k.lower() == TRACEPARENT), None)
+    return SpanContext.from_traceparent(value)
+
+
+def current_span() -> Optional["Span"]:
+    return _current.get()
+
+
+class Span:
+    """One timed operation. Unsampled spans carry ids but are never exported."""
+
+    __slots__ = ("tracer", "name", "context", "parent_id", "start_time", "end_time", "attributes", "status",
+                 "recording")
+
+    def __init__(self, tracer: "Tracer", name: str, context: SpanContext, parent_id: Optional[str],
+                 start_time: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_time = time.time() if start_time is None else start_time
+        self.end_time: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.recording = context.sampled and tracer.exporter is not None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording:
+            self.attributes[key] = value
+
+    def set_error(self, error: Any) -> None:
+        self.status = "error"
+        self.set_attribute("error", str(error))
+
+    def end(self, end_time: Optional[float] = None) -> None:
+        if self.end_time is not None:
+            return
+        self.end_time = time.time() if end_time is None else end_time
+        if self.recording:
+            self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "service": self.tracer.service,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": (self.end_time or self.start_time) - self.start_time,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def file_exporter(path: str) -> Exporter:
+    """Append spans to ``path`` as JSON lines."""
+    lock = threading.Lock()
+
+    def export(spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    return export
+
+
+def collector_exporter(url: str, timeout: float = 2.0) -> Exporter:
+    """POST spans as ``{"spans": [...]}`` to a collector endpoint."""
+
+    def export(spans: List[Dict[str, Any]]) -> None:
+        body = json.dumps({"spans": spans}, default=str).encode("utf-8")
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    return export
+
+
+def exporter_from_env(spec: Optional[str] = None) -> Optional[Exporter]:
+    spec = os.getenv('TRACE_EXPORTER', '') if spec is None else spec
+    if spec.startswith("file:"):
+        return file_exporter(spec[len("file:"):])
+    if spec.startswith(("http://", "https://")):
+        return collector_exporter(spec)
+    return None
+
+
+class Tracer:
+    """Creates spans for one service and exports the sampled ones in batches.
+
+    Without an exporter nothing is recorded, but context (including the
+    sampling decision) still propagates to services that do export.
+    Finished spans wait in a bounded buffer (``max_pending``; overflow is
+    dropped and counted) and are handed to the exporter every
+    ``flush_interval`` seconds.
+    """
+
+    def __init__(self, service: str, sample_rate: Optional[float] = None,
+                 exporter: Optional[Exporter] = None, flush_interval: float = 1.0,
+                 max_pending: int = 10000, batch_size: int = 512):
+        self.service = service
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv('TRACE_SAMPLE_RATE', 0.01))
+        self.exporter = exporter if exporter is not None else exporter_from_env()
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.counters = {"started": 0, "sampled": 0, "exported": 0, "dropped": 0, "export_errors": 0}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_span(self, name: str, parent: Any = None, start_time: Optional[float] = None,
+                   **attributes: Any) -> Span:
+        """A new span under ``parent`` (a Span, a SpanContext or, by default, the current span)."""
+        if parent is None:
+            parent = current_span()
+        if isinstance(parent, Span):
+            parent = parent.context
+        self.counters["started"] += 1
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        context = SpanContext(trace_id, f"{random.getrandbits(64) or 1:016x}", sampled)
+        span = Span(self, name, context, parent_id, start_time, attributes)
+        if span.recording:
+            self.counters["sampled"] += 1
+        else:
+            span.attributes = {}
+        return span
+
+    @contextmanager
+    def span(self, name: str, parent: Any = None, **attributes: Any) -> Iterator[Span]:
+        """Time a block as the current span; an exception marks it as an error."""
+        span = self.start_span(name, parent, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def record(self, name: str, start_time: float, duration: float, parent: Any = None,
+               **attributes: Any) -> Span:
+        """Add a span for work that was timed elsewhere (queue wait, prefill, decode)."""
+        span = self.start_span(name, parent, start_time=start_time, **attributes)
+        span.end(start_time + max(duration, 0.0))
+        return span
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                return
+            self._pending.append(span.to_dict())
+            full = len(self._pending) >= self.batch_size
+        if self._thread is None:
+            self._start()
+        if full:
+            self._wake.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"trace-export-{self.service}", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the export thread after a final flush."""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Export everything buffered now; returns the number of spans exported."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        exported = 0
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            try:
+                self.exporter(batch)
+                exported += len(batch)
+            except Exception as e:
+                self.counters["export_errors"] += 1
+                logger.error(f"Error exporting {len(batch)} spans: {e}")
+        self.counters["exported"] += exported
+        return exported
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "pending": len(self._pending), "sample_rate": self.sample_rate}
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import heapq
+import time
+import logging
+import threading
+import itertools
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class AdmissionRejected(Exception):
+    """Request refused by admission control; ``reason`` is "overloaded" or "deadline"."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("tenant", "priority", "deadline", "start", "finish", "enqueued_at",
+                 "event", "admitted", "cancelled")
+
+    def __init__(self, tenant: str, priority: str, deadline: Optional[float],
+                 start: float, finish: float):
+        self.tenant = tenant
+        self.priority = priority
+        self.deadline = deadline
+        self.start = start
+        self.finish = finish
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.admitted = False
+        self.cancelled = False
+
+
+class AdmissionController:
+    """Bounded concurrency with per-tenant weighted-fair queues.
+
+    At most ``max_concurrency`` requests run at once. Waiting requests are
+    served interactive-before-batch; within a class, tenants share capacity
+    in proportion to their weight (start-time fair queuing on virtual
+    finish tags), so one tenant's burst cannot starve the others.
+
+    Requests are refused up front when the queue is full or when the
+    estimated queue wait plus service time would overrun their deadline,
+    and dropped if the deadline passes while they wait, so work the client
+    has already given up on never reaches the model.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue_size: Optional[int] = None,
+                 tenant_weights: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('INFERENCE_MAX_CONCURRENCY', 4))
+        self.max_queue_size = max_queue_size or int(os.getenv('INFERENCE_MAX_QUEUE', 64))
+        self.tenant_weights = dict(tenant_weights or {})
+        self.active = 0
+        self.service_time_ewma = 0.0
+        self.admitted = 0
+        self.rejected = {"overloaded": 0, "deadline": 0}
+        self.expired = 0
+        self.queue_wait = {priority: Histogram() for priority in PRIORITIES}
+        self._queues: Dict[str, List[tuple]] = {priority: [] for priority in PRIORITIES}
+        self._queued = {priority: 0 for priority in PRIORITIES}
+        self._virtual_time = 0.0
+        self._tenant_finish: Dict[str, float] = {}
+        self._prune_at = 1024
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._queued.values())
+
+    def estimated_wait(self, priority: str = "interactive") -> float:
+        """Seconds a request of ``priority`` would wait if queued now."""
+        rank = PRIORITIES[priority]
+        ahead = sum(n for p, n in self._queued.items() if PRIORITIES[p] <= rank)
+        if self.active < self.max_concurrency and not ahead:
+            return 0.0
+        return (ahead + 1) * self.service_time_ewma / self.max_concurrency
+
+    def acquire(self, tenant: str = "default", priority: str = "interactive",
+                deadline: Optional[float] = None, cost: float = 1.0) -> float:
+        """Block until admitted; returns the queue wait. ``deadline`` is a ``time.monotonic()`` value."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        with self._lock:
+            if self.active < self.max_concurrency and not self.queue_depth:
+                self.active += 1
+                self.admitted += 1
+                self.queue_wait[priority].observe(0.0)
+                return 0.0
+            if self.queue_depth >= self.max_queue_size:
+                self.rejected["overloaded"] += 1
+                raise AdmissionRejected("Inference queue is full", "overloaded")
+            if deadline is not None and \
+                    time.monotonic() + self.estimated_wait(priority) + self.service_time_ewma > deadline:
+                self.rejected["deadline"] += 1
+                raise AdmissionRejected("Request would miss its deadline", "deadline")
+
+            weight = self.tenant_weights.get(tenant, 1.0)
+            start = max(self._virtual_time, self._tenant_finish.get(tenant, 0.0))
+            waiter = _Waiter(tenant, priority, deadline, start, start + cost / weight)
+            self._tenant_finish[tenant] = waiter.finish
+            heapq.heappush(self._queues[priority], (waiter.finish, next(self._seq), waiter))
+            self._queued[priority] += 1
+
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+        waiter.event.wait(timeout)
+        with self._lock:
+            if not waiter.admitted:
+                if not waiter.cancelled:
+                    waiter.cancelled = True
+                    self._queued[priority] -= 1
+                    self.expired += 1
+                raise AdmissionRejected("Deadline expired while queued", "deadline")
+        waited = time.monotonic() - waiter.enqueued_at
+        self.queue_wait[priority].observe(waited)
+        return waited
+
+    def release(self, service_time: Optional[float] = None, alpha: float = 0.2) -> None:
+        """Free a slot and admit the next waiter, if any."""
+        with self._lock:
+            self.active -= 1
+            if service_time is not None:
+                if self.service_time_ewma:
+                    self.service_time_ewma += alpha * (service_time - self.service_time_ewma)
+                else:
+                    self.service_time_ewma = service_time
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self.active < self.max_concurrency:
+            waiter = self._pop_next()
+            if waiter is None:
+                return
+            if waiter.deadline is not None and now >= waiter.deadline:
+                waiter.cancelled = True
+                self.expired += 1
+                waiter.event.set()
+                continue
+            waiter.admitted = True
+            self.active += 1
+            self.admitted += 1
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            waiter.event.set()
+        if not self.queue_depth and self._tenant_finish:
+            # Idle queue: as in start-time fair queuing, the clock jumps to the last finish tag.
+            self._virtual_time = max(self._virtual_time, max(self._tenant_finish.values()))
+            self._tenant_finish.clear()
+        elif len(self._tenant_finish) > self._prune_at:
+            self._prune_tenants()
+
+    def _prune_tenants(self) -> None:
+        """Forget finish tags the virtual clock has passed; they no longer affect scheduling."""
+        self._tenant_finish = {
+            tenant: finish for tenant, finish in self._tenant_finish.items() if finish > self._virtual_time
+        }
+        self._prune_at = max(1024, 2 * len(self._tenant_finish))
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        for priority in sorted(PRIORITIES, key=PRIORITIES.get):
+            queue = self._queues[priority]
+            while queue:
+                _, _, waiter = heapq.heappop(queue)
+                if waiter.cancelled:
+                    continue
+                self._queued[priority] -= 1
+                return waiter
+        return None
+
+    @contextmanager
+    def slot(self, tenant: str = "default", priority: str = "interactive",
+             timeout: Optional[float] = None, cost: float = 1.0) -> Iterator[float]:
+        """Hold a concurrency slot for the block; ``timeout`` is the client's remaining seconds."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = self.acquire(tenant, priority, deadline, cost)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "expired": self.expired,
+            "service_time_ewma": self.service_time_ewma,
+            "queue_wait": {priority: h.snapshot() for priority, h in self.queue_wait.items()},
+        }
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KVCacheExhausted(Exception):
+    """No free blocks are left for the requested tokens."""
+
+
+class PagedKVCache:
+    """Block allocator for attention key/value storage.
+
+    The cache is ``num_blocks`` fixed-size blocks of ``block_size`` token
+    slots. Each sequence owns a block table (logical block -> physical
+    block) that grows one block at a time as tokens are appended, so a
+    sequence holds at most one partially filled block instead of a
+    contiguous buffer reserved for ``max_tokens``. Blocks are reference
+    counted: ``fork`` shares the parent's blocks with the child, and the
+    first write into a shared, partially filled block copies it
+    (``copy_block(src, dst)`` lets the engine move the actual tensors).
+    """
+
+    def __init__(self, num_blocks: Optional[int] = None, block_size: Optional[int] = None,
+                 bytes_per_token: int = 0, copy_block: Optional[Callable[[int, int], None]] = None):
+        self.num_blocks = num_blocks or int(os.getenv('INFERENCE_KV_BLOCKS', 4096))
+        self.block_size = block_size or int(os.getenv('INFERENCE_KV_BLOCK_SIZE', 16))
+        self.bytes_per_token = bytes_per_token
+        self.copy_block = copy_block
+        # Reversed so blocks are handed out from 0 upwards.
+        self._free: List[int] = list(range(self.num_blocks - 1, -1, -1))
+        self._refs = [0] * self.num_blocks
+        self._tables: Dict[Any, List[int]] = {}
+        self._lengths: Dict[Any, int] = {}
+        self.cow_copies = 0
+        self.allocation_failures = 0
+        self.peak_used_blocks = 0
+        self._lock = threading.Lock()
+
+    def blocks_needed(self, num_tokens: int) -> int:
+        return -(-num_tokens // self.block_size)
+
+    @property
+    def free_blocks(self) -> int:
+        return len(self._free)
+
+    def can_allocate(self, num_tokens: int) -> bool:
+        return self.blocks_needed(num_tokens) <= len(self._free)
+
+    def _take(self) -> int:
+        block = self._free.pop()
+        self._refs[block] = 1
+        return block
+
+    def _drop(self, block: int) -> None:
+        self._refs[block] -= 1
+        if self._refs[block] == 0:
+            self._free.append(block)
+
+    def _fail(self, message: str) -> KVCacheExhausted:
+        self.allocation_failures += 1
+        return KVCacheExhausted(message)
+
+    def _track_peak(self) -> None:
+        self.peak_used_blocks = max(self.peak_used_blocks, self.num_blocks - len(self._free))
+
+    def allocate(self, seq_id: Any, num_tokens: int) -> List[int]:
+        """Reserve blocks for a new sequence's first ``num_tokens`` tokens (its prompt)."""
+        with self._lock:
+            if seq_id in self._tables:
+                raise ValueError(f"Sequence {seq_id} already has a block table")
+            needed = self.blocks_needed(num_tokens)
+            if needed > len(self._free):
+                raise self._fail(f"Need {needed} KV blocks, {len(self._free)} free")
+            self._tables[seq_id] = [self._take() for _ in range(needed)]
+            self._lengths[seq_id] = num_tokens
+            self._track_peak()
+            return list(self._tables[seq_id])
+
+    def append(self, seq_id: Any, num_tokens: int = 1) -> List[Tuple[int, int]]:
+        """Make room for ``num_tokens`` more tokens; returns the ``(src, dst)`` blocks copied on write.
+
+        All-or-nothing: on ``KVCacheExhausted`` the sequence is unchanged.
+        """
+        with self._lock:
+            table = self._tables[seq_id]
+            length = self._lengths[seq_id]
+            shared_tail = bool(table) and length % self.block_size != 0 and self._refs[table[-1]] > 1
+            needed = self.blocks_needed(length + num_tokens) - len(table) + int(shared_tail)
+            if needed > len(self._free):
+                raise self._fail(f"Need {needed} KV blocks for {seq_id}, {len(self._free)} free")
+            copies = []
+            if shared_tail:
+                src, dst = table[-1], self._take()
+                if self.copy_block is not None:
+                    self.copy_block(src, dst)
+                self._refs[src] -= 1
+                table[-1] = dst
+                self.cow_copies += 1
+                copies.append((src, dst))
+            while len(table) < self.blocks_needed(length + num_tokens):
+                table.append(self._take())
+            self._lengths[seq_id] = length + num_tokens
+            self._track_peak()
+            return copies
+
+    def fork(self, parent_id: Any, child_id: Any) -> None:
+        """Give ``child_id`` the parent's tokens by sharing its blocks (no copy until written)."""
+        with self._lock:
+            if child_id in self._tables:
+                raise ValueError(f"Sequence {child_id} already has a block table")
+            table = self._tables[parent_id]
+            for block in table:
+                self._refs[block] += 1
+            self._tables[child_id] = list(table)
+            self._lengths[child_id] = self._lengths[parent_id]
+
+    def free(self, seq_id: Any) -> None:
+        with self._lock:
+            for block in self._tables.pop(seq_id, []):
+                self._drop(block)
+            self._lengths.pop(seq_id, None)
+
+    def block_table(self, seq_id: Any) -> List[int]:
+        return list(self._tables[seq_id])
+
+    def num_tokens(self, seq_id: Any) -> int:
+        return self._lengths[seq_id]
+
+    def blocks_by_owner(self) -> Dict[Any, int]:
+        """Blocks referenced per owner, for sequence ids of the form ``(owner, n)``.
+
+        Shared blocks count once per owner that references them. Lock-free;
+        the table is copied in one step.
+        """
+        usage: Dict[Any, int] = {}
+        for seq_id, table in list(self._tables.items()):
+            owner = seq_id[0] if isinstance(seq_id, tuple) else seq_id
+            usage[owner] = usage.get(owner, 0) + len(table)
+        return usage
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            used = self.num_blocks - len(self._free)
+            tokens = sum(self._lengths.values())
+            slots = sum(len(t) for t in self._tables.values()) * self.block_size
+            return {
+                "block_size": self.block_size,
+                "total_blocks": self.num_blocks,
+                "used_blocks": used,
+                "free_blocks": len(self._free),
+                "peak_used_blocks": self.peak_used_blocks,
+                "utilization": round(used / self.num_blocks, 4),
+                # Share of reserved token slots actually holding tokens.
+                "slot_utilization": round(tokens / slots, 4) if slots else 0.0,
+                "shared_blocks": sum(1 for r in self._refs if r > 1),
+                "sequences": len(self._tables),
+                "tokens": tokens,
+                "memory_bytes": used * self.block_size * self.bytes_per_token,
+                "cow_copies": self.cow_copies,
+                "allocation_failures": self.allocation_failures,
+            }
+
+
+class ContinuousBatcher:
+    """Iteration-level batching bounded by KV-cache blocks instead of ``max_tokens``.
+
+    Sequences are admitted while the cache can hold their prompt and up to
+    ``max_batch_size`` are decoded together, one token per step. A finished
+    sequence frees its blocks immediately so a waiting one can join the
+    next step. When the cache runs out mid-decode the most recently
+    admitted sequence is preempted: its blocks are freed and it is
+    requeued to be recomputed from its prompt.
+    """
+
+    def __init__(self, cache: PagedKVCache, max_batch_size: Optional[int] = None,
+                 poll_interval: float = 0.005):
+        self.cache = cache
+        self.max_batch_size = max_batch_size or int(os.getenv('INFERENCE_MAX_BATCH', 64))
+        self.poll_interval = poll_interval
+        self.preemptions = 0
+        self._ids = itertools.count()
+
+    def run(self, requests: Sequence[Tuple[int, int]], step: Callable[[List[int]], None],
+            owner: Any = "batch") -> Dict[str, Any]:
+        """Decode ``(prompt_tokens, new_tokens)`` requests; ``step`` runs one forward pass over the given request indices.
+
+        Sequences are registered in the cache as ``(owner, n)``.
+        """
+        for prompt_tokens, new_tokens in requests:
+            if self.cache.blocks_needed(prompt_tokens + max(new_tokens, 1)) > self.cache.num_blocks:
+                raise KVCacheExhausted(f"Sequence of {prompt_tokens + new_tokens} tokens exceeds the KV cache")
+
+        seq_ids = {i: (owner, next(self._ids)) for i in range(len(requests))}
+        waiting = deque(i for i, (_, new_tokens) in enumerate(requests) if new_tokens > 0)
+        running: List[int] = []
+        generated = [0] * len(requests)
+        steps = peak = preempted = batched = 0
+        try:
+            while waiting or running:
+                while waiting and len(running) < self.max_batch_size:
+                    index = waiting[0]
+                    try:
+                        self.cache.allocate(seq_ids[index], requests[index][0])
+                    except KVCacheExhausted:
+                        break
+                    waiting.popleft()
+                    running.append(index)
+                if not running:
+                    # Blocks are held by other batches; wait for them to free some.
+                    time.sleep(self.poll_interval)
+                    continue
+
+                for index in list(running):
+                    while index in running:
+                        try:
+                            self.cache.append(seq_ids[index])
+                            break
+                        except KVCacheExhausted:
+                            victim = running.pop()
+                            self.cache.free(seq_ids[victim])
+                            generated[victim] = 0
+                            waiting.appendleft(victim)
+                            # A sequence that gives up its own blocks was not displaced by another.
+                            if victim != index:
+                                preempted += 1
+                if not running:
+                    # Every sequence gave its blocks back, so the rest are held by other batches.
+                    time.sleep(self.poll_interval)
+                    continue
+
+                step(list(running))
+                steps += 1
+                batched += len(running)
+                peak = max(peak, len(running))
+                for index in list(running):
+                    generated[index] += 1
+                    if generated[index] >= requests[index][1]:
+                        running.remove(index)
+                        self.cache.free(seq_ids[index])
+        finally:
+            for seq_id in seq_ids.values():
+                self.cache.free(seq_id)
+        self.preemptions += preempted
+        if preempted:
+            logger.info(f"KV cache full: preempted {preempted} sequences")
+        return {
+            "steps": steps,
+            "peak_batch": peak,
+            "mean_batch": round(batched / steps, 2) if steps else 0.0,
+            "preemptions": preempted,
+        }
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+import os
+import logging
+from typing import Any, Optional, Tuple
+
+try:
+    import torch
+    import torch.nn.functional as F
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+except ImportError:  # pragma: no cover - optional dependency
+    torch = None
+
+try:
+    from transformers import BitsAndBytesConfig
+except ImportError:  # pragma: no cover - optional dependency
+    BitsAndBytesConfig = None
+
+try:
+    from accelerate import init_empty_weights
+except ImportError:  # pragma: no cover - optional dependency
+    init_empty_weights = None
+
+from weights import MappedWeights, export_state_dict
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "bf16", "int8", "int4")
+
+# Weight storage per parameter, before per-group scales.
+BYTES_PER_PARAM = {"fp32": 4.0, "bf16": 2.0, "int8": 1.0, "int4": 0.5}
+
+
+def validate_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+    return precision
+
+
+def estimate_footprint(num_params: int, precision: str, group_size: int = 64) -> int:
+    """Approximate weight memory in bytes for ``num_params`` parameters at ``precision``.
+
+    Quantized precisions add roughly one fp32 scale per ``group_size`` weights.
+    """
+    validate_precision(precision)
+    weights = num_params * BYTES_PER_PARAM[precision]
+    scales = num_params / group_size * 4 if precision in ("int8", "int4") else 0
+    return int(weights + scales)
+
+
+def _tensor_bytes(value: Any, seen: set) -> int:
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v, seen) for v in value)
+    if torch is None or not isinstance(value, torch.Tensor):
+        return 0
+    key = (id(value), "q") if value.is_quantized else (value.data_ptr(), value.numel())
+    if key in seen:
+        return 0
+    seen.add(key)
+    return value.numel() * value.element_size()
+
+
+def model_footprint(model: Any) -> int:
+    """Bytes held by a model's weights and buffers, counting tied tensors once.
+
+    Walks ``state_dict`` rather than ``parameters()`` so packed quantized
+    weights (which are not parameters) are included.
+    """
+    seen: set = set()
+    return sum(_tensor_bytes(value, seen) for value in model.state_dict().values())
+
+
+if torch is not None:
+
+    def _as_linear(module: Any) -> Optional[Tuple[Any, Optional[Any]]]:
+        """``(weight [out, in], bias)`` for nn.Linear and GPT-2 style Conv1D layers."""
+        if isinstance(module, torch.nn.Linear):
+            return module.weight.data, module.bias.data if module.bias is not None else None
+        if type(module).__name__ == "Conv1D":
+            return module.weight.data.t(), module.bias.data if module.bias is not None else None
+        return None
+
+    def _to_linear(weight: Any, bias: Optional[Any]) -> Any:
+        linear = torch.nn.Linear(weight.shape[1], weight.shape[0], bias=bias is not None)
+        linear.weight.data = weight.float().contiguous()
+        if bias is not None:
+            linear.bias.data = bias.float().contiguous()
+        return linear
+
+    def _replace_linears(module: Any, build: Any, skip: Tuple[str, ...] = (), prefix: str = "",
+                         conv1d_only: bool = False) -> int:
+        replaced = 0
+        for name, child in module.named_children():
+            path = f"{prefix}{name}"
+            found = _as_linear(child)
+            if conv1d_only and isinstance(child, torch.nn.Linear):
+                found = None
+            if found is not None and not any(path.endswith(s) for s in skip):
+                setattr(module, name, build(*found))
+                replaced += 1
+            else:
+                replaced += _replace_linears(child, build, skip, f"{path}.", conv1d_only)
+        return replaced
+
+    class Int4Linear(torch.nn.Module):
+        """Weight-only int4 linear layer: two weights per byte, one scale per group.
+
+        Weights are symmetric-quantized per ``group_size`` input columns and
+        dequantized on the fly in ``forward``, so the resident copy is ~1/8
+        of fp32. Activations stay in floating point.
+        """
+
+        def __init__(self, weight: Any, bias: Optional[Any] = None, group_size: int = 64):
+            super().__init__()
+            out_features, in_features = weight.shape
+            self.in_features = in_features
+            self.out_features = out_features
+            self.group_size = group_size
+            padded = -(-in_features // group_size) * group_size
+            w = torch.zeros(out_features, padded, dtype=torch.float32)
+            w[:, :in_features] = weight.float()
+            groups = w.view(out_features, padded // group_size, group_size)
+            scales = groups.abs().amax(dim=-1, keepdim=True).clamp(min=1e-8) / 7.0
+            q = (groups / scales).round().clamp(-8, 7).to(torch.int16) + 8
+            q = q.view(out_features, padded).to(torch.uint8)
+            self.register_buffer("packed", q[:, 0::2] | (q[:, 1::2] << 4))
+            self.register_buffer("scales", scales.squeeze(-1).to(torch.bfloat16))
+            self.register_buffer("bias", bias.float().clone() if bias is not None else None)
+
+        def dequantize(self) -> Any:
+            low = (self.packed & 0x0F).to(torch.int8) - 8
+            high = (self.packed >> 4).to(torch.int8) - 8
+            q = torch.stack((low, high), dim=-1).view(self.out_features, -1)
+            groups = q.view(self.out_features, -1, self.group_size).float()
+            w = (groups * self.scales.float().unsqueeze(-1)).view(self.out_features, -1)
+            return w[:, :self.in_features]
+
+        def forward(self, x: Any) -> Any:
+            return F.linear(x.float(), self.dequantize(), self.bias).to(x.dtype)
+
+    def quantize_int8(model: Any) -> Any:
+        """Dynamic int8 quantization of every linear layer (int8 GEMM on CPU)."""
+        _replace_linears(model, _to_linear, conv1d_only=True)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def quantize_int4(model: Any, group_size: int = 64, skip: Tuple[str, ...] = ("lm_head",)) -> Any:
+        """Replace linear layers (except ``skip``) with ``Int4Linear`` in place."""
+        count = _replace_linears(model, lambda w, b: Int4Linear(w, b, group_size), skip)
+        logger.info(f"Quantized {count} linear layers to int4")
+        return model
+
+
+def _load_mapped(name: str, weights_path: str, dtype: Any) -> Any:
+    """Build the model skeleton without allocating weights, then point it at the mapping."""
+    if init_empty_weights is None:
+        raise ImportError("accelerate is required to load memory-mapped weights")
+    weights = MappedWeights(weights_path)
+    config = AutoConfig.from_pretrained(name)
+    # Buffers (causal masks, rotary frequencies) are still allocated for real:
+    # non-persistent ones are not in the state dict and would otherwise stay on meta.
+    with init_empty_weights(include_buffers=False):
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=dtype)
+    model.load_state_dict(weights.state_dict(), strict=False, assign=True)
+    # Tied weights are stored once; anything else still on meta was missing from the file.
+    model.tie_weights()
+    missing = [n for n, t in (*model.named_parameters(), *model.named_buffers()) if t.is_meta]
+    if missing:
+        raise ValueError(f"Mapped weights {weights_path} are missing tensors for {name}: {', '.join(missing)}")
+    # assign=True keeps the file's dtype; a file exported at another precision is converted,
+    # which copies those tensors out of the shared mapping.
+    mismatched = sorted({
+        str(t.dtype) for _, t in (*model.named_parameters(), *model.named_buffers())
+        if t.is_floating_point() and t.dtype != dtype
+    })
+    if mismatched:
+        logger.warning(f"Mapped weights {weights_path} hold {', '.join(mismatched)} tensors; "
+                       f"converting to {dtype} without sharing the mapping")
+        model = model.to(dtype)
+    # Keep the mapping open for as long as the model uses its pages.
+    model._mapped_weights = weights
+    return model
+
+
+def load_causal_lm(name: str, precision: str = "fp32", device: str = "cpu",
+                   group_size: int = 64, weights_path: Optional[str] = None) -> Tuple[Any, Any]:
+    """Load a Hugging Face causal LM and its tokenizer at the requested precision.
+
+    On CUDA hosts with bitsandbytes, int8/int4 use its kernels. bitsandbytes
+    has no general CPU path, so on CPU int8 uses PyTorch dynamic
+    quantization and int4 uses ``Int4Linear``.
+
+    With ``weights_path`` the fp32/bf16 weights come from a memory-mapped
+    flat file shared by every worker on the host; the first load writes it.
+    """
+    if torch is None:
+        raise ImportError("torch and transformers are required to load models")
+    validate_precision(precision)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    dtype = torch.bfloat16 if precision == "bf16" else torch.float32
+
+    if precision in ("int8", "int4") and device.startswith("cuda") and BitsAndBytesConfig is not None:
+        config = BitsAndBytesConfig(load_in_8bit=precision == "int8", load_in_4bit=precision == "int4")
+        model = AutoModelForCausalLM.from_pretrained(name, quantization_config=config, device_map=device)
+        return model.eval(), tokenizer
+
+    if weights_path and os.path.exists(weights_path):
+        model = _load_mapped(name, weights_path, dtype).eval()
+    else:
+        model = AutoModelForCausalLM.from_pretrained(name, torch_dtype=dtype, low_cpu_mem_usage=True).eval()
+        if weights_path:
+            export_state_dict(model.state_dict(), weights_path, {"source": name, "dtype": str(dtype)})
+            model = _load_mapped(name, weights_path, dtype).eval()
+    if precision == "int8":
+        model = quantize_int8(model)
+    elif precision == "int4":
+        model = quantize_int4(model, group_size)
+    return model.to(device), tokenizer
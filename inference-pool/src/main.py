@@ -6,14 +6,25 @@ import json
 import time
 import logging
 import random
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Iterator
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.log import configure_logging, get_logger
+from common.tokenizer import get_token_counter
+from common.tracing import Tracer, current_span, extract, inject
+from admission import AdmissionController, AdmissionRejected
+from kv_cache import ContinuousBatcher, KVCacheExhausted, PagedKVCache
+from telemetry import ModelTelemetry, process_rss
+from loader import validate_precision
+from speculative import SpeculativeDecoder, SpeculativeStats, TransformersLM, autoregressive_generate
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+# Per-request events: sampled and rate limited, formatted off the request thread
+events = get_logger(__name__, sample_rates={"text_generated": 0.01, "batch_generated": 0.1})
 
 class InferencePool:
     """Simple Inference Pool implementation for testing purposes."""
@@ -21,11 +32,35 @@ class InferencePool:
     def __init__(self):
         self.port = int(os.getenv('INFERENCE_POOL_PORT', 8082))
         self.health_status = "healthy"
+        # Optional per-model keys: "hf_name" loads a real transformers model
+        # at "precision" (fp32/bf16/int8/int4, default INFERENCE_PRECISION);
+        # "weights_path" memory-maps its weights from a flat file shared by all
+        # workers; "draft_model" (+ "speculative_tokens") enables speculative decoding.
         self.models = {
             "gpt-3.5-turbo": {"loaded": True, "type": "language"},
             "gpt-4": {"loaded": True, "type": "language"},
             "claude-v1": {"loaded": True, "type": "language"}
         }
+        self.engines: Dict[str, Any] = {}
+        self.speculative_stats: Dict[str, SpeculativeStats] = {}
+        self.token_counter = get_token_counter()
+        # Loading can download vocabularies, so offline deployments keep it lazy
+        if os.getenv('TOKENIZER_PRELOAD', 'false').lower() == 'true':
+            self.token_counter.preload()
+        self.admission = AdmissionController()
+        self.kv_cache = PagedKVCache()
+        self.batcher = ContinuousBatcher(self.kv_cache)
+        self.telemetry: Dict[str, ModelTelemetry] = {}
+        self.tracer = Tracer("inference-pool")
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.responses = [
+            "This is a generated response from the inference pool.",
+            "The AI model has processed your request successfully.",
+            "Here's a thoughtful response to your prompt.",
+            "Based on the input, here's what the model generated.",
+            "The inference completed successfully with these results."
+        ]
         
     def health_check(self) -> Dict[str, Any]:
         """Health check endpoint."""
@@ -34,16 +69,56 @@ class InferencePool:
             "timestamp": int(time.time()),
             "service": "inference-pool",
             "version": "1.0.0",
-            "models_loaded": len([m for m in self.models.values() if m["loaded"]])
+            "models_loaded": len([m for m in self.models.values() if m["loaded"]]),
+            "in_flight": self.in_flight,
+            "queue_depth": self.admission.queue_depth,
+            "kv_cache": self.kv_cache.stats(),
+            "tokenizer_fallbacks": sorted(self.token_counter.fallbacks),
+            "models": self._model_status(),
+            "process": {"pid": os.getpid(), "rss_bytes": process_rss()}
         }
+
+    def _telemetry(self, model_id: str) -> ModelTelemetry:
+        telemetry = self.telemetry.get(model_id)
+        if telemetry is None:
+            telemetry = self.telemetry.setdefault(model_id, ModelTelemetry())
+        return telemetry
+
+    def _model_status(self) -> Dict[str, Dict[str, Any]]:
+        """Live load per loaded model, sampled without locking the request path."""
+        blocks = self.kv_cache.blocks_by_owner()
+        status = {}
+        for model_id, info in list(self.models.items()):
+            if not info["loaded"]:
+                continue
+            entry = self._telemetry(model_id).snapshot()
+            entry["kv_cache_blocks"] = blocks.get(model_id, 0)
+            entry["kv_cache_occupancy"] = round(entry["kv_cache_blocks"] / self.kv_cache.num_blocks, 4)
+            if "memory_bytes" in info:
+                entry["memory_bytes"] = info["memory_bytes"]
+            status[model_id] = entry
+        return status
     
-    def load_model(self, model_id: str) -> Dict[str, Any]:
-        """Load a model into memory."""
+    def load_model(self, model_id: str, precision: Optional[str] = None) -> Dict[str, Any]:
+        """Load a model into memory, optionally quantized."""
         try:
             if model_id in self.models:
-                self.models[model_id]["loaded"] = True
-                logger.info(f"Model loaded: {model_id}")
-                return {"message": f"Model {model_id} loaded successfully"}
+                info = self.models[model_id]
+                precision = validate_precision(
+                    precision or info.get("precision") or os.getenv('INFERENCE_PRECISION', 'fp32')
+                )
+                hf_name = info.get("hf_name")
+                if hf_name and (model_id not in self.engines or info.get("precision") != precision):
+                    engine = TransformersLM(hf_name, precision=precision, weights_path=info.get("weights_path"))
+                    self.engines[model_id] = engine
+                    info["memory_bytes"] = engine.memory_bytes
+                info["precision"] = precision
+                info["loaded"] = True
+                logger.info(f"Model loaded: {model_id} ({precision})")
+                result = {"message": f"Model {model_id} loaded successfully", "precision": precision}
+                if "memory_bytes" in info:
+                    result["memory_bytes"] = info["memory_bytes"]
+                return result
             else:
                 return {"error": f"Model {model_id} not found"}
         except Exception as e:
@@ -55,6 +130,8 @@ class InferencePool:
         try:
             if model_id in self.models:
                 self.models[model_id]["loaded"] = False
+                self.models[model_id].pop("memory_bytes", None)
+                self.engines.pop(model_id, None)
                 logger.info(f"Model unloaded: {model_id}")
                 return {"message": f"Model {model_id} unloaded successfully"}
             else:
@@ -63,41 +140,271 @@ class InferencePool:
             logger.error(f"Error unloading model: {e}")
             return {"error": str(e)}
     
-    def generate_text(self, model_id: str, prompt: str, max_tokens: int = 150) -> Dict[str, Any]:
-        """Generate text using the specified model."""
+    def generate_text(self, model_id: str, prompt: str, max_tokens: int = 150,
+                      tenant: str = "default", priority: str = "interactive",
+                      timeout: Optional[float] = None, temperature: float = 0.0,
+                      metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Generate text using the specified model.
+
+        ``metadata`` is the request's metadata map; trace context found in
+        it is continued and the response carries it back in ``metadata``.
+        """
+        with self.tracer.span("inference.generate_text", extract(metadata), model=model_id) as span:
+            result = self._generate_text(model_id, prompt, max_tokens, tenant, priority, timeout, temperature)
+            if "error" in result:
+                span.set_error(result["error"])
+            result["metadata"] = inject({}, span)
+            return result
+
+    def _generate_text(self, model_id: str, prompt: str, max_tokens: int, tenant: str, priority: str,
+                       timeout: Optional[float], temperature: float) -> Dict[str, Any]:
         try:
-            if model_id not in self.models:
-                return {"error": f"Model {model_id} not found"}
-            
-            if not self.models[model_id]["loaded"]:
-                return {"error": f"Model {model_id} is not loaded"}
-            
-            # Simulate inference time
-            inference_time = random.uniform(0.1, 0.5)
-            time.sleep(inference_time)
-            
-            # Generate mock response
-            responses = [
-                "This is a generated response from the inference pool.",
-                "The AI model has processed your request successfully.",
-                "Here's a thoughtful response to your prompt.",
-                "Based on the input, here's what the model generated.",
-                "The inference completed successfully with these results."
-            ]
-            
-            generated_text = random.choice(responses)
-            
-            logger.info(f"Text generated using {model_id}")
-            return {
+            error = self._check_model(model_id)
+            if error:
+                return {"error": error, "invalid_request": True}
+
+            telemetry = self._telemetry(model_id)
+            with telemetry.admitted(self.admission.slot(tenant, priority, timeout)) as queue_wait:
+                self._record_queue_wait(queue_wait, tenant, priority)
+                if model_id in self.engines:
+                    started = time.time()
+                    engine = self.engines[model_id]
+                    tokens = list(self._decode(model_id, prompt, max_tokens, temperature))
+                    generated_text = engine.decode(tokens)
+                    tokens_used = len(tokens)
+                    inference_time = time.time() - started
+                else:
+                    # Simulate inference time
+                    inference_time = random.uniform(0.1, 0.5)
+                    self._run(inference_time)
+                    generated_text = random.choice(self.responses)
+                    tokens_used = self.token_counter.count(model_id, generated_text)
+                    # Attribute the simulated time to prefill and decode by token share
+                    prompt_tokens = self.token_counter.count(model_id, prompt)
+                    prefill_time = inference_time * prompt_tokens / max(prompt_tokens + tokens_used, 1)
+                    self._record_phases(model_id, tokens_used, prefill_time, inference_time - prefill_time)
+
+            events.info("text_generated", model=model_id, tokens=tokens_used, inference_time=inference_time)
+            result = {
                 "model": model_id,
                 "generated_text": generated_text,
                 "inference_time": inference_time,
-                "tokens_used": len(generated_text.split())
+                "queue_wait": queue_wait,
+                "tokens_used": tokens_used
             }
+            if model_id in self.speculative_stats:
+                result["speculative"] = self.speculative_stats[model_id].to_dict()
+            return result
+        except AdmissionRejected as e:
+            return {"error": str(e), "rejected": e.reason}
         except Exception as e:
             logger.error(f"Error generating text: {e}")
             return {"error": str(e)}
     
+    def generate_batch(self, model_id: str, prompts: List[str], max_tokens: int = 150,
+                       tenant: str = "default") -> Dict[str, Any]:
+        """Generate text for several prompts in one batched forward pass.
+
+        Models with a registered engine decode each prompt through it;
+        the others are simulated on the continuous batcher.
+        """
+        try:
+            error = self._check_model(model_id)
+            if error:
+                return {"error": error, "invalid_request": True}
+
+            telemetry = self._telemetry(model_id)
+            schedule = None
+            if model_id in self.engines:
+                engine = self.engines[model_id]
+                with telemetry.admitted(self.admission.slot(tenant, "batch", cost=len(prompts))):
+                    started = time.time()
+                    outputs = [list(self._decode(model_id, prompt, max_tokens, 0.0)) for prompt in prompts]
+                    inference_time = time.time() - started
+                texts = [engine.decode(tokens) for tokens in outputs]
+                output_tokens = [len(tokens) for tokens in outputs]
+            else:
+                texts = [random.choice(self.responses) for _ in prompts]
+                output_tokens = [min(n, max_tokens) for n in self.token_counter.count_tokens(model_id, texts)]
+                prompt_tokens = self.token_counter.count_tokens(model_id, prompts)
+
+                step_times: List[float] = []
+
+                def step(running: List[int]) -> None:
+                    # One forward pass over the running sequences; each extra sequence adds a little work
+                    step_started = time.time()
+                    self._run(0.002 + 0.0005 * len(running))
+                    step_times.append(time.time() - step_started)
+
+                with telemetry.admitted(self.admission.slot(tenant, "batch", cost=len(prompts))):
+                    started = time.time()
+                    schedule = self.batcher.run(list(zip(prompt_tokens, output_tokens)), step, owner=model_id)
+                    inference_time = time.time() - started
+                prefill_time = step_times[0] if step_times else 0.0
+                self._record_phases(model_id, sum(output_tokens), prefill_time, inference_time - prefill_time,
+                                    schedule["mean_batch"])
+
+            results = [
+                {"generated_text": text, "tokens_used": tokens}
+                for text, tokens in zip(texts, output_tokens)
+            ]
+
+            events.info("batch_generated", model=model_id, prompts=len(prompts), inference_time=inference_time)
+            result = {
+                "model": model_id,
+                "results": results,
+                "batch_size": len(prompts),
+                "inference_time": inference_time
+            }
+            if schedule is not None:
+                result["schedule"] = schedule
+            return result
+        except AdmissionRejected as e:
+            return {"error": str(e), "rejected": e.reason}
+        except KVCacheExhausted as e:
+            return {"error": str(e), "rejected": "kv_cache"}
+        except Exception as e:
+            logger.error(f"Error generating batch: {e}")
+            return {"error": str(e)}
+
+    def generate_text_stream(self, model_id: str, prompt: str, max_tokens: int = 150,
+                             tenant: str = "default", priority: str = "interactive",
+                             timeout: Optional[float] = None, temperature: float = 0.0,
+                             metadata: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream generated text as ``{"text": delta}`` chunks, then a final chunk with usage."""
+        error = self._check_model(model_id)
+        if error:
+            yield {"error": error, "invalid_request": True}
+            return
+        telemetry = self._telemetry(model_id)
+        # Not made current: the generator may be resumed from other contexts
+        span = self.tracer.start_span("inference.generate_text_stream", extract(metadata), model=model_id)
+        try:
+            with telemetry.admitted(self.admission.slot(tenant, priority, timeout)) as queue_wait:
+                self._record_queue_wait(queue_wait, tenant, priority, span)
+                tokens_used = 0
+                if model_id in self.engines:
+                    tokens: List[int] = []
+                    decoded = self._decode(model_id, prompt, max_tokens, temperature, span)
+                    for delta in self._detokenize(self.engines[model_id], decoded, tokens):
+                        yield {"text": delta}
+                    tokens_used = len(tokens)
+                else:
+                    generated_text = random.choice(self.responses)
+                    started = time.monotonic()
+                    first = None
+                    for i, word in enumerate(generated_text.split(" ")):
+                        self._run(random.uniform(0.005, 0.02))
+                        if first is None:
+                            first = time.monotonic()
+                        yield {"text": word if i == 0 else " " + word}
+                    tokens_used = self.token_counter.count(model_id, generated_text)
+                    self._record_phases(model_id, tokens_used, first - started, time.monotonic() - first, parent=span)
+        except AdmissionRejected as e:
+            span.set_error(e)
+            yield {"error": str(e), "rejected": e.reason}
+            return
+        except Exception as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end()
+
+        final: Dict[str, Any] = {"finish_reason": "stop", "tokens_used": tokens_used,
+                                 "metadata": inject({}, span)}
+        if model_id in self.speculative_stats:
+            final["speculative"] = self.speculative_stats[model_id].to_dict()
+        yield final
+
+    @staticmethod
+    def _detokenize(engine: Any, decoded: Iterator[int], tokens: List[int]) -> Iterator[str]:
+        """Text deltas for a token stream, appending each token to ``tokens``.
+
+        Only the tokens since the last emitted delta (plus the chunk before
+        them, for context such as leading spaces) are re-decoded, so each
+        step costs O(1) rather than O(n). A delta ending in a partial
+        character is held back until the next token completes it.
+        """
+        prefix = read = 0
+        for token in decoded:
+            tokens.append(token)
+            before = engine.decode(tokens[prefix:read])
+            text = engine.decode(tokens[prefix:])
+            if len(text) > len(before) and not text.endswith("\ufffd"):
+                yield text[len(before):]
+                prefix, read = read, len(tokens)
+        before = engine.decode(tokens[prefix:read])
+        text = engine.decode(tokens[prefix:])
+        if len(text) > len(before):
+            yield text[len(before):]
+
+    def _check_model(self, model_id: str) -> Optional[str]:
+        if model_id not in self.models:
+            return f"Model {model_id} not found"
+        if not self.models[model_id]["loaded"]:
+            return f"Model {model_id} is not loaded"
+        return None
+
+    def _decode(self, model_id: str, prompt: str, max_tokens: int, temperature: float,
+                parent: Optional[Any] = None) -> Iterator[int]:
+        """Token ids from the model's engine, speculatively when a loaded draft model is configured."""
+        info = self.models[model_id]
+        target = self.engines[model_id]
+        draft_id = info.get("draft_model")
+        draft = self.engines.get(draft_id) if draft_id and self.models.get(draft_id, {}).get("loaded") else None
+        prompt_tokens = target.encode(prompt)
+        if draft is None:
+            tokens = autoregressive_generate(target, prompt_tokens, max_tokens, temperature)
+        else:
+            stats = self.speculative_stats.setdefault(model_id, SpeculativeStats())
+            decoder = SpeculativeDecoder(
+                target, draft, info.get("speculative_tokens", 4), temperature, stats
+            )
+            tokens = decoder.generate(prompt_tokens, max_tokens)
+        with self._in_flight_lock:
+            self.in_flight += 1
+        # Time to the first token is reported as prefill, the rest as decode
+        started = time.monotonic()
+        first = None
+        count = 0
+        try:
+            for token in tokens:
+                if first is None:
+                    first = time.monotonic()
+                count += 1
+                yield token
+        finally:
+            ended = time.monotonic()
+            first = first or ended
+            self._record_phases(model_id, count, first - started, ended - first, parent=parent)
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
+    def _record_queue_wait(self, queue_wait: float, tenant: str, priority: str, parent: Optional[Any] = None) -> None:
+        span = parent or current_span()
+        if span is not None and span.recording:
+            self.tracer.record("queue", time.time() - queue_wait, queue_wait, span, tenant=tenant, priority=priority)
+
+    def _record_phases(self, model_id: str, tokens: int, prefill_time: float, decode_time: float,
+                       batch_size: float = 1, parent: Optional[Any] = None) -> None:
+        """Per-model telemetry, plus prefill and decode spans ending now when the request is traced."""
+        self._telemetry(model_id).record(tokens, prefill_time, decode_time, batch_size)
+        span = parent or current_span()
+        if span is not None and span.recording:
+            ended = time.time()
+            self.tracer.record("prefill", ended - decode_time - prefill_time, prefill_time, span)
+            self.tracer.record("decode", ended - decode_time, decode_time, span, tokens=tokens)
+
+    def _run(self, inference_time: float) -> None:
+        """Occupy the pool for one inference call, counted in ``in_flight``."""
+        with self._in_flight_lock:
+            self.in_flight += 1
+        try:
+            time.sleep(inference_time)
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
     def list_models(self) -> Dict[str, Any]:
         """List available models."""
         return {
@@ -105,7 +412,8 @@ class InferencePool:
                 {
                     "id": model_id,
                     "type": info["type"],
-                    "loaded": info["loaded"]
+                    "loaded": info["loaded"],
+                    **{k: info[k] for k in ("precision", "memory_bytes") if k in info}
                 }
                 for model_id, info in self.models.items()
             ]
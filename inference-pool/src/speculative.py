@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import random
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Iterator
+
+try:
+    import torch
+except ImportError:  # pragma: no cover - optional dependency
+    torch = None
+
+from loader import load_causal_lm, model_footprint
+
+logger = logging.getLogger(__name__)
+
+# A language model here is any object with:
+#   forward(tokens, start) -> the next-token distributions for positions start..len(tokens)-1
+#   encode(text) -> List[int], decode(tokens) -> str, eos_token_id (or None)
+# Distributions may be lists of floats or 1-D torch tensors.
+
+
+def _crop_cache(past: Any, length: int) -> Any:
+    """Keep the first ``length`` positions of a KV cache (DynamicCache or legacy tuples)."""
+    if hasattr(past, "crop"):
+        past.crop(length)
+        return past
+    return tuple(tuple(t[:, :, :length] for t in layer) for layer in past)
+
+
+class TransformersLM:
+    """Causal LM from Hugging Face transformers, run on CPU by default.
+
+    The KV cache of the last call is kept, so a call that extends (or
+    shares a prefix with) the previous sequence only runs the new tokens;
+    rejected speculative tokens are cropped off the cache.
+    """
+
+    def __init__(self, name: str, device: str = "cpu", precision: str = "fp32",
+                 weights_path: Optional[str] = None):
+        self.name = name
+        self.device = device
+        self.precision = precision
+        self.model, self.tokenizer = load_causal_lm(name, precision, device, weights_path=weights_path)
+        self.memory_bytes = model_footprint(self.model)
+        self.eos_token_id = self.tokenizer.eos_token_id
+        self._cached_tokens: List[int] = []
+        self._past: Any = None
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> List[int]:
+        # An empty prompt is generated from BOS, as for unconditional sampling.
+        tokens = self.tokenizer.encode(text)
+        if not tokens and self.tokenizer.bos_token_id is not None:
+            tokens = [self.tokenizer.bos_token_id]
+        return tokens
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return self.tokenizer.decode(list(tokens), skip_special_tokens=True)
+
+    def forward(self, tokens: Sequence[int], start: int = 0) -> Any:
+        tokens = list(tokens)
+        if not tokens or not 0 <= start < len(tokens):
+            raise ValueError(f"Cannot score position {start} of {len(tokens)} tokens")
+        with self._lock, torch.no_grad():
+            reuse = 0
+            if self._past is not None:
+                limit = min(len(self._cached_tokens), start)
+                while reuse < limit and self._cached_tokens[reuse] == tokens[reuse]:
+                    reuse += 1
+            past = _crop_cache(self._past, reuse) if reuse else None
+            input_ids = torch.tensor([tokens[reuse:]], device=self.device)
+            output = self.model(input_ids, past_key_values=past, use_cache=True)
+            self._past, self._cached_tokens = output.past_key_values, tokens
+            logits = output.logits[0, start - reuse:]
+            return torch.softmax(logits.float(), dim=-1)
+
+
+def _is_tensor(probs: Any) -> bool:
+    return torch is not None and isinstance(probs, torch.Tensor)
+
+
+def _argmax(probs: Any) -> int:
+    if _is_tensor(probs):
+        return int(torch.argmax(probs))
+    return max(range(len(probs)), key=probs.__getitem__)
+
+
+def _sample(probs: Any, rng: random.Random) -> int:
+    if _is_tensor(probs):
+        cdf = torch.cumsum(probs.double(), dim=0)
+        index = int(torch.searchsorted(cdf, rng.random() * float(cdf[-1])))
+        return min(index, len(probs) - 1)
+    return rng.choices(range(len(probs)), weights=probs)[0]
+
+
+def _adjust(probs: Any, temperature: float) -> Any:
+    """Re-temper a probability distribution (``temperature`` > 0)."""
+    if temperature == 1.0:
+        return probs
+    if _is_tensor(probs):
+        scaled = probs.pow(1.0 / temperature)
+        total = float(scaled.sum())
+        return scaled / total if total else probs
+    scaled = [p ** (1.0 / temperature) if p > 0 else 0.0 for p in probs]
+    total = sum(scaled)
+    return [p / total for p in scaled] if total else list(probs)
+
+
+def _residual(p: Any, q: Any) -> Optional[Any]:
+    """max(p - q, 0), or None when the target puts no mass beyond the draft."""
+    if _is_tensor(p):
+        residual = (p - q).clamp(min=0.0)
+        return residual if float(residual.sum()) > 0 else None
+    residual = [max(pt - qt, 0.0) for pt, qt in zip(p, q)]
+    return residual if sum(residual) > 0 else None
+
+
+class SpeculativeStats:
+    """Acceptance counters for one draft/target pair."""
+
+    def __init__(self):
+        self.proposed = 0
+        self.accepted = 0
+        self.target_passes = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, proposed: int, accepted: int, emitted: int) -> None:
+        with self._lock:
+            self.proposed += proposed
+            self.accepted += accepted
+            self.target_passes += 1
+            self.tokens += emitted
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.proposed if self.proposed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "acceptance_rate": round(self.acceptance_rate, 4),
+            "target_passes": self.target_passes,
+            "tokens_per_pass": round(self.tokens / self.target_passes, 4) if self.target_passes else 0.0,
+        }
+
+
+class SpeculativeDecoder:
+    """Draft-then-verify decoding for a target model.
+
+    Each step the draft model proposes ``num_speculative_tokens`` tokens
+    autoregressively; the target scores the context plus all proposals in
+    one forward pass. Proposals are accepted left to right (exact match
+    with the target's argmax when greedy, otherwise the min(1, p/q)
+    rejection rule, which preserves the target's sampling distribution);
+    the first rejection is replaced by a token from the target and, if
+    every proposal is accepted, the target's next token is appended for
+    free. Output therefore matches what the target alone would produce.
+    The draft must share the target's tokenizer.
+    """
+
+    def __init__(self, target: Any, draft: Any, num_speculative_tokens: int = 4,
+                 temperature: float = 0.0, stats: Optional[SpeculativeStats] = None,
+                 seed: Optional[int] = None):
+        self.target = target
+        self.draft = draft
+        self.num_speculative_tokens = max(1, num_speculative_tokens)
+        self.temperature = temperature
+        self.stats = stats or SpeculativeStats()
+        self.rng = random.Random(seed)
+
+    def _pick(self, probs: Sequence[float]) -> int:
+        return _argmax(probs) if self.temperature == 0 else _sample(probs, self.rng)
+
+    def generate(self, tokens: Sequence[int], max_tokens: int) -> Iterator[int]:
+        """Yield new tokens as each verification step accepts them."""
+        context = list(tokens)
+        if not context:
+            raise ValueError("Speculative decoding needs at least one prompt token")
+        eos = getattr(self.target, "eos_token_id", None)
+        produced = 0
+        while produced < max_tokens:
+            k = min(self.num_speculative_tokens, max_tokens - produced)
+
+            proposals: List[int] = []
+            draft_probs: List[Any] = []
+            for _ in range(k):
+                sequence = context + proposals
+                probs = self.draft.forward(sequence, len(sequence) - 1)[0]
+                if self.temperature:
+                    probs = _adjust(probs, self.temperature)
+                token = self._pick(probs)
+                proposals.append(token)
+                draft_probs.append(probs)
+                if token == eos:
+                    break
+
+            # One target pass scores the next token after every proposal prefix.
+            target_probs = self.target.forward(context + proposals, len(context) - 1)
+            if self.temperature:
+                target_probs = [_adjust(p, self.temperature) for p in target_probs]
+
+            accepted: List[int] = []
+            correction: Optional[int] = None
+            for i, token in enumerate(proposals):
+                p = target_probs[i]
+                if self.temperature == 0:
+                    ok = token == _argmax(p)
+                else:
+                    q = float(draft_probs[i][token])
+                    ok = q > 0 and self.rng.random() < min(1.0, float(p[token]) / q)
+                if ok:
+                    accepted.append(token)
+                    continue
+                if self.temperature == 0:
+                    correction = _argmax(p)
+                else:
+                    residual = _residual(p, draft_probs[i])
+                    correction = _sample(residual if residual is not None else p, self.rng)
+                break
+            else:
+                if not (accepted and accepted[-1] == eos):
+                    correction = self._pick(target_probs[len(proposals)])
+
+            emitted = accepted + ([correction] if correction is not None else [])
+            emitted = emitted[:max_tokens - produced]
+            self.stats.record(len(proposals), len(accepted), len(emitted))
+            for token in emitted:
+                yield token
+                produced += 1
+                context.append(token)
+                if token == eos:
+                    return
+
+
+def autoregressive_generate(model: Any, tokens: Sequence[int], max_tokens: int,
+                    temperature: float = 0.0, rng: Optional[random.Random] = None) -> Iterator[int]:
+    """Plain autoregressive decoding, one target pass per token."""
+    context = list(tokens)
+    if not context:
+        raise ValueError("Decoding needs at least one prompt token")
+    eos = getattr(model, "eos_token_id", None)
+    rng = rng or random.Random()
+    for _ in range(max_tokens):
+        probs = model.forward(context, len(context) - 1)[0]
+        token = _argmax(probs) if temperature == 0 else _sample(_adjust(probs, temperature), rng)
+        yield token
+        context.append(token)
+        if token == eos:
+            return
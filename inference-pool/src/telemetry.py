@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import resource
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # pragma: no cover - non-POSIX
+    _PAGE_SIZE = 4096
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class ModelTelemetry:
+    """Live load signals for one model.
+
+    The hot path never takes a lock: in-flight and queued requests are
+    members of sets (``add``/``discard`` are atomic under the GIL) and
+    each finished request appends one tuple to a bounded deque. Readers
+    copy the deque and aggregate the last ``window`` seconds, so a
+    snapshot costs the reader, not the requests being measured.
+    """
+
+    def __init__(self, window: float = 60.0, max_events: int = 4096):
+        self.window = window
+        self.active: set = set()
+        self.waiting: set = set()
+        # (finished_at, tokens, prefill_seconds, decode_seconds, batch_size)
+        self._events: deque = deque(maxlen=max_events)
+
+    @contextmanager
+    def admitted(self, slot: Any) -> Iterator[Any]:
+        """Wrap an admission slot: queued until it is granted, then in flight."""
+        token = object()
+        self.waiting.add(token)
+        try:
+            with slot as value:
+                self.waiting.discard(token)
+                self.active.add(token)
+                yield value
+        finally:
+            self.waiting.discard(token)
+            self.active.discard(token)
+
+    def record(self, tokens: int, prefill_time: float, decode_time: float, batch_size: float = 1) -> None:
+        self._events.append((time.monotonic(), tokens, prefill_time, decode_time, batch_size))
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        events = [e for e in self._events.copy() if now - e[0] <= self.window]
+        count = len(events)
+        tokens = sum(e[1] for e in events)
+        # Measure throughput over the time actually covered, not the whole window.
+        span = min(self.window, now - min((e[0] - e[2] - e[3] for e in events), default=now))
+        return {
+            "in_flight": len(self.active),
+            "queue_depth": len(self.waiting),
+            "requests": count,
+            "tokens_per_second": round(tokens / span, 2) if span > 0 else 0.0,
+            "avg_batch_size": round(sum(e[4] for e in events) / count, 2) if count else 0.0,
+            "avg_prefill_time": round(sum(e[2] for e in events) / count, 6) if count else 0.0,
+            "avg_decode_time": round(sum(e[3] for e in events) / count, 6) if count else 0.0,
+        }
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import mmap
+import struct
+import logging
+import warnings
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+try:
+    import torch
+except ImportError:  # pragma: no cover - optional dependency
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+# safetensors dtype -> (memoryview format or None, bytes per element)
+DTYPES = {
+    "F64": ("d", 8), "F32": ("f", 4), "F16": ("e", 2), "BF16": (None, 2),
+    "I64": ("q", 8), "I32": ("i", 4), "I16": ("h", 2), "I8": ("b", 1),
+    "U8": ("B", 1), "BOOL": ("?", 1),
+}
+
+TORCH_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8",
+    "U8": "uint8", "BOOL": "bool",
+}
+
+# A tensor to write: (dtype, shape, raw little-endian bytes)
+RawTensor = Tuple[str, Sequence[int], Union[bytes, bytearray, memoryview]]
+
+
+def _numel(shape: Sequence[int]) -> int:
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
+
+
+def save_file(tensors: Dict[str, RawTensor], path: str,
+              metadata: Optional[Dict[str, str]] = None) -> None:
+    """Write tensors as one flat safetensors file.
+
+    Layout: 8-byte little-endian header length, a JSON header mapping each
+    name to its dtype, shape and byte range, then the raw data. Tensors are
+    ordered by element size so every one starts aligned. The file is
+    written to a temporary name and renamed, so readers never map a
+    partial file.
+    """
+    header: Dict[str, Any] = {}
+    if metadata:
+        header["__metadata__"] = metadata
+    order = sorted(tensors, key=lambda name: (-DTYPES[tensors[name][0]][1], name))
+    offset = 0
+    for name in order:
+        dtype, shape, data = tensors[name]
+        size = len(memoryview(data).cast("B"))
+        if size != _numel(shape) * DTYPES[dtype][1]:
+            raise ValueError(f"Tensor {name}: {size} bytes does not match {dtype}{list(shape)}")
+        header[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + size]}
+        offset += size
+
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    encoded += b" " * (-(8 + len(encoded)) % 8)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for name in order:
+            f.write(tensors[name][2])
+    os.replace(tmp, path)
+
+
+class MappedWeights:
+    """Read-only, memory-mapped view of a safetensors file.
+
+    Opening parses only the header; tensor data is never copied. Every
+    tensor is a view into one shared ``mmap`` of the file, so pages are
+    faulted in lazily on first touch and processes mapping the same file
+    share the page cache instead of each holding a private copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        if len(self._mmap) < 8:
+            self.close()
+            raise ValueError(f"{path} is not a safetensors file")
+        (header_len,) = struct.unpack("<Q", self._mmap[:8])
+        if 8 + header_len > len(self._mmap):
+            self.close()
+            raise ValueError(f"{path} has a truncated header")
+        header = json.loads(self._mmap[8:8 + header_len])
+        self.metadata: Dict[str, str] = header.pop("__metadata__", {}) or {}
+        self.tensors: Dict[str, Dict[str, Any]] = header
+        self._data_start = 8 + header_len
+        self._view = memoryview(self._mmap)
+        data_len = len(self._mmap) - self._data_start
+        for name, info in self.tensors.items():
+            start, end = info["data_offsets"]
+            if end > data_len or end - start != _numel(info["shape"]) * DTYPES[info["dtype"]][1]:
+                self.close()
+                raise ValueError(f"Tensor {name} in {path} has invalid offsets")
+
+    def names(self) -> List[str]:
+        return list(self.tensors)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(end - start for start, end in (i["data_offsets"] for i in self.tensors.values()))
+
+    def buffer(self, name: str) -> memoryview:
+        """Zero-copy bytes of ``name``."""
+        start, end = self.tensors[name]["data_offsets"]
+        return self._view[self._data_start + start:self._data_start + end]
+
+    def array(self, name: str) -> memoryview:
+        """Zero-copy typed view of ``name`` (raw bytes for dtypes Python cannot cast, e.g. BF16)."""
+        info = self.tensors[name]
+        fmt = DTYPES[info["dtype"]][0]
+        view = self.buffer(name)
+        if fmt is None:
+            return view
+        shape = info["shape"]
+        return view.cast(fmt, shape) if shape else view.cast(fmt)
+
+    def tensor(self, name: str) -> Any:
+        """Zero-copy torch tensor backed by the mapping."""
+        if torch is None:
+            raise ImportError("torch is required for MappedWeights.tensor")
+        info = self.tensors[name]
+        dtype = getattr(torch, TORCH_DTYPES[info["dtype"]])
+        if _numel(info["shape"]) == 0:
+            return torch.empty(info["shape"], dtype=dtype)
+        with warnings.catch_warnings():
+            # The mapping is read-only by design; torch warns about non-writable buffers.
+            warnings.simplefilter("ignore", UserWarning)
+            return torch.frombuffer(self.buffer(name), dtype=dtype).view(info["shape"])
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {name: self.tensor(name) for name in self.tensors}
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Tensors still reference the mapping; it is unmapped when they go away.
+                pass
+        self._file.close()
+
+    def __enter__(self) -> "MappedWeights":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def export_state_dict(state_dict: Dict[str, Any], path: str,
+                      metadata: Optional[Dict[str, str]] = None) -> None:
+    """Write a torch ``state_dict`` as a flat file for ``MappedWeights``."""
+    names = {v: k for k, v in TORCH_DTYPES.items()}
+    tensors: Dict[str, RawTensor] = {}
+    seen: Dict[Tuple[int, int], str] = {}
+    for name, value in state_dict.items():
+        key = (value.data_ptr(), value.numel())
+        if key in seen:
+            # Tied weights are stored once; loaders re-tie them.
+            continue
+        seen[key] = name
+        dtype = names[str(value.dtype).replace("torch.", "")]
+        raw = value.detach().contiguous().cpu().view(torch.uint8).numpy().tobytes()
+        tensors[name] = (dtype, list(value.shape), raw)
+    save_file(tensors, path, metadata)
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import queue
+import struct
+import logging
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_WRAP = 0xFFFFFFFF
+_LEN = struct.Struct("<I")
+_POS = struct.Struct("<Q")
+# head and tail counters live on separate cache lines ahead of the data.
+_HEAD_OFFSET, _TAIL_OFFSET, _DATA_OFFSET = 0, 64, 128
+
+
+class RingFull(Exception):
+    """The consumer has not kept up and the ring has no room for the message."""
+
+
+class ShmRing:
+    """Single-producer/single-consumer byte ring in shared memory.
+
+    ``head`` and ``tail`` are monotonically increasing byte counters; only
+    the consumer writes ``head`` and only the producer writes ``tail``, so
+    no lock is needed. Messages are length-prefixed and never split: a
+    message that does not fit before the end of the buffer is preceded by
+    a wrap marker and written at the start.
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 1 << 20, create: bool = False):
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_DATA_OFFSET + capacity)
+            self.shm.buf[:_DATA_OFFSET] = bytes(_DATA_OFFSET)
+        else:
+            # Workers share the supervisor's resource tracker, so attaching
+            # does not hand the segment's lifetime to them.
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = self.shm.size - _DATA_OFFSET
+        self.owner = create
+
+    def _get(self, offset: int) -> int:
+        return _POS.unpack_from(self.shm.buf, offset)[0]
+
+    def _set(self, offset: int, value: int) -> None:
+        _POS.pack_into(self.shm.buf, offset, value)
+
+    def put(self, payload: bytes) -> None:
+        need = _LEN.size + len(payload)
+        if need > self.capacity // 2:
+            raise ValueError(f"Message of {len(payload)} bytes exceeds ring capacity")
+        head, tail = self._get(_HEAD_OFFSET), self._get(_TAIL_OFFSET)
+        offset = tail % self.capacity
+        skip = self.capacity - offset if offset + need > self.capacity else 0
+        if self.capacity - (tail - head) < skip + need:
+            raise RingFull()
+        buf = self.shm.buf
+        if skip:
+            if skip >= _LEN.size:
+                _LEN.pack_into(buf, _DATA_OFFSET + offset, _WRAP)
+            tail += skip
+            offset = 0
+        start = _DATA_OFFSET + offset
+        _LEN.pack_into(buf, start, len(payload))
+        buf[start + _LEN.size:start + need] = payload
+        # Publish only after the message bytes are in place.
+        self._set(_TAIL_OFFSET, tail + need)
+
+    def put_blocking(self, payload: bytes, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.00005
+        while True:
+            try:
+                return self.put(payload)
+            except RingFull:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 0.001)
+
+    def get(self) -> Optional[bytes]:
+        """Next message, or ``None`` if the ring is empty."""
+        head, tail = self._get(_HEAD_OFFSET), self._get(_TAIL_OFFSET)
+        while head < tail:
+            offset = head % self.capacity
+            remaining = self.capacity - offset
+            if remaining < _LEN.size:
+                head += remaining
+                continue
+            (length,) = _LEN.unpack_from(self.shm.buf, _DATA_OFFSET + offset)
+            if length == _WRAP:
+                head += remaining
+                continue
+            start = _DATA_OFFSET + offset + _LEN.size
+            payload = bytes(self.shm.buf[start:start + length])
+            self._set(_HEAD_OFFSET, head + _LEN.size + length)
+            return payload
+        if head != self._get(_HEAD_OFFSET):
+            self._set(_HEAD_OFFSET, head)
+        return None
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def numa_nodes() -> List[List[int]]:
+    """CPU lists per NUMA node from sysfs (one node with every CPU when unavailable)."""
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        with open(path) as f:
+            cpus: List[int] = []
+            for part in f.read().strip().split(","):
+                if "-" in part:
+                    lo, hi = part.split("-")
+                    cpus.extend(range(int(lo), int(hi) + 1))
+                elif part:
+                    cpus.append(int(part))
+        if cpus:
+            nodes.append(cpus)
+    if not nodes:
+        nodes = [sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))]
+    return nodes
+
+
+def cpu_sets(num_workers: int, mode: Optional[str]) -> List[Optional[List[int]]]:
+    """CPUs for each worker: one core each ("core"), a whole node each ("numa"), or unpinned."""
+    if mode is None or not hasattr(os, "sched_setaffinity"):
+        return [None] * num_workers
+    allowed = set(os.sched_getaffinity(0))
+    nodes = [[c for c in node if c in allowed] for node in numa_nodes()]
+    nodes = [node for node in nodes if node] or [sorted(allowed)]
+    if mode == "numa":
+        return [nodes[i % len(nodes)] for i in range(num_workers)]
+    cores = [c for node in nodes for c in node]
+    return [[cores[i % len(cores)]] for i in range(num_workers)]
+
+
+def inference_pool_factory() -> Any:
+    """Default engine: an ``InferencePool`` built inside the worker process."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main import InferencePool
+    return InferencePool()
+
+
+def _send(ring: ShmRing, frame: Dict[str, Any], timeout: Optional[float] = None) -> None:
+    ring.put_blocking(json.dumps(frame, separators=(",", ":")).encode("utf-8"), timeout)
+
+
+def _worker_main(requests_name: str, responses_name: str, factory: Callable[[], Any],
+                 cpus: Optional[List[int]]) -> None:
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    requests = ShmRing(requests_name)
+    responses = ShmRing(responses_name)
+    engine = factory()
+    delay = 0.00005
+    while True:
+        raw = requests.get()
+        if raw is None:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+            continue
+        delay = 0.00005
+        try:
+            message = json.loads(raw)
+            op, rid = message["op"], message.get("id")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Dropping malformed request frame of {len(raw)} bytes: {e}")
+            continue
+        if op == "stop":
+            break
+        try:
+            if op == "stream":
+                for chunk in engine.generate_text_stream(**message["args"]):
+                    _send(responses, {"id": rid, **chunk})
+                _send(responses, {"id": rid, "done": True})
+            else:
+                result = getattr(engine, op)(**message["args"])
+                _send(responses, {"id": rid, "result": result, "done": True})
+        except Exception as e:
+            _send(responses, {"id": rid, "error": str(e), "done": True})
+    requests.close()
+    responses.close()
+
+
+class _Request:
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.frames: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.delivered = 0
+        self.attempts = 0
+        self.worker: Optional["_Worker"] = None
+
+    def fail(self, error: str) -> None:
+        self.frames.put({"id": self.message["id"], "error": error, "done": True})
+
+
+class _Worker:
+    def __init__(self, index: int, cpus: Optional[List[int]]):
+        self.index = index
+        self.cpus = cpus
+        self.process: Optional[multiprocessing.Process] = None
+        self.requests: Optional[ShmRing] = None
+        self.responses: Optional[ShmRing] = None
+        self.outstanding: Dict[str, _Request] = {}
+        self.restarts = 0
+        # The request ring has one producer at a time: whoever holds send_lock.
+        self.send_lock = threading.Lock()
+        self.started_at = 0.0
+        self.crashes = 0
+        self.down = False
+        self.retired = False
+        self.respawn_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return not self.down and self.process is not None and self.process.is_alive()
+
+
+class WorkerPool:
+    """Supervisor running inference in ``num_workers`` processes.
+
+    Each worker builds its own engine (an ``InferencePool`` by default), is
+    pinned to a core or NUMA node, and talks to the supervisor over two
+    shared-memory rings: requests in, JSON-framed token chunks out, with
+    no pickling on the hot path. Callers take a per-worker lock to write
+    the request ring, which is single-producer. A collector thread routes
+    frames to callers and watches the processes. When a worker crashes,
+    its requests that had not produced output yet are retried on another
+    worker, and the rest fail with an error chunk. The worker is respawned
+    with fresh rings after an exponential backoff (``restart_backoff``
+    doubling up to ``max_backoff``). After ``max_restarts`` crashes with
+    no ``stable_after`` seconds of uptime between them, the worker is
+    retired. A caller waiting more than ``response_timeout`` seconds for
+    the next frame gets an error. Exposes the same calls as
+    ``InferencePool``, so it can sit behind the gateway router as a
+    replica.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None,
+                 engine_factory: Callable[[], Any] = inference_pool_factory,
+                 ring_bytes: int = 1 << 20, pin: Optional[str] = "core",
+                 start_method: Optional[str] = None, max_attempts: int = 2,
+                 restart_backoff: float = 0.1, max_backoff: float = 30.0, max_restarts: int = 5,
+                 stable_after: float = 60.0, response_timeout: Optional[float] = None):
+        self.num_workers = num_workers or int(os.getenv('INFERENCE_WORKERS', os.cpu_count() or 1))
+        self.engine_factory = engine_factory
+        self.ring_bytes = ring_bytes
+        self.max_attempts = max_attempts
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.stable_after = stable_after
+        self.response_timeout = response_timeout or float(os.getenv('INFERENCE_WORKER_TIMEOUT', 300))
+        self.context = multiprocessing.get_context(
+            start_method or os.getenv('INFERENCE_WORKER_START_METHOD', 'spawn')
+        )
+        self.workers = [_Worker(i, cpus) for i, cpus in enumerate(cpu_sets(self.num_workers, pin))]
+        self._ids = itertools.count()
+        self._turns = itertools.count()
+        self._prefix = f"hf{os.getpid()}{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._collector: Optional[threading.Thread] = None
+
+    def start(self) -> "WorkerPool":
+        for worker in self.workers:
+            self._spawn(worker)
+        self._collector = threading.Thread(target=self._collect, name="worker-collector", daemon=True)
+        self._collector.start()
+        return self
+
+    def _spawn(self, worker: _Worker) -> None:
+        generation = worker.restarts
+        worker.requests = ShmRing(f"{self._prefix}-{worker.index}-{generation}-in", self.ring_bytes, create=True)
+        worker.responses = ShmRing(f"{self._prefix}-{worker.index}-{generation}-out", self.ring_bytes, create=True)
+        worker.process = self.context.Process(
+            target=_worker_main,
+            args=(worker.requests.name, worker.responses.name, self.engine_factory, worker.cpus),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.down = False
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                try:
+                    with worker.send_lock:
+                        _send(worker.requests, {"op": "stop"}, timeout)
+                except Exception:
+                    worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout)
+        for worker in self.workers:
+            with worker.send_lock:
+                for ring in (worker.requests, worker.responses):
+                    if ring is not None:
+                        ring.close()
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _submit(self, request: _Request, exclude: Optional[_Worker] = None) -> None:
+        rid = request.message["id"]
+        with self._lock:
+            usable = [w for w in self.workers if not w.retired and w is not exclude]
+            # Workers waiting out a restart backoff take requests only when no other worker is up.
+            candidates = [w for w in usable if w.alive] or usable
+            if not candidates:
+                request.fail("No inference workers available")
+                return
+            # Ties rotate so idle workers share the load.
+            turn = next(self._turns)
+            worker = min(candidates, key=lambda w: (len(w.outstanding), (w.index - turn) % self.num_workers))
+            worker.outstanding[rid] = request
+            request.worker = worker
+            request.attempts += 1
+        with worker.send_lock:
+            # A restart that ran in between has already retried or failed the request.
+            if worker.outstanding.get(rid) is not request or worker.down:
+                return
+            try:
+                _send(worker.requests, request.message, self.response_timeout)
+            except (RingFull, ValueError) as e:
+                with self._lock:
+                    worker.outstanding.pop(rid, None)
+                request.fail(f"Could not reach inference worker: {e or 'request ring full'}")
+
+    def _call(self, op: str, args: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        request = _Request({"id": f"r{next(self._ids)}", "op": op, "args": args})
+        self._submit(request)
+        while True:
+            try:
+                frame = request.frames.get(timeout=self.response_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if request.worker is not None:
+                        request.worker.outstanding.pop(request.message["id"], None)
+                yield {"error": f"Inference worker did not respond within {self.response_timeout:g}s"}
+                return
+            if frame.get("done"):
+                if "error" in frame:
+                    yield {"error": frame["error"]}
+                elif "result" in frame:
+                    yield frame["result"]
+                return
+            yield frame
+
+    def generate_text_stream(self, model_id: str, prompt: str, max_tokens: int = 150,
+                             **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream chunks from a worker's ``generate_text_stream``."""
+        args = {"model_id": model_id, "prompt": prompt, "max_tokens": max_tokens, **kwargs}
+        for frame in self._call("stream", args):
+            frame.pop("id", None)
+            yield frame
+
+    def generate_text(self, model_id: str, prompt: str, max_tokens: int = 150, **kwargs) -> Dict[str, Any]:
+        """Run a generation on a worker and collect its stream into one result."""
+        started = time.time()
+        parts: List[str] = []
+        result: Dict[str, Any] = {"model": model_id}
+        for chunk in self.generate_text_stream(model_id, prompt, max_tokens, **kwargs):
+            if "error" in chunk:
+                return chunk
+            if "text" in chunk:
+                parts.append(chunk["text"])
+            else:
+                result.update(chunk)
+        result["generated_text"] = "".join(parts)
+        result["inference_time"] = time.time() - started
+        return result
+
+    def list_models(self) -> Dict[str, Any]:
+        return next(self._call("list_models", {}))
+
+    def health_check(self) -> Dict[str, Any]:
+        workers = [
+            {
+                "index": w.index,
+                "pid": w.process.pid if w.process is not None else None,
+                "alive": w.process is not None and w.process.is_alive(),
+                "cpus": w.cpus,
+                "outstanding": len(w.outstanding),
+                "restarts": w.restarts,
+                "retired": w.retired,
+            }
+            for w in self.workers
+        ]
+        alive = sum(1 for w in workers if w["alive"])
+        return {
+            "status": "healthy" if alive else "unhealthy",
+            "timestamp": int(time.time()),
+            "service": "inference-pool",
+            "workers": workers,
+            "in_flight": sum(w["outstanding"] for w in workers),
+            "queue_depth": 0,
+        }
+
+    def _collect(self) -> None:
+        delay = 0.00005
+        last_check = 0.0
+        while not self._stopping.is_set():
+            busy = False
+            for worker in self.workers:
+                busy = self._drain(worker) or busy
+            now = time.monotonic()
+            if now - last_check > 0.05:
+                last_check = now
+                for worker in self.workers:
+                    if worker.retired or worker.process is None:
+                        continue
+                    if not worker.down and not worker.process.is_alive():
+                        self._fail_over(worker, now)
+                    elif worker.down and now >= worker.respawn_at:
+                        self._respawn(worker)
+            if busy:
+                delay = 0.00005
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.001)
+
+    def _drain(self, worker: _Worker) -> bool:
+        """Deliver every frame waiting in the worker's response ring."""
+        ring = worker.responses
+        drained = False
+        while ring is not None:
+            raw = ring.get()
+            if raw is None:
+                break
+            drained = True
+            try:
+                frame = json.loads(raw)
+            except ValueError as e:
+                logger.error(f"Dropping malformed frame from inference worker {worker.index}: {e}")
+                continue
+            self._deliver(worker, frame)
+        return drained
+
+    def _deliver(self, worker: _Worker, frame: Dict[str, Any]) -> None:
+        with self._lock:
+            request = worker.outstanding.get(frame.get("id"))
+            if request is not None and frame.get("done"):
+                del worker.outstanding[frame["id"]]
+        if request is not None:
+            request.delivered += 1
+            request.frames.put(frame)
+
+    def _fail_over(self, worker: _Worker, now: float) -> None:
+        """Handle a dead worker: retry or fail its requests and schedule the respawn."""
+        if self._stopping.is_set():
+            return
+        # Frames the worker published before dying still count.
+        self._drain(worker)
+        with worker.send_lock, self._lock:
+            worker.down = True
+            orphaned = list(worker.outstanding.values())
+            worker.outstanding.clear()
+        if now - worker.started_at >= self.stable_after:
+            worker.crashes = 0
+        worker.crashes += 1
+        if worker.crashes > self.max_restarts:
+            worker.retired = True
+            logger.error(f"Inference worker {worker.index} crashed {worker.crashes} times in a row; not restarting")
+        else:
+            backoff = min(self.restart_backoff * 2 ** (worker.crashes - 1), self.max_backoff)
+            worker.respawn_at = now + backoff
+            logger.error(f"Inference worker {worker.index} exited with {worker.process.exitcode}; "
+                         f"restarting in {backoff:.2f}s")
+        for request in orphaned:
+            if request.delivered == 0 and request.attempts < self.max_attempts:
+                self._submit(request, exclude=worker if self.num_workers > 1 else None)
+            else:
+                request.fail("Inference worker crashed")
+
+    def _respawn(self, worker: _Worker) -> None:
+        if self._stopping.is_set():
+            return
+        with worker.send_lock:
+            old = (worker.requests, worker.responses)
+            worker.restarts += 1
+            self._spawn(worker)
+            for ring in old:
+                ring.close()
+            # Requests queued while the worker was down never reached a ring.
+            with self._lock:
+                waiting = list(worker.outstanding.values())
+            for request in waiting:
+                try:
+                    _send(worker.requests, request.message, self.response_timeout)
+                except (RingFull, ValueError) as e:
+                    with self._lock:
+                        worker.outstanding.pop(request.message["id"], None)
+                    request.fail(f"Could not reach inference worker: {e or 'request ring full'}")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import time
+import uuid
+import logging
+import operator
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONDITIONS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+SEVERITIES = ("info", "warning", "critical", "emergency")
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class AlertRule:
+    """A threshold rule on one metric, mirroring the ``alert_rules`` table."""
+
+    def __init__(self, name: str, metric_name: str, condition: str, threshold: float,
+                 duration_seconds: int = 300, severity: str = "warning", description: str = "",
+                 notification_channels: Optional[List[str]] = None,
+                 labels: Optional[Dict[str, str]] = None, enabled: bool = True,
+                 rule_id: Optional[str] = None):
+        self.id = rule_id or str(uuid.uuid4())
+        self.name = name
+        self.description = description
+        self.metric_name = metric_name
+        self.condition = condition
+        self.threshold = float(threshold)
+        self.duration_seconds = duration_seconds
+        self.severity = severity
+        self.notification_channels = list(notification_channels or [])
+        self.labels = dict(labels or {})
+        self.enabled = enabled
+        self.created_at = self.updated_at = _isoformat(time.time())
+        self.validate()
+
+    def validate(self) -> None:
+        if not self.name or not self.metric_name:
+            raise ValueError("Alert rule needs a name and a metric_name")
+        if self.condition not in CONDITIONS:
+            raise ValueError(f"Unsupported condition: {self.condition}")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Unsupported severity: {self.severity}")
+        if self.duration_seconds < 0:
+            raise ValueError("duration_seconds must not be negative")
+
+    def matches(self, value: float) -> bool:
+        return CONDITIONS[self.condition](value, self.threshold)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "metric_name": self.metric_name,
+            "condition": self.condition,
+            "threshold": self.threshold,
+            "duration_seconds": self.duration_seconds,
+            "severity": self.severity,
+            "notification_channels": list(self.notification_channels),
+            "labels": dict(self.labels),
+            "enabled": self.enabled,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+EDITABLE_FIELDS = (
+    "name", "description", "metric_name", "condition", "threshold", "duration_seconds", "severity",
+    "notification_channels", "labels", "enabled",
+)
+
+
+class _State:
+    __slots__ = ("status", "since", "value")
+
+    def __init__(self, since: float, value: float):
+        self.status = "pending"
+        self.since = since
+        self.value = value
+
+
+class RuleEvaluator:
+    """Incremental evaluation of alert rules against a stream of samples.
+
+    Rules are indexed by metric name, so a sample is checked only against
+    the rules on its metric. State is kept per rule and label set: a
+    matching sample starts a *pending* state, which turns into *firing*
+    once the condition has held for ``duration_seconds``; the first
+    non-matching sample resolves a firing alert (or silently drops a
+    pending one). ``observe`` returns the transitions it caused. Deleting,
+    disabling or changing the condition of a rule resolves its firing
+    states too; those ``resolved`` events go to ``listeners``.
+    """
+
+    CONDITION_FIELDS = {"metric_name", "condition", "threshold", "duration_seconds", "enabled"}
+
+    def __init__(self):
+        self.rules: Dict[str, AlertRule] = {}
+        self.listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._by_metric: Dict[str, Dict[str, AlertRule]] = {}
+        self._states: Dict[str, Dict[LabelSet, _State]] = {}
+        self.samples = 0
+        self.evaluations = 0
+        self._lock = threading.Lock()
+
+    def add_rule(self, rule: AlertRule) -> AlertRule:
+        with self._lock:
+            if rule.id in self.rules:
+                raise ValueError(f"Alert rule {rule.id} already exists")
+            self.rules[rule.id] = rule
+            self._by_metric.setdefault(rule.metric_name, {})[rule.id] = rule
+        return rule
+
+    def update_rule(self, rule_id: str, **changes: Any) -> AlertRule:
+        """Change rule fields; pending/firing state is reset when the condition changes."""
+        with self._lock:
+            rule = self.rules[rule_id]
+            for field in changes:
+                if field not in EDITABLE_FIELDS:
+                    raise ValueError(f"Unknown alert rule field: {field}")
+            previous = {field: getattr(rule, field) for field in changes}
+            try:
+                for field, value in changes.items():
+                    setattr(rule, field, value)
+                rule.validate()
+                rule.threshold = float(rule.threshold)
+            except (ValueError, TypeError):
+                for field, value in previous.items():
+                    setattr(rule, field, value)
+                raise
+            rule.updated_at = _isoformat(time.time())
+            if previous.get("metric_name", rule.metric_name) != rule.metric_name:
+                self._unindex(previous["metric_name"], rule_id)
+                self._by_metric.setdefault(rule.metric_name, {})[rule_id] = rule
+            resolved = self._clear_states(rule) if set(changes) & self.CONDITION_FIELDS else []
+        self._notify(resolved)
+        return rule
+
+    def delete_rule(self, rule_id: str) -> bool:
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            self._unindex(rule.metric_name, rule_id)
+            resolved = self._clear_states(rule)
+        self._notify(resolved)
+        return True
+
+    def _clear_states(self, rule: AlertRule) -> List[Dict[str, Any]]:
+        """Drop a rule's states; firing ones become ``resolved`` events."""
+        now = time.time()
+        states = self._states.pop(rule.id, {})
+        return [
+            self._event("resolved", rule, series, state, now)
+            for series, state in states.items() if state.status == "firing"
+        ]
+
+    def _notify(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        for listener in self.listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error(f"Error in alert rule listener: {e}")
+
+    def _unindex(self, metric_name: str, rule_id: str) -> None:
+        rules = self._by_metric.get(metric_name, {})
+        rules.pop(rule_id, None)
+        if not rules:
+            self._by_metric.pop(metric_name, None)
+
+    def observe(self, metric_name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Evaluate one sample; returns ``firing``/``resolved`` transitions."""
+        rules = self._by_metric.get(metric_name)
+        if not rules:
+            return []
+        now = time.time() if timestamp is None else timestamp
+        series: LabelSet = tuple(sorted((labels or {}).items()))
+        events = []
+        with self._lock:
+            self.samples += 1
+            for rule in list(rules.values()):
+                if not rule.enabled:
+                    continue
+                self.evaluations += 1
+                states = self._states.setdefault(rule.id, {})
+                state = states.get(series)
+                if rule.matches(value):
+                    if state is None:
+                        state = states[series] = _State(now, value)
+                    state.value = value
+                    if state.status == "pending" and now - state.since >= rule.duration_seconds:
+                        state.status = "firing"
+                        events.append(self._event("firing", rule, series, state, now))
+                elif state is not None:
+                    del states[series]
+                    if state.status == "firing":
+                        state.value = value
+                        events.append(self._event("resolved", rule, series, state, now))
+        return events
+
+    @staticmethod
+    def _event(kind: str, rule: AlertRule, series: LabelSet, state: _State, now: float) -> Dict[str, Any]:
+        return {
+            "event": kind,
+            "rule": rule,
+            "labels": {**rule.labels, **dict(series)},
+            "series": series,
+            "value": state.value,
+            "started_at": state.since,
+            "timestamp": now,
+        }
+
+    def active(self) -> List[Dict[str, Any]]:
+        """Pending and firing rule/label combinations."""
+        with self._lock:
+            return [
+                {
+                    "rule_id": rule_id,
+                    "rule_name": self.rules[rule_id].name,
+                    "labels": dict(series),
+                    "status": state.status,
+                    "since": state.since,
+                    "value": state.value,
+                }
+                for rule_id, states in self._states.items() if rule_id in self.rules
+                for series, state in states.items()
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        states = [s for by_series in list(self._states.values()) for s in list(by_series.values())]
+        return {
+            "rules": len(self.rules),
+            "metrics_indexed": len(self._by_metric),
+            "samples": self.samples,
+            "evaluations": self.evaluations,
+            "pending": sum(1 for s in states if s.status == "pending"),
+            "firing": sum(1 for s in states if s.status == "firing"),
+        }
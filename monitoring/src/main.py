@@ -8,12 +8,19 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from common.log import configure_logging, get_logger
+from alert_rules import AlertRule, RuleEvaluator
+from notifications import AlertIdGenerator, AlertPipeline, fingerprint
+from predictive_scaling import PredictiveAutoscaler
+from traces import TraceStore
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+# Per-request events: sampled and rate limited, formatted off the request thread
+events = get_logger(__name__, sample_rates={"request_recorded": 0.01, "connection_closed": 0.01})
 
 class MonitoringService:
     """Simple Monitoring Service implementation for testing purposes."""
@@ -28,6 +35,13 @@ class MonitoringService:
             "active_connections": 0
         }
         self.alerts = []
+        self.alert_ids = AlertIdGenerator()
+        self.notifications = AlertPipeline()
+        self.autoscaler = PredictiveAutoscaler()
+        self.rule_evaluator = RuleEvaluator()
+        self.rule_evaluator.listeners.append(self._apply_rule_events)
+        self._rule_alerts: Dict[tuple, Dict[str, Any]] = {}
+        self.traces = TraceStore()
         
     def health_check(self) -> Dict[str, Any]:
         """Health check endpoint."""
@@ -46,9 +60,12 @@ class MonitoringService:
             "collection_time": datetime.now().isoformat()
         }
     
-    def record_request(self, response_time: float, success: bool = True) -> None:
+    def record_request(self, response_time: float, success: bool = True,
+                       service: str = "api-gateway") -> None:
         """Record a request metric."""
         self.metrics["requests_total"] += 1
+        self.autoscaler.record(service, "request_rate")
+        self.record_metric("response_time", response_time, {"service": service})
         self.metrics["active_connections"] += 1
         
         if not success:
@@ -58,30 +75,163 @@ class MonitoringService:
         total_time = self.metrics["average_response_time"] * (self.metrics["requests_total"] - 1)
         self.metrics["average_response_time"] = (total_time + response_time) / self.metrics["requests_total"]
         
-        logger.info(f"Request recorded: response_time={response_time:.3f}s, success={success}")
+        events.info("request_recorded", service=service, response_time=response_time, success=success)
     
     def record_connection_closed(self) -> None:
         """Record that a connection was closed."""
         if self.metrics["active_connections"] > 0:
             self.metrics["active_connections"] -= 1
         
-        logger.info("Connection closed")
+        events.info("connection_closed")
     
-    def create_alert(self, alert_type: str, message: str, severity: str = "info") -> Dict[str, Any]:
-        """Create an alert."""
+    def record_metric(self, name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                      timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Feed a metric sample to the alert rules on that metric; returns alerts fired or resolved."""
+        return self._apply_rule_events(self.rule_evaluator.observe(name, value, labels, timestamp))
+
+    def _apply_rule_events(self, transitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create or resolve the alerts behind rule transitions."""
+        changed = []
+        for event in transitions:
+            rule = event["rule"]
+            key = (rule.id, event["series"])
+            if event["event"] == "firing":
+                name, value = rule.metric_name, event["value"]
+                alert = self.create_alert(
+                    rule.name,
+                    rule.description or f"{name} {rule.condition} {rule.threshold} (value {value})",
+                    rule.severity,
+                    labels=event["labels"],
+                    notification_channels=rule.notification_channels,
+                    rule_id=rule.id,
+                    rule_name=rule.name,
+                    started_at=datetime.fromtimestamp(event["started_at"]).isoformat(),
+                    trigger_metrics=[{"name": name, "value": value, "labels": event["labels"]}]
+                )
+                self._rule_alerts[key] = alert
+            else:
+                alert = self._rule_alerts.pop(key, None)
+                if alert is None:
+                    continue
+                self._resolve(alert, event["timestamp"])
+            changed.append(alert)
+        return changed
+
+    def create_alert_rule(self, name: str, metric_name: str, condition: str, threshold: float,
+                          duration_seconds: int = 300, severity: str = "warning", description: str = "",
+                          notification_channels: Optional[List[str]] = None,
+                          labels: Optional[Dict[str, str]] = None, enabled: bool = True) -> Dict[str, Any]:
+        """Create an alert rule evaluated against incoming metric samples."""
+        try:
+            rule = self.rule_evaluator.add_rule(AlertRule(
+                name, metric_name, condition, threshold, duration_seconds, severity, description,
+                notification_channels, labels, enabled
+            ))
+            return {"success": True, "message": "Alert rule created", "alert_rule": rule.to_dict()}
+        except Exception as e:
+            logger.error(f"Error creating alert rule: {e}")
+            return {"error": str(e)}
+
+    def update_alert_rule(self, rule_id: str, **changes: Any) -> Dict[str, Any]:
+        """Update fields of an alert rule."""
+        try:
+            if rule_id not in self.rule_evaluator.rules:
+                return {"error": f"Alert rule {rule_id} not found"}
+            rule = self.rule_evaluator.update_rule(rule_id, **changes)
+            return {"success": True, "message": "Alert rule updated", "alert_rule": rule.to_dict()}
+        except Exception as e:
+            logger.error(f"Error updating alert rule: {e}")
+            return {"error": str(e)}
+
+    def delete_alert_rule(self, rule_id: str) -> Dict[str, Any]:
+        """Delete an alert rule."""
+        if not self.rule_evaluator.delete_rule(rule_id):
+            return {"error": f"Alert rule {rule_id} not found"}
+        return {"success": True, "message": "Alert rule deleted"}
+
+    def list_alert_rules(self, filter: Optional[str] = None) -> Dict[str, Any]:
+        """List alert rules, optionally filtered by name or metric substring."""
+        rules = [
+            rule.to_dict() for rule in self.rule_evaluator.rules.values()
+            if not filter or filter in rule.name or filter in rule.metric_name
+        ]
+        return {"alert_rules": rules, "total_count": len(rules)}
+
+    def record_queue_depth(self, service: str, depth: float) -> None:
+        """Record a service's current queue depth for scaling forecasts."""
+        self.autoscaler.record(service, "queue_depth", depth)
+        self.record_metric("queue_depth", depth, {"service": service})
+
+    def record_replicas(self, service: str, replicas: int) -> None:
+        """Record how many replicas of a service are running."""
+        self.autoscaler.set_replicas(service, replicas)
+        self.record_metric("replicas", replicas, {"service": service})
+
+    def get_scaling_recommendations(self, service_name: str, prediction_horizon_minutes: int = 15,
+                                    current_replicas: Optional[int] = None) -> Dict[str, Any]:
+        """Forecast load and recommend a replica count for a service."""
+        try:
+            return self.autoscaler.recommend(service_name, prediction_horizon_minutes,
+                                             current_replicas=current_replicas or None)
+        except Exception as e:
+            logger.error(f"Error computing scaling recommendations: {e}")
+            return {"error": str(e)}
+
+    def record_spans(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Collector endpoint for exported spans; usable directly as a tracer's exporter."""
+        try:
+            return {"accepted": self.traces.add(spans)}
+        except (KeyError, TypeError) as e:
+            return {"error": f"Invalid span: {e}"}
+
+    def get_trace(self, trace_id: str) -> Dict[str, Any]:
+        """All collected spans of one trace, in start order."""
+        spans = self.traces.trace(trace_id)
+        if not spans:
+            return {"error": f"Trace {trace_id} not found"}
+        return {"trace_id": trace_id, "spans": spans, "span_count": len(spans)}
+
+    def get_latency_breakdown(self, service: Optional[str] = None) -> Dict[str, Any]:
+        """Span latency per service and operation (auth, queue, prefill, decode, ...)."""
+        return {"spans": self.traces.breakdown(service), "spans_received": self.traces.spans_received}
+
+    def create_alert(self, alert_type: str, message: str, severity: str = "info",
+                     labels: Optional[Dict[str, str]] = None,
+                     notification_channels: Optional[List[str]] = None, **fields: Any) -> Dict[str, Any]:
+        """Create an alert; repeats of an active alert (same type and labels) are folded into it."""
         alert = {
-            "id": f"alert-{int(time.time())}",
+            "id": self.alert_ids.next(),
             "type": alert_type,
             "message": message,
             "severity": severity,
+            "status": "active",
             "timestamp": int(time.time()),
-            "created_at": datetime.now().isoformat()
+            "created_at": datetime.now().isoformat(),
+            "labels": dict(labels or {}),
+            "notification_channels": list(notification_channels or []),
+            "fingerprint": fingerprint(alert_type, labels),
+            **fields
         }
-        
-        self.alerts.append(alert)
-        logger.warning(f"Alert created: {alert_type} - {message}")
-        
+
+        # Started with the first alert so a lone alert still goes out after group_wait
+        self.notifications.start()
+        alert, is_new = self.notifications.submit(alert)
+        if is_new:
+            self.alerts.append(alert)
         return alert
+
+    def resolve_alert(self, alert_id: str) -> Dict[str, Any]:
+        """Mark an active alert resolved."""
+        for alert in self.alerts:
+            if alert["id"] == alert_id and alert["status"] == "active":
+                self._resolve(alert)
+                return alert
+        return {"error": f"Active alert {alert_id} not found"}
+
+    def _resolve(self, alert: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        alert["status"] = "resolved"
+        alert["resolved_at"] = datetime.fromtimestamp(timestamp or time.time()).isoformat()
+        self.notifications.resolve(alert["fingerprint"])
     
     def get_alerts(self, severity: Optional[str] = None) -> Dict[str, Any]:
         """Get alerts, optionally filtered by severity."""
@@ -99,6 +249,8 @@ class MonitoringService:
         """Clear all alerts."""
         count = len(self.alerts)
         self.alerts.clear()
+        self.notifications.clear()
+        self._rule_alerts.clear()
         logger.info(f"Cleared {count} alerts")
         
         return {
@@ -134,6 +286,10 @@ class MonitoringService:
             }
         }
 
+    def shutdown(self) -> None:
+        """Stop the background notification flusher."""
+        self.notifications.stop()
+
 def main():
     """Main function for testing."""
     monitoring = MonitoringService()
@@ -158,6 +314,7 @@ def main():
     # Test report generation
     report = monitoring.generate_report()
     print(f"Report: {json.dumps(report, indent=2)}")
+    monitoring.shutdown()
 
 if __name__ == "__main__":
     main()
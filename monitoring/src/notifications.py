@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# notifier(channel, notification) delivers one batched notification
+Notifier = Callable[[str, Dict[str, Any]], None]
+
+
+class AlertIdGenerator:
+    """Unique, sortable alert ids: ``alert-<epoch ms>-<sequence>``.
+
+    The millisecond part never goes backwards (a clock step back reuses
+    the last value) and the sequence disambiguates ids within one
+    millisecond.
+    """
+
+    def __init__(self):
+        self._last_ms = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms, self._seq = now_ms, 0
+            else:
+                self._seq += 1
+            return f"alert-{self._last_ms:013d}-{self._seq:04d}"
+
+
+def fingerprint(alert_type: str, labels: Optional[Dict[str, str]] = None) -> str:
+    """Identity of an alert for deduplication: its type and label set."""
+    parts = [alert_type] + [f"{k}={v}" for k, v in sorted((labels or {}).items())]
+    return hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def log_notifier(channel: str, notification: Dict[str, Any]) -> None:
+    """Default channel: one log line per batch instead of one per alert."""
+    alerts = notification["alerts"]
+    summary = ", ".join(f"{a['type']} x{a['count']}" for a in alerts[:5])
+    more = f" (+{len(alerts) - 5} more)" if len(alerts) > 5 else ""
+    logger.warning(f"[{channel}] {notification['status']} {notification['group']}: {summary}{more}")
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float, burst: float, now: float):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _Group:
+    def __init__(self, key: Tuple[str, ...], channels: Sequence[str]):
+        self.key = key
+        self.channels = list(channels)
+        # Per channel, the alerts it has not been told about yet, by status.
+        self.pending: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self.pending_since: Optional[float] = None
+        self.last_sent: Dict[str, float] = {}
+
+
+class AlertPipeline:
+    """Deduplicates, groups and batches alert notifications.
+
+    An alert whose fingerprint (type + labels) is already active is
+    folded into the existing one (``count`` and ``last_seen`` are
+    bumped) instead of notifying again. New and resolved alerts join a
+    group keyed by ``group_by`` fields; a group is flushed as one
+    notification per channel once ``group_wait`` has passed since its
+    first pending change, and no more often than ``group_interval``.
+    Each channel has a token-bucket rate limit; a limited group stays
+    pending for that channel and goes out, coalesced, when tokens are
+    available. An alert that keeps repeating without being resolved is
+    notified again once ``repeat_interval`` has passed since it was last
+    queued.
+    """
+
+    def __init__(self, notifiers: Optional[Dict[str, Notifier]] = None,
+                 group_by: Sequence[str] = ("severity", "service"),
+                 group_wait: Optional[float] = None, group_interval: Optional[float] = None,
+                 per_minute: Optional[float] = None, burst: Optional[float] = None,
+                 default_channels: Sequence[str] = ("log",), repeat_interval: Optional[float] = None):
+        self.notifiers: Dict[str, Notifier] = {"log": log_notifier, **(notifiers or {})}
+        self.group_by = tuple(group_by)
+        self.group_wait = group_wait if group_wait is not None else float(os.getenv('ALERT_GROUP_WAIT', 10))
+        self.group_interval = group_interval if group_interval is not None else \
+            float(os.getenv('ALERT_GROUP_INTERVAL', 60))
+        self.per_minute = per_minute or float(os.getenv('ALERT_NOTIFY_PER_MINUTE', 10))
+        self.burst = burst or self.per_minute
+        self.repeat_interval = repeat_interval if repeat_interval is not None else \
+            float(os.getenv('ALERT_REPEAT_INTERVAL', 4 * 3600))
+        self.default_channels = list(default_channels)
+        self.active: Dict[str, Dict[str, Any]] = {}
+        # When each active alert was last queued for notification
+        self._queued_at: Dict[str, float] = {}
+        self._groups: Dict[Tuple[str, ...], _Group] = {}
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self.counters = {"received": 0, "deduplicated": 0, "repeated": 0, "notifications": 0,
+                         "rate_limited": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _group_key(self, alert: Dict[str, Any]) -> Tuple[str, ...]:
+        labels = alert.get("labels") or {}
+        return tuple(f"{field}={alert.get(field, labels.get(field, ''))}" for field in self.group_by)
+
+    def submit(self, alert: Dict[str, Any], now: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """Register an alert; returns ``(alert, is_new)`` where a duplicate returns the active original."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.counters["received"] += 1
+            key = alert["fingerprint"]
+            existing = self.active.get(key)
+            if existing is not None:
+                existing["count"] += 1
+                existing["last_seen"] = alert["timestamp"]
+                self.counters["deduplicated"] += 1
+                if now - self._queued_at[key] < self.repeat_interval:
+                    return existing, False
+                self.counters["repeated"] += 1
+                alert, is_new = existing, False
+            else:
+                alert.setdefault("count", 1)
+                alert.setdefault("last_seen", alert["timestamp"])
+                self.active[key] = alert
+                is_new = True
+            self._queued_at[key] = now
+            self._queue(alert, "firing", now)
+        self.flush(now)
+        return alert, is_new
+
+    def resolve(self, alert_fingerprint: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            alert = self.active.pop(alert_fingerprint, None)
+            if alert is None:
+                return None
+            self._queued_at.pop(alert_fingerprint, None)
+            self._queue(alert, "resolved", now)
+        self.flush(now)
+        return alert
+
+    def _queue(self, alert: Dict[str, Any], status: str, now: float) -> None:
+        """Add an alert change to every channel of its group."""
+        key = self._group_key(alert)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(key, alert.get("notification_channels") or self.default_channels)
+        for channel in alert.get("notification_channels") or []:
+            if channel not in group.channels:
+                group.channels.append(channel)
+        for channel in group.channels:
+            pending = group.pending.setdefault(channel, {"firing": {}, "resolved": {}})
+            if status == "resolved" and pending["firing"].pop(alert["fingerprint"], None) is not None:
+                # Fired and resolved before this channel was told: nothing to send.
+                if not pending["resolved"] and not pending["firing"]:
+                    del group.pending[channel]
+                continue
+            pending[status][alert["fingerprint"]] = alert
+        if not group.pending:
+            group.pending_since = None
+        elif group.pending_since is None:
+            group.pending_since = now
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        """Send every group that is due; returns the ``(channel, notification)`` pairs sent."""
+        now = time.monotonic() if now is None else now
+        outgoing = []
+        with self._lock:
+            for group in self._groups.values():
+                if group.pending_since is None:
+                    continue
+                if not force and now - group.pending_since < self.group_wait:
+                    continue
+                for channel in sorted(group.pending):
+                    if not force and now - group.last_sent.get(channel, float("-inf")) < self.group_interval:
+                        continue
+                    bucket = self._buckets.get(channel)
+                    if bucket is None:
+                        bucket = self._buckets[channel] = _TokenBucket(self.per_minute, self.burst, now)
+                    if not bucket.take(now):
+                        self.counters["rate_limited"] += 1
+                        continue
+                    group.last_sent[channel] = now
+                    pending = group.pending.pop(channel)
+                    for status in ("firing", "resolved"):
+                        if pending[status]:
+                            outgoing.append((channel, self._notification(group, status, pending[status])))
+                if not group.pending:
+                    group.pending_since = None
+        for channel, notification in outgoing:
+            notifier = self.notifiers.get(channel, log_notifier)
+            try:
+                notifier(channel, notification)
+                self.counters["notifications"] += 1
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Error sending alert notification to {channel}: {e}")
+        return outgoing
+
+    @staticmethod
+    def _notification(group: _Group, status: str, alerts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "group": ",".join(group.key),
+            "status": status,
+            "alerts": [
+                {k: a.get(k) for k in ("id", "type", "message", "severity", "count", "labels", "fingerprint")}
+                for a in alerts.values()
+            ],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.active.clear()
+            self._queued_at.clear()
+            self._groups.clear()
+
+    def start(self, interval: float = 1.0) -> None:
+        """Flush due groups in the background every ``interval`` seconds."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+
+            def run() -> None:
+                while not self._stop.wait(interval):
+                    self.flush()
+
+            self._thread = threading.Thread(target=run, name="alert-notifications", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "active": len(self.active),
+            "pending_groups": sum(1 for g in self._groups.values() if g.pending_since is not None),
+        }
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# z-score for the two-sided 90% prediction interval
+Z_90 = 1.645
+
+
+def _rmse(errors: List[float]) -> float:
+    return math.sqrt(sum(e * e for e in errors) / len(errors)) if errors else 0.0
+
+
+def _forecast(model: str, predictions: List[float], sigma: float) -> Dict[str, Any]:
+    """Point forecasts plus a 90% band that widens with the horizon."""
+    return {
+        "model": model,
+        "predictions": predictions,
+        "lower": [max(0.0, p - Z_90 * sigma * math.sqrt(h)) for h, p in enumerate(predictions, 1)],
+        "upper": [p + Z_90 * sigma * math.sqrt(h) for h, p in enumerate(predictions, 1)],
+        "sigma": sigma,
+    }
+
+
+def ewma_forecast(series: List[float], horizon: int, alpha: float = 0.3) -> Dict[str, Any]:
+    """Exponentially weighted moving average; a flat forecast at the smoothed level."""
+    level = series[0]
+    errors = []
+    for value in series[1:]:
+        errors.append(value - level)
+        level += alpha * (value - level)
+    return _forecast("ewma", [level] * horizon, _rmse(errors))
+
+
+def holt_winters_forecast(series: List[float], horizon: int, season_length: int,
+                          alpha: float = 0.5, beta: float = 0.1, gamma: float = 0.3) -> Dict[str, Any]:
+    """Additive Holt-Winters (level, trend and seasonality).
+
+    Needs two full seasons; with less history it degrades to Holt's
+    linear trend method.
+    """
+    m = season_length
+    seasonal_fit = m >= 2 and len(series) >= 2 * m
+    if seasonal_fit:
+        first, second = series[:m], series[m:2 * m]
+        level = sum(first) / m
+        trend = (sum(second) - sum(first)) / (m * m)
+        season = [value - level for value in first]
+        start = m
+    else:
+        m = 1
+        level = series[0]
+        trend = series[1] - series[0] if len(series) > 1 else 0.0
+        season = [0.0]
+        start = 1
+
+    errors = []
+    for t in range(start, len(series)):
+        value = series[t]
+        s = season[t % m]
+        errors.append(value - (level + trend + s))
+        previous = level
+        level = alpha * (value - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+        if seasonal_fit:
+            season[t % m] = gamma * (value - level) + (1 - gamma) * s
+
+    n = len(series)
+    predictions = [max(0.0, level + h * trend + season[(n + h - 1) % m]) for h in range(1, horizon + 1)]
+    return _forecast("holt_winters" if seasonal_fit else "holt", predictions, _rmse(errors))
+
+
+def seasonal_decomposition_forecast(series: List[float], horizon: int, season_length: int) -> Dict[str, Any]:
+    """Classical additive decomposition: moving-average trend plus per-phase seasonal means.
+
+    The trend is extrapolated linearly from its last season of values.
+    """
+    m = season_length
+    n = len(series)
+    half = m // 2
+    trend: List[Optional[float]] = [None] * n
+    for t in range(half, n - (m - half) + 1):
+        trend[t] = sum(series[t - half:t - half + m]) / m
+
+    phases: Dict[int, List[float]] = {}
+    for t, value in enumerate(series):
+        if trend[t] is not None:
+            phases.setdefault(t % m, []).append(value - trend[t])
+    season = [sum(phases.get(p, [0.0])) / len(phases.get(p, [0.0])) for p in range(m)]
+    offset = sum(season) / m
+    season = [s - offset for s in season]
+
+    known = [(t, v) for t, v in enumerate(trend) if v is not None][-m:]
+    mean_t = sum(t for t, _ in known) / len(known)
+    mean_v = sum(v for _, v in known) / len(known)
+    spread = sum((t - mean_t) ** 2 for t, _ in known)
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in known) / spread if spread else 0.0
+
+    errors = [series[t] - trend[t] - season[t % m] for t in range(n) if trend[t] is not None]
+    predictions = [
+        max(0.0, mean_v + slope * (n - 1 + h - mean_t) + season[(n - 1 + h) % m])
+        for h in range(1, horizon + 1)
+    ]
+    return _forecast("seasonal_decomposition", predictions, _rmse(errors))
+
+
+def _candidates(series: List[float], horizon: int, season_length: int) -> List[Dict[str, Any]]:
+    models = [ewma_forecast(series, horizon)]
+    if len(series) >= 3:
+        models.append(holt_winters_forecast(series, horizon, season_length))
+    if season_length >= 2 and len(series) >= 2 * season_length:
+        models.append(seasonal_decomposition_forecast(series, horizon, season_length))
+    return models
+
+
+def forecast(series: List[float], horizon: int, season_length: int) -> Dict[str, Any]:
+    """Fit every applicable model and keep the one with the lowest holdout error.
+
+    The last ``holdout`` points are hidden, each model forecasts them from
+    the rest, and the winner by mean absolute error is refit on the full
+    series.
+    """
+    if not series:
+        return _forecast("none", [0.0] * horizon, 0.0)
+    holdout = min(max(season_length, 1), len(series) // 4)
+    if holdout < 2:
+        return _candidates(series, horizon, season_length)[-1]
+
+    train, actual = series[:-holdout], series[-holdout:]
+    best_model, best_error = None, float("inf")
+    for candidate in _candidates(train, holdout, season_length):
+        error = sum(abs(a - p) for a, p in zip(actual, candidate["predictions"])) / holdout
+        if error < best_error:
+            best_model, best_error = candidate["model"], error
+    for candidate in _candidates(series, horizon, season_length):
+        if candidate["model"] == best_model or (best_model == "holt" and candidate["model"] == "holt_winters"):
+            candidate["holdout_mae"] = best_error
+            return candidate
+    return ewma_forecast(series, horizon)
+
+
+class _Series:
+    """Fixed-interval buckets for one metric: counts are summed into a rate, gauges averaged."""
+
+    def __init__(self, kind: str, interval: float, max_buckets: int):
+        self.kind = kind
+        self.interval = interval
+        self.buckets: "deque[List[float]]" = deque(maxlen=max_buckets)  # [bucket, sum, samples]
+
+    def add(self, value: float, timestamp: float) -> None:
+        bucket = int(timestamp // self.interval)
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += value
+            self.buckets[-1][2] += 1
+        elif not self.buckets or bucket > self.buckets[-1][0]:
+            self.buckets.append([bucket, value, 1])
+        # Samples for buckets already closed are dropped.
+
+    def values(self, now: float) -> Tuple[List[float], int]:
+        """Completed buckets up to ``now`` with gaps filled, and the index of the last one."""
+        if not self.buckets:
+            return [], int(now // self.interval) - 1
+        current = int(now // self.interval)
+        by_bucket = {b: (total, count) for b, total, count in self.buckets if b < current}
+        first = self.buckets[0][0]
+        values: List[float] = []
+        last = 0.0
+        for b in range(max(first, current - self.buckets.maxlen), current):
+            if b in by_bucket:
+                total, count = by_bucket[b]
+                last = total / self.interval if self.kind == "count" else total / count
+            elif self.kind == "count":
+                last = 0.0
+            values.append(last)
+        return values, current - 1
+
+
+class PredictiveAutoscaler:
+    """Forecasts per-service load and recommends replica counts ahead of demand.
+
+    Request rate (counted per interval) and queue depth (gauge) are
+    bucketed into fixed intervals. Each recommendation forecasts both over
+    the requested horizon plus the time a new replica needs to come up,
+    and sizes the service for the *upper* bound of the forecast, so
+    capacity is provisioned before a predicted spike rather than after
+    latency degrades. Scaling down requires the whole upper band to fit
+    in fewer replicas and is not recommended within ``scale_down_cooldown``
+    seconds of the last reported reduction in replicas.
+    """
+
+    METRICS = {"request_rate": "count", "queue_depth": "gauge"}
+
+    def __init__(self, interval: Optional[float] = None, season_length: Optional[int] = None,
+                 requests_per_replica: Optional[float] = None, queue_per_replica: Optional[float] = None,
+                 target_utilization: float = 0.75, min_replicas: int = 1, max_replicas: int = 100,
+                 provision_seconds: Optional[float] = None, scale_down_cooldown: float = 600.0,
+                 max_buckets: int = 2880):
+        self.interval = interval or float(os.getenv('SCALING_INTERVAL_SECONDS', 60))
+        self.season_length = season_length or int(os.getenv('SCALING_SEASON_BUCKETS', 60))
+        self.capacity = {
+            "request_rate": requests_per_replica or float(os.getenv('SCALING_REQUESTS_PER_REPLICA', 10)),
+            "queue_depth": queue_per_replica or float(os.getenv('SCALING_QUEUE_PER_REPLICA', 8)),
+        }
+        self.target_utilization = target_utilization
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.provision_seconds = provision_seconds if provision_seconds is not None else \
+            float(os.getenv('SCALING_PROVISION_SECONDS', 120))
+        self.scale_down_cooldown = scale_down_cooldown
+        self.max_buckets = max_buckets
+        self.replicas: Dict[str, int] = {}
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._last_scale_down: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, service: str, metric: str, value: float = 1.0, timestamp: Optional[float] = None) -> None:
+        """Add a sample: request counts for ``request_rate``, current depth for ``queue_depth``."""
+        kind = self.METRICS[metric]
+        with self._lock:
+            series = self._series.get((service, metric))
+            if series is None:
+                series = self._series[(service, metric)] = _Series(kind, self.interval, self.max_buckets)
+            series.add(value, time.time() if timestamp is None else timestamp)
+
+    def set_replicas(self, service: str, replicas: int, timestamp: Optional[float] = None) -> None:
+        """Record the service's running replica count; a reduction starts the scale-down cooldown."""
+        with self._lock:
+            previous = self.replicas.get(service)
+            self.replicas[service] = replicas
+            if previous is not None and replicas < previous:
+                self._last_scale_down[service] = time.time() if timestamp is None else timestamp
+
+    def _replicas_for(self, metric: str, load: float) -> int:
+        return math.ceil(load / (self.capacity[metric] * self.target_utilization))
+
+    def recommend(self, service: str, horizon_minutes: int = 15, now: Optional[float] = None,
+                  current_replicas: Optional[int] = None) -> Dict[str, Any]:
+        """Scaling recommendation in the shape of ``GetScalingRecommendationsResponse``.
+
+        ``current_replicas`` updates the running count first; otherwise the
+        last one given to ``set_replicas`` is used.
+        """
+        now = time.time() if now is None else now
+        if current_replicas is not None:
+            self.set_replicas(service, current_replicas, now)
+        current = self.replicas.get(service, self.min_replicas)
+        steps = max(1, math.ceil((horizon_minutes * 60 + self.provision_seconds) / self.interval))
+
+        with self._lock:
+            histories = {
+                metric: self._series[(service, metric)].values(now)
+                for metric in self.METRICS if (service, metric) in self._series
+            }
+        if not histories:
+            return {"success": False, "recommendations": [], "message": f"No metrics recorded for {service}"}
+
+        needed = self.min_replicas
+        fits: Dict[str, Dict[str, Any]] = {}
+        driver = None
+        for metric, (values, last_bucket) in histories.items():
+            fit = forecast(values, steps, self.season_length)
+            fit["current"] = values[-1] if values else 0.0
+            fit["last_bucket"] = last_bucket
+            fits[metric] = fit
+            required = self._replicas_for(metric, max(fit["upper"]))
+            if required > needed or driver is None:
+                needed, driver = max(needed, required), metric
+        target = min(self.max_replicas, needed)
+
+        primary = fits.get("request_rate") or fits[driver]
+        fit = fits[driver]
+        if target > current:
+            action = "scale_up"
+            capacity = current * self.capacity[driver] * self.target_utilization
+            breach = next((h for h, u in enumerate(fit["upper"], 1) if u > capacity), 1)
+            # Ready by the time the forecast crosses current capacity.
+            estimated = (fit["last_bucket"] + 1 + breach) * self.interval - self.provision_seconds
+            reason = (f"{driver} forecast to reach {max(fit['predictions']):.2f} "
+                      f"(upper {max(fit['upper']):.2f}) within {horizon_minutes}m")
+        elif target < current and now - self._last_scale_down.get(service, 0.0) >= self.scale_down_cooldown:
+            action = "scale_down"
+            estimated = now
+            reason = f"Forecast upper bound fits in {target} replicas for the next {horizon_minutes}m"
+        else:
+            action = "no_action"
+            target = current
+            estimated = now
+            reason = "Forecast load within current capacity"
+
+        scale = max(max(fit["upper"]), 1e-9)
+        confidence = max(0.0, min(1.0, 1.0 - (fit["upper"][-1] - fit["lower"][-1]) / (2 * scale)))
+        points = len(histories[driver][0])
+        confidence *= min(1.0, points / max(self.season_length, 10))
+
+        first_prediction = (primary["last_bucket"] + 1) * self.interval
+        return {
+            "success": True,
+            "recommendations": [{
+                "service_name": service,
+                "action": action,
+                "target_replicas": max(target, self.min_replicas),
+                "reason": reason,
+                "confidence_score": round(confidence, 4),
+                "estimated_time": datetime.fromtimestamp(max(estimated, now), timezone.utc).isoformat(),
+                "metrics": {
+                    "model": fit["model"],
+                    "driver": driver,
+                    "current_replicas": str(current),
+                    **{f"{m}_current": f"{f['current']:.4f}" for m, f in fits.items()},
+                    **{f"{m}_predicted_peak": f"{max(f['predictions']):.4f}" for m, f in fits.items()},
+                },
+            }],
+            "prediction_metrics": {
+                "current_load": primary["current"],
+                "predicted_load": max(primary["predictions"]),
+                "confidence_interval_lower": min(primary["lower"]),
+                "confidence_interval_upper": max(primary["upper"]),
+                "predictions": [
+                    {
+                        "timestamp": datetime.fromtimestamp(first_prediction + h * self.interval, timezone.utc).isoformat(),
+                        "value": value,
+                    }
+                    for h, value in enumerate(primary["predictions"])
+                ],
+            },
+            "message": f"{action} recommended for {service}",
+        }
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from common.metrics import Histogram
+
+
+class TraceStore:
+    """In-memory trace collector for spans exported by the services.
+
+    Keeps the most recent ``max_traces`` traces (oldest evicted first)
+    and a latency histogram per service and span name, so the time of a
+    request can be broken down into auth, queueing, prefill, decode and
+    serialization without an external tracing backend.
+    """
+
+    def __init__(self, max_traces: Optional[int] = None):
+        self.max_traces = max_traces or int(os.getenv('TRACE_RETENTION', 1000))
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self.spans_received = 0
+        self._lock = threading.Lock()
+
+    def add(self, spans: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            for span in spans:
+                trace = self._traces.get(span["trace_id"])
+                if trace is None:
+                    trace = self._traces[span["trace_id"]] = []
+                    while len(self._traces) > self.max_traces:
+                        self._traces.popitem(last=False)
+                trace.append(span)
+                key = (span.get("service", ""), span["name"])
+                histogram = self._latency.get(key)
+                if histogram is None:
+                    histogram = self._latency[key] = Histogram()
+                histogram.observe(span["duration"])
+                self.spans_received += 1
+        return len(spans)
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self._traces.get(trace_id, []), key=lambda s: s["start_time"])
+
+    def breakdown(self, service: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Latency summary per service and span name."""
+        with self._lock:
+            return [
+                {"service": span_service, "name": name, **histogram.snapshot()}
+                for (span_service, name), histogram in sorted(self._latency.items())
+                if service is None or span_service == service
+            ]
@@ -7,6 +7,36 @@ Official Python SDK for the HelixFlow AI inference platform.
 __version__ = "1.0.0"
 
 from .client import HelixFlow
-from .exceptions import HelixFlowError, AuthenticationError, RateLimitError, APIError
+from .async_client import AsyncHelixFlow
+from .cache import ResponseCache
+from .exceptions import HelixFlowError, AuthenticationError, RateLimitError, APIError, StreamError
+from .streaming import ChatCompletionStream, AsyncChatCompletionStream, SSEDecoder, StreamStats
+from .transport import (
+    RetryPolicy,
+    Transport,
+    RequestsTransport,
+    HTTPXTransport,
+    AsyncTransport,
+    AsyncHTTPXTransport,
+)
 
-__all__ = ["HelixFlow", "HelixFlowError", "AuthenticationError", "RateLimitError", "APIError"]
+__all__ = [
+    "HelixFlow",
+    "AsyncHelixFlow",
+    "ResponseCache",
+    "HelixFlowError",
+    "AuthenticationError",
+    "RateLimitError",
+    "APIError",
+    "StreamError",
+    "ChatCompletionStream",
+    "AsyncChatCompletionStream",
+    "SSEDecoder",
+    "StreamStats",
+    "RetryPolicy",
+    "Transport",
+    "RequestsTransport",
+    "HTTPXTransport",
+    "AsyncTransport",
+    "AsyncHTTPXTransport",
+]
@@ -0,0 +1,183 @@
+"""
+HelixFlow Async Python Client
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from .client import raise_for_status
+from .streaming import AsyncChatCompletionStream, get_json_loads
+from .transport import AsyncHTTPXTransport, AsyncTransport, RetryPolicy, parse_retry_after
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class AsyncHelixFlow:
+    """Asyncio counterpart of ``HelixFlow`` with the same request surface.
+
+    ``map`` and ``gather`` run many requests concurrently while keeping at
+    most ``max_concurrency`` of them in flight, so batch jobs can submit
+    thousands of prompts without overwhelming the gateway or the pool.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.helixflow.ai",
+        transport: Optional[AsyncTransport] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        http2: bool = False,
+        pool_maxsize: int = 100,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_concurrency: int = 32,
+        json_backend: str = "auto",
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.max_concurrency = max_concurrency
+        self.retries = 0
+        self._json_loads = get_json_loads(json_backend)
+        self.transport = transport or AsyncHTTPXTransport(
+            {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            http2=http2,
+            max_connections=pool_maxsize,
+            max_keepalive_connections=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+
+    async def chat_completion(
+        self, model: str, messages: List[Dict[str, str]], **kwargs
+    ) -> Dict:
+        """Create a chat completion."""
+        data = {"model": model, "messages": messages, **kwargs}
+        return await self._post("/v1/chat/completions", data)
+
+    def chat_completion_stream(
+        self, model: str, messages: List[Dict[str, str]], **kwargs
+    ) -> AsyncChatCompletionStream:
+        """Create a streaming chat completion; use with ``async for``."""
+        data = {"model": model, "messages": messages, "stream": True, **kwargs}
+        return AsyncChatCompletionStream(
+            self._stream_bytes("/v1/chat/completions", data), loads=self._json_loads
+        )
+
+    async def list_models(self) -> Dict:
+        """List available models."""
+        return await self._get("/v1/models")
+
+    async def get_model(self, model_id: str) -> Dict:
+        """Get information about a specific model."""
+        return await self._get(f"/v1/models/{model_id}")
+
+    async def map(
+        self,
+        fn: Callable[[T], Awaitable[R]],
+        items: Iterable[T],
+        limit: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Apply ``fn`` to every item with at most ``limit`` calls in flight.
+
+        Results come back in input order. Items are pulled lazily by a fixed
+        set of workers, so a generator of prompts is never materialized as
+        thousands of pending tasks.
+        """
+        limit = limit or self.max_concurrency
+        results: Dict[int, Any] = {}
+        source = iter(enumerate(items))
+
+        async def worker() -> None:
+            for index, item in source:
+                try:
+                    results[index] = await fn(item)
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results[index] = e
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(limit)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+        return [results[index] for index in range(len(results))]
+
+    async def gather(
+        self,
+        *aws: Awaitable[R],
+        limit: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Like ``asyncio.gather`` but with at most ``limit`` awaitables running."""
+        try:
+            return await self.map(lambda aw: aw, aws, limit=limit, return_exceptions=return_exceptions)
+        finally:
+            # Coroutines never reached after a failure would otherwise warn on GC.
+            for aw in aws:
+                if asyncio.iscoroutine(aw):
+                    aw.close()
+
+    def transport_stats(self) -> Dict[str, Any]:
+        """Connection reuse and retry counters."""
+        return {**self.transport.stats(), "retries": self.retries}
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncHelixFlow":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _get(self, endpoint: str) -> Dict:
+        response = await self._request("GET", endpoint)
+        raise_for_status(response)
+        return response.json()
+
+    async def _post(self, endpoint: str, data: Dict) -> Dict:
+        response = await self._request("POST", endpoint, data)
+        raise_for_status(response)
+        return response.json()
+
+    async def _stream_bytes(self, endpoint: str, data: Dict) -> AsyncIterator[bytes]:
+        """Send a streaming POST on first use and yield the raw body."""
+        response = await self._request("POST", endpoint, data, stream=True)
+        raise_for_status(response)
+        try:
+            async for chunk in self.transport.aiter_bytes(response):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def _request(
+        self, method: str, endpoint: str, data: Optional[Dict] = None, stream: bool = False
+    ) -> Any:
+        """Send a request, retrying connect failures and retryable statuses."""
+        url = f"{self.base_url}{endpoint}"
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.request(method, url, json=data, stream=stream)
+            except self.transport.connect_errors:
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+            else:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if not self.retry_policy.should_retry(attempt, response.status_code, method, retry_after):
+                    return response
+                await response.aclose()
+                await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+            self.retries += 1
@@ -0,0 +1,238 @@
+"""
+HelixFlow Client-Side Response Cache
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def request_key(method: str, endpoint: str, data: Optional[Dict] = None,
+                api_key: str = "", base_url: str = "") -> str:
+    """Canonical hash of a request: key order and whitespace do not matter.
+
+    The server and (hashed) credentials are part of the key, so a cache
+    shared between clients never serves one tenant another's responses.
+    """
+    credential = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    canonical = json.dumps(
+        [credential, base_url, method.upper(), endpoint, data],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(data: Dict) -> bool:
+    """Whether a chat request always yields the same completion (temperature 0, no sampling)."""
+    return (
+        data.get("temperature") == 0
+        and not data.get("stream")
+        and data.get("n", 1) == 1
+    )
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class DiskCache:
+    """Persistent store for deterministic completions, backed by SQLite.
+
+    Entries older than ``ttl`` seconds are ignored and purged, and at most
+    ``maxsize`` of the newest entries are kept.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600.0, maxsize: int = 10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key NOT IN "
+            "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+            (self.maxsize,),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ResponseCache:
+    """Opt-in cache for ``HelixFlow``.
+
+    Model metadata (``list_models``/``get_model``) is kept in memory for
+    ``metadata_ttl`` seconds. Deterministic chat completions (temperature 0)
+    are kept for ``completion_ttl`` seconds and, when ``disk_path`` is set,
+    persisted across processes (up to ``disk_maxsize`` entries). Concurrent
+    identical requests share one in-flight HTTP call.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        metadata_ttl: float = 300.0,
+        completion_ttl: float = 3600.0,
+        disk_path: Optional[str] = None,
+        disk_maxsize: int = 10000,
+    ):
+        self.memory = TTLCache(maxsize=maxsize, ttl=metadata_ttl)
+        self.completion_ttl = completion_ttl
+        self.disk = DiskCache(disk_path, ttl=completion_ttl, maxsize=disk_maxsize) if disk_path else None
+        self.singleflight = SingleFlight()
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], ttl: Optional[float] = None,
+                     persist: bool = False) -> Any:
+        found, value = self.memory.get(key)
+        if found:
+            return copy.deepcopy(value)
+
+        def load() -> Any:
+            if persist and self.disk is not None:
+                found, value = self.disk.get(key)
+                if found:
+                    self.memory.set(key, value, ttl)
+                    return value
+            value = fetch()
+            self.memory.set(key, value, ttl)
+            if persist and self.disk is not None:
+                self.disk.set(key, value)
+            return value
+
+        return copy.deepcopy(self.singleflight.do(key, load))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.memory),
+            "hits": self.memory.hits,
+            "misses": self.memory.misses,
+            "coalesced": self.singleflight.coalesced,
+        }
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
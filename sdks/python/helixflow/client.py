@@ -2,26 +2,88 @@
 HelixFlow Python Client
 """
 
-import requests
 import json
 import time
-from typing import Dict, List, Optional, Union, Iterator
+import logging
+from typing import Any, Callable, Dict, List, Optional, Union, Iterator
+from .cache import ResponseCache, is_deterministic, request_key
 from .exceptions import HelixFlowError, AuthenticationError, RateLimitError, APIError
+from .memory import (
+    CachedEmbedder,
+    HashingEmbedder,
+    LocalVectorIndex,
+    MemoryRecord,
+    MemoryWriter,
+    QdrantClient,
+    QdrantVectorIndex,
+    latest_user_turn,
+    merge_memories,
+)
+from .streaming import ChatCompletionStream, get_json_loads
+from .transport import RetryPolicy, Transport, create_transport, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+def raise_for_status(response: Any) -> None:
+    """Raise the matching HelixFlow exception for an error response."""
+    if response.status_code == 401:
+        raise AuthenticationError("Invalid API key")
+    elif response.status_code == 429:
+        raise RateLimitError(
+            "Rate limit exceeded",
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+    elif response.status_code >= 400:
+        try:
+            error_data = response.json()
+            raise APIError(f"API error: {error_data.get('error', 'Unknown error')}")
+        except json.JSONDecodeError:
+            raise APIError(f"HTTP {response.status_code}: {response.text}")
 
 
 class HelixFlow:
-    """Main HelixFlow client class."""
+    """Main HelixFlow client class.
+
+    Requests go through a pooled ``Transport`` (``requests`` by default,
+    httpx with ``http2=True``). Rate-limited and transient failures are
+    retried with jittered exponential backoff, honoring ``Retry-After``;
+    server errors are retried only for idempotent (non-POST) requests.
+    Pass a ``ResponseCache`` to cache model metadata and deterministic
+    completions and to coalesce identical concurrent requests.
+    """
 
-    def __init__(self, api_key: str, base_url: str = "https://api.helixflow.ai"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.helixflow.ai",
+        transport: Optional[Transport] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        http2: bool = False,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        json_backend: str = "auto",
+        cache: Optional[ResponseCache] = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
-        self.session = requests.Session()
-        self.session.headers.update(
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retries = 0
+        self.cache = cache
+        self._json_loads = get_json_loads(json_backend)
+        self.transport = transport or create_transport(
             {
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
-            }
+            },
+            http2=http2,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
         )
+        # Kept for callers that configured the requests session directly.
+        self.session = getattr(self.transport, "session", None)
 
     def chat_completion(
         self, model: str, messages: List[Dict[str, str]], **kwargs
@@ -29,96 +91,270 @@ class HelixFlow:
         """Create a chat completion."""
         data = {"model": model, "messages": messages, **kwargs}
 
+        if self.cache is not None and is_deterministic(data):
+            return self.cache.get_or_fetch(
+                request_key("POST", "/v1/chat/completions", data, self.api_key, self.base_url),
+                lambda: self._post("/v1/chat/completions", data),
+                ttl=self.cache.completion_ttl,
+                persist=True,
+            )
+
         response = self._post("/v1/chat/completions", data)
         return response
 
     def chat_completion_stream(
         self, model: str, messages: List[Dict[str, str]], **kwargs
-    ) -> Iterator[Dict]:
-        """Create a streaming chat completion."""
+    ) -> ChatCompletionStream:
+        """Create a streaming chat completion.
+
+        Iterate the result for chunks; its ``stats`` report time to first
+        token and inter-token timing. Malformed chunks raise ``StreamError``.
+        """
         data = {"model": model, "messages": messages, "stream": True, **kwargs}
 
-        response = self._post_stream("/v1/chat/completions", data)
+        return ChatCompletionStream(
+            self._stream_bytes("/v1/chat/completions", data), loads=self._json_loads
+        )
+
+    def chat_completion_batch(
+        self,
+        requests: List[Union[Dict, List[Dict[str, str]]]],
+        model: Optional[str] = None,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """Submit many chat completions in one call and yield results as they complete.
+
+        Each entry is a request dict (``model``, ``messages``, ...) or just a
+        messages list; ``model`` and ``kwargs`` are defaults for every entry.
+        Results carry the entry's ``index`` since they arrive out of order.
+        """
+        data = self._batch_payload(requests, model, **kwargs)
+        data["stream"] = True
 
-        for line in response.iter_lines():
+        response = self._post_stream("/v1/chat/completions/batch", data)
+        for line in self.transport.iter_lines(response):
             if line:
-                line = line.decode("utf-8")
-                if line.startswith("data: "):
-                    data_str = line[6:]
-                    if data_str == "[DONE]":
-                        break
-                    try:
-                        chunk = json.loads(data_str)
-                        yield chunk
-                    except json.JSONDecodeError:
-                        continue
+                yield json.loads(line)
+
+    def create_batch(
+        self,
+        requests: List[Union[Dict, List[Dict[str, str]]]],
+        model: Optional[str] = None,
+        **kwargs,
+    ) -> Dict:
+        """Submit a batch without waiting; poll it with ``get_batch``."""
+        return self._post("/v1/chat/completions/batch", self._batch_payload(requests, model, **kwargs))
+
+    def get_batch(self, batch_id: str) -> Dict:
+        """Get the status (and, once finished, the results) of a batch."""
+        return self._get(f"/v1/batches/{batch_id}")
+
+    @staticmethod
+    def _batch_payload(requests: List[Union[Dict, List[Dict[str, str]]]], model: Optional[str], **kwargs) -> Dict:
+        items = [{"messages": r} if isinstance(r, list) else r for r in requests]
+        payload = {"requests": items, **kwargs}
+        if model:
+            payload["model"] = model
+        return payload
 
     def list_models(self) -> Dict:
         """List available models."""
-        return self._get("/v1/models")
+        return self._cached_get("/v1/models")
 
     def get_model(self, model_id: str) -> Dict:
         """Get information about a specific model."""
-        return self._get(f"/v1/models/{model_id}")
+        return self._cached_get(f"/v1/models/{model_id}")
+
+    def transport_stats(self) -> Dict[str, Any]:
+        """Connection reuse and retry counters."""
+        return {**self.transport.stats(), "retries": self.retries}
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.transport.close()
+
+    def __enter__(self) -> "HelixFlow":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _cached_get(self, endpoint: str) -> Dict:
+        """GET through the response cache when one is configured."""
+        if self.cache is None:
+            return self._get(endpoint)
+        return self.cache.get_or_fetch(
+            request_key("GET", endpoint, api_key=self.api_key, base_url=self.base_url),
+            lambda: self._get(endpoint),
+        )
 
     def _get(self, endpoint: str) -> Dict:
         """Make a GET request."""
-        url = f"{self.base_url}{endpoint}"
-        response = self.session.get(url)
+        response = self._request("GET", endpoint)
         return self._handle_response(response)
 
     def _post(self, endpoint: str, data: Dict) -> Dict:
         """Make a POST request."""
-        url = f"{self.base_url}{endpoint}"
-        response = self.session.post(url, json=data)
+        response = self._request("POST", endpoint, data)
         return self._handle_response(response)
 
-    def _post_stream(self, endpoint: str, data: Dict) -> requests.Response:
+    def _post_stream(self, endpoint: str, data: Dict) -> Any:
         """Make a streaming POST request."""
-        url = f"{self.base_url}{endpoint}"
-        response = self.session.post(url, json=data, stream=True)
-        self._handle_response(response)  # Check for errors
+        response = self._request("POST", endpoint, data, stream=True)
+        self._raise_for_status(response)
         return response
 
-    def _handle_response(self, response: requests.Response) -> Dict:
-        """Handle API response."""
-        if response.status_code == 401:
-            raise AuthenticationError("Invalid API key")
-        elif response.status_code == 429:
-            raise RateLimitError("Rate limit exceeded")
-        elif not response.ok:
+    def _stream_bytes(self, endpoint: str, data: Dict) -> Iterator[bytes]:
+        """Send a streaming POST on first use and yield the raw body."""
+        response = self._post_stream(endpoint, data)
+        try:
+            yield from self.transport.iter_bytes(response)
+        finally:
+            response.close()
+
+    def _request(
+        self, method: str, endpoint: str, data: Optional[Dict] = None, stream: bool = False
+    ) -> Any:
+        """Send a request, retrying connect failures and retryable statuses."""
+        url = f"{self.base_url}{endpoint}"
+        attempt = 0
+        while True:
             try:
-                error_data = response.json()
-                raise APIError(f"API error: {error_data.get('error', 'Unknown error')}")
-            except json.JSONDecodeError:
-                raise APIError(f"HTTP {response.status_code}: {response.text}")
+                response = self.transport.request(method, url, json=data, stream=stream)
+            except self.transport.connect_errors:
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+            else:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if not self.retry_policy.should_retry(attempt, response.status_code, method, retry_after):
+                    return response
+                response.close()
+                time.sleep(self.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+            self.retries += 1
+
+    def _raise_for_status(self, response: Any) -> None:
+        """Raise the matching HelixFlow exception for an error response."""
+        raise_for_status(response)
 
+    def _handle_response(self, response: Any) -> Dict:
+        """Handle API response."""
+        self._raise_for_status(response)
         return response.json()
 
 
 class CogneeMemoryEngine:
-    """Cognee memory enhancement for HelixFlow."""
+    """Cognee memory enhancement for HelixFlow.
+
+    ``enhance_chat`` embeds the latest user turn and looks up the user's
+    top-k memories in a vector index: Qdrant when ``vector_db_url`` is given
+    and qdrant-client is installed, otherwise an in-process index.
+    Qdrant queries give up after ``retrieval_timeout`` seconds; a failed
+    retrieval is counted and the chat proceeds without memories, so memory
+    adds bounded latency. Retrieved memories are merged under
+    ``memory_token_budget``.
+
+    With ``write_back`` the user turn and the assistant reply are handed to
+    a ``MemoryWriter`` after each completion; embedding, de-duplication and
+    compaction happen on its background thread, off the chat path.
+    """
 
     def __init__(
         self,
         api_key: str,
         graph_db_url: Optional[str] = None,
         vector_db_url: Optional[str] = None,
+        client: Optional[HelixFlow] = None,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        index: Optional[Any] = None,
+        top_k: int = 5,
+        min_score: float = 0.2,
+        memory_token_budget: int = 512,
+        retrieval_timeout: float = 0.25,
+        write_back: bool = True,
+        max_memories_per_user: int = 1000,
     ):
         self.api_key = api_key
         self.graph_db_url = graph_db_url or "bolt://localhost:7687"
         self.vector_db_url = vector_db_url or "http://localhost:6333"
-        self.client = HelixFlow(api_key)
+        self.client = client or HelixFlow(api_key)
+        self.embed = CachedEmbedder(embed or HashingEmbedder())
+        if index is None:
+            if vector_db_url and QdrantClient is not None:
+                index = QdrantVectorIndex(
+                    vector_db_url, dim=len(self.embed("dimension probe")), timeout=retrieval_timeout
+                )
+            else:
+                index = LocalVectorIndex()
+        self.index = index
+        self.top_k = top_k
+        self.min_score = min_score
+        self.memory_token_budget = memory_token_budget
+        self.retrieval_timeout = retrieval_timeout
+        self.retrieval_failures = 0
+        self.writer = (
+            MemoryWriter(self.index, self.embed, max_memories_per_user=max_memories_per_user)
+            if write_back else None
+        )
 
-    def enhance_chat(self, model: str, messages: List[Dict], **kwargs) -> Dict:
-        """Enhanced chat completion with memory."""
-        # Add memory context to messages
-        enhanced_messages = self._add_memory_context(messages)
+    def enhance_chat(self, model: str, messages: List[Dict], user_id: Optional[str] = None, **kwargs) -> Dict:
+        """Enhanced chat completion with memory.
 
-        return self.client.chat_completion(model, enhanced_messages, **kwargs)
+        Memories are partitioned by ``user_id`` (``"default"`` when omitted);
+        it is forwarded as the request's ``user`` only when given.
+        """
+        if user_id is not None:
+            kwargs.setdefault("user", user_id)
+        user_id = user_id or "default"
+
+        try:
+            memories = self._retrieve(user_id, messages)
+        except Exception as e:
+            self.retrieval_failures += 1
+            logger.warning(f"Memory retrieval failed for {user_id}: {e}")
+            memories = []
+
+        enhanced_messages = merge_memories(messages, memories, self.memory_token_budget)
+        response = self.client.chat_completion(model, enhanced_messages, **kwargs)
+        if self.writer is not None:
+            self._write_back(user_id, messages, response)
+        return response
 
-    def _add_memory_context(self, messages: List[Dict]) -> List[Dict]:
+    def add_memory(self, user_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> MemoryRecord:
+        """Store a memory for ``user_id`` immediately."""
+        record = MemoryRecord(user_id, text, self.embed(text), metadata=metadata)
+        self.index.upsert([record])
+        return record
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued memory writes to reach the index."""
+        return self.writer.flush(timeout) if self.writer is not None else True
+
+    def close(self) -> None:
+        """Drain pending memory writes and stop the writer thread."""
+        if self.writer is not None:
+            self.writer.close()
+
+    def _write_back(self, user_id: str, messages: List[Dict], response: Dict) -> None:
+        """Queue the latest user turn and the assistant reply for ingestion."""
+        query = latest_user_turn(messages)
+        if query:
+            self.writer.enqueue(user_id, query, {"role": "user"})
+        choices = response.get("choices") or []
+        reply = (choices[0].get("message") or {}).get("content") if choices else None
+        if reply:
+            self.writer.enqueue(user_id, reply, {"role": "assistant"})
+
+    def _add_memory_context(self, messages: List[Dict], user_id: str = "default") -> List[Dict]:
         """Add relevant memory context to messages."""
-        # This would query the knowledge graph and vector database
-        # For now, return messages unchanged
-        return messages
+        return merge_memories(messages, self._retrieve(user_id, messages), self.memory_token_budget)
+
+    def _retrieve(self, user_id: str, messages: List[Dict]) -> List[str]:
+        """Texts of the best-matching memories not already in the conversation."""
+        query = latest_user_turn(messages)
+        if not query:
+            return []
+        hits = self.index.search(user_id, self.embed(query), self.top_k, self.min_score)
+        present = {m.get("content") for m in messages}
+        return [hit["record"].text for hit in hits if hit["record"].text not in present]
@@ -2,6 +2,8 @@
 HelixFlow Exceptions
 """
 
+from typing import Optional
+
 class HelixFlowError(Exception):
     """Base exception for HelixFlow errors."""
     pass
@@ -12,8 +14,15 @@ class AuthenticationError(HelixFlowError):
 
 class RateLimitError(HelixFlowError):
     """Raised when rate limit is exceeded."""
-    pass
+
+    def __init__(self, message: str = "Rate limit exceeded", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 class APIError(HelixFlowError):
     """Raised when API returns an error."""
     pass
+
+class StreamError(HelixFlowError):
+    """Raised when a streamed response cannot be decoded."""
+    pass
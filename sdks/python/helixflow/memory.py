@@ -0,0 +1,394 @@
+"""
+HelixFlow Memory Retrieval
+"""
+
+import hashlib
+import heapq
+import math
+import queue
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .cache import TTLCache
+
+try:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qdrant_models
+except ImportError:  # pragma: no cover - optional dependency (helixflow[cognee])
+    QdrantClient = None
+
+Embedding = List[float]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting prompts."""
+    return max(1, (len(text) + 3) // 4)
+
+
+class HashingEmbedder:
+    """Dependency-free embedder using signed feature hashing of words and bigrams.
+
+    Good enough for recalling memories that share vocabulary with the
+    current turn; pass a model-backed ``embed`` callable to
+    ``CogneeMemoryEngine`` for semantic recall.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, text: str) -> Embedding:
+        vector = [0.0] * self.dim
+        words = _TOKEN_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dim] += sign
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+class CachedEmbedder:
+    """Memoizes an embedder by text hash so repeated turns are embedded once."""
+
+    def __init__(self, embed: Callable[[str], Embedding], maxsize: int = 4096):
+        self.embed = embed
+        self.cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def __call__(self, text: str) -> Embedding:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        found, vector = self.cache.get(key)
+        if not found:
+            vector = self.embed(text)
+            self.cache.set(key, vector)
+        return vector
+
+
+class MemoryRecord:
+    """A remembered piece of text for one user."""
+
+    __slots__ = ("id", "user_id", "text", "embedding", "created_at", "metadata")
+
+    def __init__(self, user_id: str, text: str, embedding: Embedding,
+                 id: Optional[str] = None, created_at: Optional[float] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.id = id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.text = text
+        self.embedding = embedding
+        self.created_at = created_at if created_at is not None else time.time()
+        self.metadata = metadata or {}
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class LocalVectorIndex:
+    """In-process vector index used when no Qdrant instance is configured.
+
+    Embeddings are expected to be L2-normalized, so the dot product is the
+    cosine similarity.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, MemoryRecord]] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, records: Sequence[MemoryRecord]) -> None:
+        with self._lock:
+            for record in records:
+                self._records.setdefault(record.user_id, {})[record.id] = record
+
+    def delete(self, user_id: str, ids: Sequence[str]) -> None:
+        with self._lock:
+            user_records = self._records.get(user_id, {})
+            for record_id in ids:
+                user_records.pop(record_id, None)
+
+    def records(self, user_id: str) -> List[MemoryRecord]:
+        with self._lock:
+            return list(self._records.get(user_id, {}).values())
+
+    def count(self, user_id: str) -> int:
+        with self._lock:
+            return len(self._records.get(user_id, {}))
+
+    def search(self, user_id: str, embedding: Embedding, limit: int,
+               min_score: float = 0.0) -> List[Dict[str, Any]]:
+        candidates = self.records(user_id)
+        scored = ((_dot(embedding, r.embedding), r) for r in candidates)
+        best = heapq.nlargest(limit, scored, key=lambda item: item[0])
+        return [{"record": r, "score": score} for score, r in best if score >= min_score]
+
+
+class QdrantVectorIndex:
+    """Vector index stored in a Qdrant collection, partitioned by ``user_id``."""
+
+    def __init__(self, url: str, collection: str = "helixflow_memories", dim: int = 256,
+                 timeout: Optional[float] = None):
+        if QdrantClient is None:
+            raise ImportError("qdrant-client is required for QdrantVectorIndex (pip install helixflow[cognee])")
+        self.client = QdrantClient(url=url, timeout=timeout)
+        self.collection = collection
+        collections = {c.name for c in self.client.get_collections().collections}
+        if collection not in collections:
+            self.client.create_collection(
+                collection,
+                vectors_config=qdrant_models.VectorParams(size=dim, distance=qdrant_models.Distance.COSINE),
+            )
+
+    def _user_filter(self, user_id: str) -> Any:
+        return qdrant_models.Filter(must=[
+            qdrant_models.FieldCondition(key="user_id", match=qdrant_models.MatchValue(value=user_id))
+        ])
+
+    def upsert(self, records: Sequence[MemoryRecord]) -> None:
+        self.client.upsert(self.collection, points=[
+            qdrant_models.PointStruct(
+                id=str(uuid.UUID(hex=r.id)),
+                vector=r.embedding,
+                payload={"user_id": r.user_id, "text": r.text, "created_at": r.created_at, **r.metadata},
+            )
+            for r in records
+        ])
+
+    def delete(self, user_id: str, ids: Sequence[str]) -> None:
+        self.client.delete(
+            self.collection,
+            points_selector=qdrant_models.PointIdsList(points=[str(uuid.UUID(hex=i)) for i in ids]),
+        )
+
+    def records(self, user_id: str) -> List[MemoryRecord]:
+        points, _ = self.client.scroll(
+            self.collection, scroll_filter=self._user_filter(user_id), with_vectors=True, limit=10000
+        )
+        return [self._to_record(p) for p in points]
+
+    def count(self, user_id: str) -> int:
+        return self.client.count(self.collection, count_filter=self._user_filter(user_id)).count
+
+    def search(self, user_id: str, embedding: Embedding, limit: int,
+               min_score: float = 0.0) -> List[Dict[str, Any]]:
+        hits = self.client.search(
+            self.collection,
+            query_vector=embedding,
+            query_filter=self._user_filter(user_id),
+            limit=limit,
+            score_threshold=min_score,
+        )
+        return [{"record": self._to_record(hit), "score": hit.score} for hit in hits]
+
+    @staticmethod
+    def _to_record(point: Any) -> MemoryRecord:
+        payload = dict(point.payload or {})
+        return MemoryRecord(
+            user_id=payload.pop("user_id"),
+            text=payload.pop("text"),
+            embedding=list(point.vector or []),
+            id=uuid.UUID(str(point.id)).hex,
+            created_at=payload.pop("created_at", None),
+            metadata=payload,
+        )
+
+
+def latest_user_turn(messages: List[Dict]) -> Optional[str]:
+    for message in reversed(messages):
+        if message.get("role") == "user" and message.get("content"):
+            return message["content"]
+    return None
+
+
+def merge_memories(messages: List[Dict], memories: List[str], token_budget: int) -> List[Dict]:
+    """Insert memories as a system message after any leading system prompts.
+
+    Memories are taken in order (best first) until ``token_budget`` would be
+    exceeded; the input list is not modified.
+    """
+    selected: List[str] = []
+    used = 0
+    for text in memories:
+        cost = estimate_tokens(text)
+        if used + cost > token_budget:
+            break
+        selected.append(text)
+        used += cost
+    if not selected:
+        return messages
+
+    context = {
+        "role": "system",
+        "content": "Relevant memories from earlier conversations:\n" + "\n".join(f"- {t}" for t in selected),
+    }
+    insert_at = 0
+    while insert_at < len(messages) and messages[insert_at].get("role") == "system":
+        insert_at += 1
+    return messages[:insert_at] + [context] + messages[insert_at:]
+
+
+def extractive_summary(texts: List[str], token_budget: int = 256) -> str:
+    """Join memories oldest-first, trimmed to roughly ``token_budget`` tokens."""
+    summary = " | ".join(t.strip().replace("\n", " ") for t in texts)
+    limit = token_budget * 4
+    return summary if len(summary) <= limit else summary[:limit - 3] + "..."
+
+
+class MemoryWriter:
+    """Background ingestion of conversation turns into a vector index.
+
+    ``enqueue`` only appends to a queue. A worker thread drains it in
+    batches of up to ``batch_size`` (or every ``flush_interval`` seconds),
+    embeds the batch, drops near-duplicates (cosine similarity at or above
+    ``dedupe_threshold`` to a stored or batched memory) and upserts the
+    rest in one call. Every ``compaction_interval`` seconds users written
+    to since the last pass are compacted: while a user holds more than
+    ``max_memories_per_user`` records, the oldest ``compact_batch`` are
+    replaced by one summary record.
+    """
+
+    def __init__(
+        self,
+        index: Any,
+        embed: Callable[[str], Embedding],
+        summarize: Optional[Callable[[List[str]], str]] = None,
+        batch_size: int = 32,
+        flush_interval: float = 0.5,
+        dedupe_threshold: float = 0.95,
+        max_memories_per_user: int = 1000,
+        compact_batch: int = 20,
+        compaction_interval: float = 60.0,
+        max_queue_size: int = 10000,
+    ):
+        self.index = index
+        self.embed = embed
+        self.summarize = summarize or extractive_summary
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_threshold = dedupe_threshold
+        self.max_memories_per_user = max_memories_per_user
+        self.compact_batch = max(2, compact_batch)
+        self.compaction_interval = compaction_interval
+        self.stats = {"enqueued": 0, "dropped": 0, "written": 0, "duplicates": 0, "compacted": 0, "errors": 0}
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue_size)
+        self._dirty_users: set = set()
+        self._last_compaction = time.monotonic()
+        self._pending = 0
+        self._drained = threading.Condition()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cognee-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, user_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a memory for ingestion; returns False if the queue is full."""
+        with self._drained:
+            try:
+                self._queue.put_nowait((user_id, text, metadata or {}))
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return False
+            self._pending += 1
+        self.stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything enqueued so far has been written."""
+        with self._drained:
+            return self._drained.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the worker once the queue is drained; never blocks on a full queue."""
+        self._closing.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # the worker sees the flag within flush_interval
+        self._thread.join(timeout)
+
+    def compact(self, user_id: str) -> int:
+        """Summarize a user's oldest memories until they are under the cap."""
+        compacted = 0
+        while self.index.count(user_id) > self.max_memories_per_user:
+            oldest = sorted(self.index.records(user_id), key=lambda r: r.created_at)[:self.compact_batch]
+            summary = self.summarize([r.text for r in oldest])
+            record = MemoryRecord(
+                user_id, summary, self.embed(summary),
+                created_at=oldest[-1].created_at,
+                metadata={"summary": True, "sources": len(oldest)},
+            )
+            self.index.upsert([record])
+            self.index.delete(user_id, [r.id for r in oldest])
+            compacted += len(oldest)
+        self.stats["compacted"] += compacted
+        return compacted
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            batch, closing = self._next_batch()
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.stats["errors"] += 1
+            if closing or time.monotonic() - self._last_compaction >= self.compaction_interval:
+                self._compact_dirty()
+            if batch:
+                with self._drained:
+                    self._pending -= len(batch)
+                    self._drained.notify_all()
+
+    def _next_batch(self) -> Tuple[List[tuple], bool]:
+        """Up to ``batch_size`` queued items and whether ``close`` was requested."""
+        batch: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if batch:
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+            except queue.Empty:
+                return batch, self._closing.is_set()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[tuple]) -> None:
+        embed_batch = getattr(self.embed, "embed_batch", None)
+        texts = [text for _, text, _ in batch]
+        vectors = embed_batch(texts) if embed_batch else [self.embed(t) for t in texts]
+
+        accepted: Dict[str, List[MemoryRecord]] = {}
+        for (user_id, text, metadata), vector in zip(batch, vectors):
+            pending = accepted.setdefault(user_id, [])
+            if self._is_duplicate(user_id, vector, pending):
+                self.stats["duplicates"] += 1
+                continue
+            pending.append(MemoryRecord(user_id, text, vector, metadata=metadata))
+
+        records = [r for user_records in accepted.values() for r in user_records]
+        if records:
+            self.index.upsert(records)
+            self.stats["written"] += len(records)
+            self._dirty_users.update(accepted)
+
+    def _is_duplicate(self, user_id: str, vector: Embedding, pending: List[MemoryRecord]) -> bool:
+        if any(_dot(vector, r.embedding) >= self.dedupe_threshold for r in pending):
+            return True
+        return bool(self.index.search(user_id, vector, 1, min_score=self.dedupe_threshold))
+
+    def _compact_dirty(self) -> None:
+        users, self._dirty_users = self._dirty_users, set()
+        for user_id in users:
+            try:
+                self.compact(user_id)
+            except Exception:
+                self.stats["errors"] += 1
+        self._last_compaction = time.monotonic()
@@ -0,0 +1,258 @@
+"""
+HelixFlow Server-Sent Events streaming
+"""
+
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .exceptions import APIError, StreamError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def get_json_loads(backend: str = "auto") -> Callable[[bytes], Any]:
+    """Return a ``loads`` accepting bytes: orjson when available (or requested), else json."""
+    if backend == "orjson" or (backend == "auto" and orjson is not None):
+        if orjson is None:
+            raise ImportError("orjson is required for the orjson JSON backend")
+        return orjson.loads
+    if backend not in ("auto", "json"):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    return json.loads
+
+
+class SSEEvent:
+    """A dispatched SSE event; ``data`` is the raw UTF-8 payload."""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, event: str, data: bytes, id: Optional[str], retry: Optional[int]):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self) -> str:
+        return f"SSEEvent(event={self.event!r}, data={self.data!r}, id={self.id!r})"
+
+
+class SSEDecoder:
+    """Incremental SSE decoder working directly on the received byte buffer.
+
+    Network chunks are appended to one ``bytearray``; complete lines are
+    located with ``find`` and sliced through a ``memoryview`` so no
+    per-line ``bytes``/``str`` objects are created. Only ``data`` payloads
+    are copied out, once, and handed to the JSON parser still as bytes.
+    Multi-line ``data:`` fields are joined with ``\\n`` per the SSE spec;
+    ``event:``, ``id:`` and ``retry:`` fields and ``:`` comments are
+    handled. Lines may end in ``\\n`` or ``\\r\\n``.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[bytes] = []
+        self._event: Optional[str] = None
+        self._retry: Optional[int] = None
+        self.last_event_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Consume a chunk of bytes and return the events it completed."""
+        buffer = self._buffer
+        buffer += chunk
+        events: List[SSEEvent] = []
+        start = 0
+        view = memoryview(buffer)
+        try:
+            while True:
+                newline = buffer.find(b"\n", start)
+                if newline == -1:
+                    break
+                end = newline - 1 if newline > start and buffer[newline - 1] == 13 else newline
+                self._process_line(buffer, view, start, end, events)
+                start = newline + 1
+        finally:
+            view.release()
+        if start:
+            del buffer[:start]
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """Dispatch a trailing event the server did not terminate with a blank line."""
+        events: List[SSEEvent] = []
+        if self._buffer:
+            self.feed(b"\n")
+        self._dispatch(events)
+        return events
+
+    def _process_line(self, buffer: bytearray, view: memoryview, start: int, end: int,
+                      events: List[SSEEvent]) -> None:
+        if start == end:
+            self._dispatch(events)
+            return
+        if buffer[start] == 58:  # ":" comment / keep-alive
+            return
+
+        colon = buffer.find(b":", start, end)
+        if colon == -1:
+            field, value_start = view[start:end], end
+        else:
+            field, value_start = view[start:colon], colon + 1
+            if value_start < end and buffer[value_start] == 32:
+                value_start += 1
+
+        if field == b"data":
+            self._data.append(bytes(view[value_start:end]))
+        elif field == b"event":
+            self._event = bytes(view[value_start:end]).decode("utf-8")
+        elif field == b"id":
+            self.last_event_id = bytes(view[value_start:end]).decode("utf-8")
+        elif field == b"retry":
+            value = bytes(view[value_start:end])
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self, events: List[SSEEvent]) -> None:
+        if not self._data:
+            self._event = None
+            return
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        events.append(SSEEvent(self._event or "message", data, self.last_event_id, self._retry))
+        self._data = []
+        self._event = None
+
+
+class StreamStats:
+    """Per-stream latency: time to first token and gaps between tokens."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.inter_token_times: List[float] = []
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from sending the request to the first content chunk."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    def record_chunk(self, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.inter_token_times.append(now - self.last_token_at)
+        self.last_token_at = now
+        self.chunks += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        gaps = sorted(self.inter_token_times)
+
+        def percentile(q: float) -> Optional[float]:
+            return gaps[min(int(q * len(gaps)), len(gaps) - 1)] if gaps else None
+
+        end = self.finished_at or self.last_token_at
+        return {
+            "ttft": self.ttft,
+            "chunks": self.chunks,
+            "total_time": (end - self.started) if end is not None else None,
+            "inter_token_mean": (sum(gaps) / len(gaps)) if gaps else None,
+            "inter_token_p50": percentile(0.5),
+            "inter_token_p95": percentile(0.95),
+            "inter_token_max": gaps[-1] if gaps else None,
+        }
+
+
+class _ChatCompletionStreamBase:
+    def __init__(self, loads: Callable[[bytes], Any]):
+        self.decoder = SSEDecoder()
+        self.stats = StreamStats()
+        self._loads = loads
+        self._done = False
+
+    def _handle_event(self, event: SSEEvent) -> Optional[Dict]:
+        """Parsed chunk for ``event``; ``None`` once the stream reports ``[DONE]``."""
+        if event.data == b"[DONE]":
+            self._done = True
+            return None
+        try:
+            payload = self._loads(event.data)
+        except ValueError as e:
+            raise StreamError(f"Malformed stream chunk: {event.data[:200]!r}") from e
+        if event.event == "error" or (isinstance(payload, dict) and "error" in payload and "choices" not in payload):
+            error = payload.get("error", payload) if isinstance(payload, dict) else payload
+            message = error.get("message", error) if isinstance(error, dict) else error
+            raise APIError(f"API error: {message}")
+        self.stats.record_chunk()
+        return payload
+
+    def _finish(self) -> None:
+        self.stats.finished_at = time.perf_counter()
+
+
+class ChatCompletionStream(_ChatCompletionStreamBase):
+    """Iterator of chat completion chunks decoded from an SSE byte stream.
+
+    ``chunks`` is typically a generator that sends the request on first use,
+    so timing starts when iteration does. ``stats`` holds the stream's TTFT
+    and inter-token timings.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], loads: Callable[[bytes], Any] = json.loads):
+        super().__init__(loads)
+        self._chunks = iter(chunks)
+
+    def __iter__(self) -> Iterator[Dict]:
+        self.stats.started = time.perf_counter()
+        try:
+            for chunk in self._chunks:
+                for event in self.decoder.feed(chunk):
+                    payload = self._handle_event(event)
+                    if self._done:
+                        return
+                    yield payload
+            for event in self.decoder.flush():
+                payload = self._handle_event(event)
+                if self._done:
+                    return
+                yield payload
+        finally:
+            self._finish()
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+
+
+class AsyncChatCompletionStream(_ChatCompletionStreamBase):
+    """Async counterpart of ``ChatCompletionStream``."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], loads: Callable[[bytes], Any] = json.loads):
+        super().__init__(loads)
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[Dict]:
+        self.stats.started = time.perf_counter()
+        try:
+            async for chunk in self._chunks:
+                for event in self.decoder.feed(chunk):
+                    payload = self._handle_event(event)
+                    if self._done:
+                        return
+                    yield payload
+            for event in self.decoder.flush():
+                payload = self._handle_event(event)
+                if self._done:
+                    return
+                yield payload
+        finally:
+            self._finish()
+            aclose = getattr(self._chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,377 @@
+"""
+HelixFlow HTTP Transport
+"""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+try:
+    import requests
+    import urllib3
+    from requests.adapters import HTTPAdapter
+except ImportError:  # pragma: no cover - httpx-only installs
+    requests = None
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# A 429 means the request was not processed. A 5xx may arrive after a
+# completion was already produced (and billed), so those are only retried
+# for methods that are safe to repeat.
+UNPROCESSED_STATUSES = (429,)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that honors ``Retry-After``.
+
+    ``Retry-After`` is slept in full; when the server asks for more than
+    ``max_retry_after`` seconds the request is not retried and the error
+    response is returned to the caller instead. Server errors (5xx) are
+    only retried for idempotent methods, so a ``POST`` that may already
+    have produced a completion is never sent twice.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 60.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def should_retry(
+        self,
+        attempt: int,
+        status_code: Optional[int] = None,
+        method: str = "GET",
+        retry_after: Optional[float] = None,
+    ) -> bool:
+        """Whether to retry; ``status_code=None`` means the connection could not be made."""
+        if attempt >= self.max_retries:
+            return False
+        if status_code is None:
+            return True
+        if status_code not in self.retry_statuses:
+            return False
+        if status_code not in UNPROCESSED_STATUSES and method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        if self.respect_retry_after and retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        return True
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number ``attempt + 1``."""
+        if self.respect_retry_after and retry_after is not None:
+            return max(retry_after, 0.0)
+        # "Full jitter": spreads retries from many clients across the window.
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class _ConnectionCounters:
+    """Counts requests against newly opened connections."""
+
+    def __init__(self):
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self._seen_streams: set = set()
+
+    def _track_network_stream(self, response: Any) -> None:
+        """Count a new connection unless httpx reused a known network stream."""
+        network_stream = response.extensions.get("network_stream")
+        key = id(network_stream) if network_stream is not None else None
+        if key is None or key not in self._seen_streams:
+            self.connections_opened += 1
+            if key is not None:
+                self._seen_streams.add(key)
+
+    def stats(self) -> Dict[str, Any]:
+        reused = max(self.requests_sent - self.connections_opened, 0)
+        return {
+            "requests_sent": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests_sent, 4) if self.requests_sent else 0.0,
+        }
+
+
+class Transport(_ConnectionCounters):
+    """Base class for the HTTP backends used by ``HelixFlow``.
+
+    A transport owns the connection pool and reports how often pooled
+    connections were reused instead of opening (and TLS-handshaking) new
+    ones.
+    """
+
+    #: Exceptions raised before the request reached the server; safe to retry.
+    connect_errors: Tuple[type, ...] = ()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Dict] = None,
+        stream: bool = False,
+    ) -> Any:
+        raise NotImplementedError
+
+    def iter_bytes(self, response: Any, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Body bytes as they arrive (``chunk_size=None``) or in fixed-size reads."""
+        raise NotImplementedError
+
+    def iter_lines(self, response: Any) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+if requests is not None:
+    class RequestsConnectError(requests.exceptions.ConnectionError):
+        """The connection could not be established, so nothing was sent."""
+else:  # pragma: no cover - httpx-only installs
+    RequestsConnectError = None
+
+
+def _never_connected(error: Exception) -> bool:
+    """Whether a ``requests`` ConnectionError happened while connecting.
+
+    ``requests`` uses ConnectionError both for connect failures (urllib3
+    ``MaxRetryError`` wrapping ``NewConnectionError``) and for connections
+    dropped mid-response ("Connection aborted"); only the former is safe to
+    retry for every method.
+    """
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+
+class RequestsTransport(Transport):
+    """HTTP/1.1 keep-alive transport built on ``requests.Session``."""
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+    ):
+        if requests is None:
+            raise ImportError("requests is required for RequestsTransport")
+        super().__init__()
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.connect_errors = (RequestsConnectError, requests.exceptions.ConnectTimeout)
+
+    def request(self, method, url, json=None, stream=False):
+        try:
+            response = self.session.request(method, url, json=json, stream=stream, timeout=self.timeout)
+        except requests.exceptions.ConnectTimeout:
+            raise
+        except requests.exceptions.ConnectionError as e:
+            if _never_connected(e):
+                raise RequestsConnectError(*e.args, request=e.request, response=e.response) from e
+            raise
+        self.requests_sent += 1
+        return response
+
+    def iter_bytes(self, response, chunk_size=None):
+        return response.iter_content(chunk_size=chunk_size)
+
+    def iter_lines(self, response):
+        return response.iter_lines()
+
+    def close(self):
+        self.session.close()
+
+    def stats(self):
+        # urllib3 counts the sockets each host pool has opened.
+        pools = self.adapter.poolmanager.pools
+        self.connections_opened = sum(
+            pools[key].num_connections for key in pools.keys()
+        )
+        return super().stats()
+
+
+class HTTPXTransport(Transport):
+    """Transport built on ``httpx.Client`` with optional HTTP/2 multiplexing.
+
+    With ``http2=True`` concurrent requests share a single TLS connection
+    per host instead of each holding one from the pool.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+    ):
+        if httpx is None:
+            raise ImportError("httpx is required for HTTPXTransport (pip install helixflow[http2])")
+        super().__init__()
+        self.client = httpx.Client(
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.connect_errors = (httpx.ConnectError, httpx.ConnectTimeout)
+
+    def request(self, method, url, json=None, stream=False):
+        request = self.client.build_request(method, url, json=json)
+        response = self.client.send(request, stream=stream)
+        self.requests_sent += 1
+        self._track_network_stream(response)
+        if stream and response.status_code >= 400:
+            # Error bodies are small; load them so callers can inspect the JSON.
+            response.read()
+        return response
+
+    def iter_bytes(self, response, chunk_size=None):
+        try:
+            yield from response.iter_bytes(chunk_size)
+        finally:
+            response.close()
+
+    def iter_lines(self, response):
+        try:
+            for line in response.iter_lines():
+                yield line.encode("utf-8")
+        finally:
+            response.close()
+
+    def close(self):
+        self.client.close()
+
+
+def create_transport(
+    headers: Dict[str, str],
+    http2: bool = False,
+    pool_maxsize: int = 10,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 60.0,
+) -> Transport:
+    """Pick a backend: httpx when HTTP/2 is requested, otherwise ``requests``."""
+    if http2 or requests is None:
+        return HTTPXTransport(
+            headers,
+            http2=http2,
+            max_connections=pool_maxsize,
+            max_keepalive_connections=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+    return RequestsTransport(
+        headers,
+        pool_maxsize=pool_maxsize,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+
+
+class AsyncTransport(_ConnectionCounters):
+    """Base class for the HTTP backends used by ``AsyncHelixFlow``."""
+
+    connect_errors: Tuple[type, ...] = ()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Dict] = None,
+        stream: bool = False,
+    ) -> Any:
+        raise NotImplementedError
+
+    def aiter_bytes(self, response: Any, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncHTTPXTransport(AsyncTransport):
+    """Transport built on ``httpx.AsyncClient``; HTTP/2 multiplexing is optional."""
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+    ):
+        if httpx is None:
+            raise ImportError("httpx is required for AsyncHelixFlow (pip install helixflow[async])")
+        super().__init__()
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.connect_errors = (httpx.ConnectError, httpx.ConnectTimeout)
+
+    async def request(self, method, url, json=None, stream=False):
+        request = self.client.build_request(method, url, json=json)
+        response = await self.client.send(request, stream=stream)
+        self.requests_sent += 1
+        self._track_network_stream(response)
+        if stream and response.status_code >= 400:
+            await response.aread()
+        return response
+
+    async def aiter_bytes(self, response, chunk_size=None):
+        try:
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def close(self):
+        await self.client.aclose()
@@ -30,5 +30,8 @@ setup(
     ],
     extras_require={
         "cognee": ["neo4j>=5.0.0", "qdrant-client>=1.0.0"],
+        "http2": ["httpx[http2]>=0.25.0"],
+        "async": ["httpx>=0.25.0"],
+        "fast-json": ["orjson>=3.8.0"],
     },
 )
@@ -103,5 +103,116 @@ class TestAPIGateway:
         # Should handle missing messages gracefully
         assert "error" in result or "choices" in result
 
+
+class FakeInferencePool:
+    """Records the micro-batches the gateway schedules."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_batch(self, model_id, prompts, max_tokens=150):
+        self.calls.append((model_id, len(prompts), max_tokens))
+        return {
+            "model": model_id,
+            "results": [{"generated_text": f"echo {p}", "tokens_used": 2} for p in prompts]
+        }
+
+
+class TestAPIGatewayBatch:
+    """Test cases for the batch chat-completion endpoint."""
+
+    def setup_method(self):
+        self.pool = FakeInferencePool()
+        self.gateway = APIGateway(inference_pool=self.pool)
+        self.gateway.batch_scheduler.max_batch_size = 4
+
+    def test_batch_is_grouped_into_micro_batches(self):
+        """Requests for the same model should share inference calls."""
+        payload = {
+            "model": "gpt-4",
+            "requests": [{"messages": [{"role": "user", "content": str(i)}]} for i in range(10)]
+        }
+
+        job = self.gateway.chat_completions_batch(payload)
+        lines = list(self.gateway.stream_batch_results(job["id"]))
+
+        assert job["object"] == "batch"
+        assert len(lines) == 10
+        assert sorted(size for _, size, _ in self.pool.calls) == [2, 4, 4]
+        status = self.gateway.get_batch(job["id"])
+        assert status["status"] == "completed"
+        assert [r["index"] for r in status["results"]] == list(range(10))
+        assert status["results"][3]["response"]["choices"][0]["message"]["content"] == "echo user: 3"
+
+    def test_jsonl_payload_with_custom_ids(self):
+        payload = "\n".join([
+            json.dumps({"custom_id": "a", "body": {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]}}),
+            json.dumps({"custom_id": "b", "body": {"model": "gpt-4"}}),
+        ])
+
+        job = self.gateway.chat_completions_batch(payload)
+        results = {json.loads(line)["custom_id"]: json.loads(line) for line in self.gateway.stream_batch_results(job["id"])}
+
+        assert "response" in results["a"]
+        assert results["b"]["error"] == "Missing required fields: model, messages"
+        assert self.gateway.get_batch(job["id"])["request_counts"]["failed"] == 1
+
+    def test_empty_and_unknown_batches(self):
+        assert "error" in self.gateway.chat_completions_batch({"requests": []})
+        assert "error" in self.gateway.get_batch("batch-missing")
+
+    def test_failed_chunks_still_publish_every_result(self):
+        """Short or malformed inference output should surface as per-item errors."""
+        self.pool.generate_batch = lambda model_id, prompts, max_tokens=150: {"results": [{"generated_text": "x"}]}
+        payload = {
+            "model": "gpt-4",
+            "requests": [{"messages": [{"role": "user", "content": str(i)}]} for i in range(6)]
+        }
+
+        job = self.gateway.chat_completions_batch(payload)
+        lines = [json.loads(line) for line in self.gateway.stream_batch_results(job["id"])]
+
+        assert len(lines) == 6 and all("error" in line for line in lines)
+        assert self.gateway.get_batch(job["id"])["status"] == "completed"
+
+    def test_invalid_max_tokens_is_a_per_item_error(self):
+        payload = {
+            "model": "gpt-4",
+            "requests": [
+                {"messages": [{"role": "user", "content": "a"}], "max_tokens": "lots"},
+                {"messages": [{"role": "user", "content": "b"}]},
+            ]
+        }
+
+        job = self.gateway.chat_completions_batch(payload)
+        results = {json.loads(line)["index"]: json.loads(line) for line in self.gateway.stream_batch_results(job["id"])}
+
+        assert results[0]["error"] == "max_tokens must be a positive integer"
+        assert "response" in results[1]
+
+    def test_finished_jobs_are_evicted_after_retention(self):
+        scheduler = self.gateway.batch_scheduler
+        job = self.gateway.chat_completions_batch({"model": "gpt-4", "requests": [{"messages": [{"role": "user", "content": "a"}]}]})
+        list(self.gateway.stream_batch_results(job["id"]))
+        scheduler.jobs[job["id"]].completed_at -= scheduler.retention + 1
+
+        self.gateway.chat_completions_batch({"model": "gpt-4", "requests": [{"messages": [{"role": "user", "content": "b"}]}]})
+
+        assert job["id"] not in scheduler.jobs
+
+    def test_batch_can_be_streamed_again(self):
+        """A reconnecting reader replays stored results instead of blocking."""
+        payload = {
+            "model": "gpt-4",
+            "requests": [{"messages": [{"role": "user", "content": str(i)}]} for i in range(6)]
+        }
+
+        job = self.gateway.chat_completions_batch(payload)
+        first = list(self.gateway.stream_batch_results(job["id"]))
+        second = list(self.gateway.stream_batch_results(job["id"]))
+
+        assert len(first) == 6
+        assert second == first
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,91 @@
+"""
+Unit tests for API Gateway context compression
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../api-gateway/src'))
+
+from context import ContextCompressor
+from main import APIGateway
+
+
+def conversation(turns, words=50):
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"Turn {i}. " + "lorem ipsum " * words})
+    return messages
+
+
+class TestContextCompressor:
+    """Test cases for trimming history to the model budget."""
+
+    def test_short_conversation_is_untouched(self):
+        compressor = ContextCompressor()
+        messages = conversation(2, words=5)
+
+        kept, stats = compressor.compress("gpt-4", messages)
+
+        assert kept is messages
+        assert stats["tokens_saved"] == 0
+
+    def test_old_turns_are_summarized_to_fit_budget(self):
+        compressor = ContextCompressor(budgets={"small": 600}, summary_max_tokens=50)
+        messages = conversation(20)
+
+        kept, stats = compressor.compress("small", messages, max_tokens=100)
+
+        assert kept[0] == messages[0]
+        assert kept[1]["role"] == "system"
+        assert kept[1]["content"].startswith("Summary of earlier conversation: user: Turn 0")
+        assert kept[-1] == messages[-1]
+        assert stats["prompt_tokens"] <= 500
+        assert stats["tokens_saved"] == stats["original_tokens"] - stats["prompt_tokens"] > 0
+        assert compressor.stats()["tokens_saved"] == stats["tokens_saved"]
+
+    def test_without_summary_turns_are_dropped(self):
+        compressor = ContextCompressor(budgets={"small": 400}, summarize=False)
+        messages = conversation(20)
+
+        kept, stats = compressor.compress("small", messages)
+
+        assert all(not m["content"].startswith("Summary") for m in kept)
+        assert len(kept) == 1 + 20 - stats["dropped_messages"]
+        assert kept[0] == messages[0]
+        assert kept[1:] == messages[1 + stats["dropped_messages"]:]
+
+    def test_latest_turns_are_kept_even_over_budget(self):
+        compressor = ContextCompressor(budgets={"tiny": 10}, min_recent_messages=1)
+        messages = conversation(3)
+
+        kept, _ = compressor.compress("tiny", messages)
+
+        assert kept[-1] == messages[-1]
+
+
+class TestAPIGatewayContextCompression:
+    """Test cases for the gateway's optional compression stage."""
+
+    def test_tokens_saved_are_reported_in_usage(self):
+        gateway = APIGateway(context_compressor=ContextCompressor(budgets={"gpt-4": 300}))
+
+        result = gateway.chat_completions({"model": "gpt-4", "messages": conversation(12)})
+
+        assert result["usage"]["prompt_tokens_saved"] > 0
+        assert gateway.context_compressor.requests_compressed == 1
+
+    def test_compression_is_off_by_default(self):
+        gateway = APIGateway()
+
+        result = gateway.chat_completions({"model": "gpt-4", "messages": conversation(2)})
+
+        assert gateway.context_compressor is None
+        assert "prompt_tokens_saved" not in result["usage"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,230 @@
+"""
+Unit tests for API Gateway replica routing
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../api-gateway/src'))
+
+from router import Replica, ReplicaRouter, affinity_key
+from main import APIGateway
+
+
+class FakeReplica:
+    """Inference-pool stand-in with a fixed latency and loaded model set."""
+
+    def __init__(self, latency=0.0, models=("gpt-4",), status="healthy"):
+        self.latency = latency
+        self.models = set(models)
+        self.status = status
+        self.calls = 0
+
+    def health_check(self):
+        return {"status": self.status, "in_flight": 0, "queue_depth": 0}
+
+    def list_models(self):
+        return {"models": [{"id": m, "loaded": True} for m in self.models]}
+
+    def generate_text(self, model_id, prompt, max_tokens=150, **kwargs):
+        self.calls += 1
+        self.last_kwargs = kwargs
+        time.sleep(self.latency)
+        return {"generated_text": f"reply to {prompt}", "tokens_used": 3}
+
+    def generate_batch(self, model_id, prompts, max_tokens=150):
+        self.calls += 1
+        return {"results": [{"generated_text": "ok", "tokens_used": 1} for _ in prompts]}
+
+
+class TestReplicaRouter:
+    """Test cases for load-aware replica selection."""
+
+    def test_model_affinity(self):
+        gpt, claude = FakeReplica(models=["gpt-4"]), FakeReplica(models=["claude-v1"])
+        router = ReplicaRouter([gpt, claude], policy="p2c")
+
+        for _ in range(10):
+            router.call("claude-v1", lambda pool: pool.generate_text("claude-v1", "hi"))
+
+        assert claude.calls == 10
+        assert gpt.calls == 0
+
+    def test_unhealthy_replicas_are_skipped(self):
+        sick, well = FakeReplica(status="degraded"), FakeReplica()
+        router = ReplicaRouter([sick, well], policy="least_outstanding")
+
+        router.call("gpt-4", lambda pool: pool.generate_text("gpt-4", "hi"))
+
+        assert well.calls == 1
+        assert router.stats()["replicas"][0]["healthy"] is False
+
+    def test_least_outstanding_avoids_busy_replica(self):
+        router = ReplicaRouter([FakeReplica(), FakeReplica()], policy="least_outstanding")
+        busy = router.choose("gpt-4")
+
+        chosen = [router.choose("gpt-4") for _ in range(3)]
+
+        assert chosen[0] is not busy
+        assert busy.outstanding == 2
+
+    def test_reported_queue_depth_counts_as_load(self):
+        router = ReplicaRouter([FakeReplica(), FakeReplica()], policy="p2c")
+        router.replicas[0].queue_depth = 5
+
+        assert all(router.choose("gpt-4") is router.replicas[1] for _ in range(3))
+
+    def test_p2c_sends_less_traffic_to_slow_replica(self):
+        slow, fast = FakeReplica(latency=0.05), FakeReplica(latency=0.0)
+        router = ReplicaRouter([slow, fast], policy="p2c")
+
+        def worker():
+            for _ in range(10):
+                router.call("gpt-4", lambda pool: pool.generate_text("gpt-4", "hi"))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert fast.calls > slow.calls
+        assert all(r.outstanding == 0 for r in router.replicas)
+
+    def test_added_replica_names_stay_unique_after_removal(self):
+        router = ReplicaRouter([FakeReplica(), FakeReplica()])
+
+        router.remove_replica("replica-0")
+        added = router.add_replica(FakeReplica())
+
+        assert len({r.name for r in router.replicas}) == 2
+        assert added.name == "replica-2"
+
+    def test_failing_calls_mark_replica_unhealthy_until_refresh(self):
+        flaky, well = FakeReplica(), FakeReplica()
+        router = ReplicaRouter([flaky, well], policy="round_robin", max_failures=2)
+        replica = router.replicas[0]
+
+        for _ in range(2):
+            router.release(router.choose("gpt-4"), 0.0, True)
+            replica.outstanding += 1
+            router.release(replica, 0.0, False)
+
+        assert not replica.healthy
+        assert all(router.choose("gpt-4") is router.replicas[1] for _ in range(4))
+        router.refresh()
+        assert replica.healthy and replica.consecutive_failures == 0
+
+    def test_rejections_and_bad_requests_do_not_eject_a_replica(self):
+        router = ReplicaRouter([FakeReplica()], max_failures=2)
+        replica = router.replicas[0]
+        results = [
+            {"error": "Server overloaded", "rejected": "overloaded"},
+            {"error": "Model gpt-5 not found", "invalid_request": True},
+        ]
+
+        for result in results * 3:
+            router.call("gpt-4", lambda client: result)
+        assert replica.healthy and replica.consecutive_failures == 0
+
+        for _ in range(2):
+            router.call("gpt-4", lambda client: {"error": "CUDA out of memory"})
+        assert not replica.healthy
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError):
+            ReplicaRouter([FakeReplica()], policy="random")
+
+
+class TestAffinityRouting:
+    """Test cases for consistent-hash routing on model + system prompt."""
+
+    @staticmethod
+    def keys(n):
+        return [affinity_key("gpt-4", [{"role": "system", "content": f"persona {i}"}]) for i in range(n)]
+
+    def test_same_prefix_hits_same_replica(self):
+        router = ReplicaRouter([FakeReplica() for _ in range(4)], policy="affinity")
+        key = affinity_key("gpt-4", [{"role": "system", "content": "You are a pirate."},
+                                     {"role": "user", "content": "hi"}])
+        other_turn = affinity_key("gpt-4", [{"role": "system", "content": "You are a pirate."},
+                                            {"role": "user", "content": "bye"}])
+
+        first = router.choose("gpt-4", key)
+        router.release(first, 0.0, True)
+        second = router.choose("gpt-4", other_turn)
+
+        assert key == other_turn
+        assert first is second
+
+    def test_removing_a_replica_remaps_only_its_keys(self):
+        replicas = [Replica(f"pool-{i}", FakeReplica()) for i in range(5)]
+        router = ReplicaRouter(replicas, policy="affinity", load_factor=100)
+        keys = self.keys(500)
+        before = {k: router.choose("gpt-4", k).name for k in keys}
+        for r in router.replicas:
+            r.outstanding = 0
+
+        router.remove_replica("pool-2")
+        after = {k: router.choose("gpt-4", k).name for k in keys}
+
+        moved = [k for k in keys if before[k] != after[k]]
+        assert moved and all(before[k] == "pool-2" for k in moved)
+
+    def test_bounded_load_spills_hot_key(self):
+        router = ReplicaRouter([FakeReplica() for _ in range(3)], policy="affinity")
+        key = self.keys(1)[0]
+
+        chosen = [router.choose("gpt-4", key) for _ in range(9)]
+
+        assert max(r.outstanding for r in router.replicas) <= 4
+        assert len({id(r) for r in chosen}) > 1
+
+
+class TestAPIGatewayRouting:
+    """Test cases for gateway requests going through the router."""
+
+    def test_chat_completion_uses_routed_replica(self):
+        replicas = [FakeReplica(models=["claude-v1"]), FakeReplica(models=["gpt-4"])]
+        gateway = APIGateway(replicas=replicas)
+
+        result = gateway.chat_completions({"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]})
+
+        assert result["choices"][0]["message"]["content"] == "reply to user: hi"
+        assert result["usage"]["completion_tokens"] == 3
+        assert replicas[1].calls == 1
+        assert isinstance(gateway.router.replicas[1], Replica)
+
+    def test_client_timeout_is_passed_to_inference(self):
+        replica = FakeReplica()
+        gateway = APIGateway(replicas=[replica])
+        request = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]}
+
+        gateway.chat_completions({**request, "timeout": 2})
+        assert 0 < replica.last_kwargs["timeout"] <= 2
+        gateway.chat_completions(request, {"X-Request-Timeout": "0.5"})
+        assert 0 < replica.last_kwargs["timeout"] <= 0.5
+        gateway.chat_completions(request)
+        assert replica.last_kwargs["timeout"] is None
+        gateway.shutdown()
+
+    def test_gateway_keeps_replica_state_fresh(self, monkeypatch):
+        monkeypatch.setenv("ROUTER_REFRESH_INTERVAL", "0.01")
+        replica = FakeReplica()
+        gateway = APIGateway(replicas=[replica])
+
+        replica.status = "degraded"
+        deadline = time.time() + 5
+        while gateway.router.replicas[0].healthy and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert not gateway.router.replicas[0].healthy
+        gateway.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Unit tests for Inference Pool admission control
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../inference-pool/src'))
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def fill(controller):
+    """Occupy every slot; returns a function that frees one."""
+    for _ in range(controller.max_concurrency):
+        controller.acquire()
+    return lambda: controller.release(0.01)
+
+
+def queue_requests(controller, specs, order):
+    """Start one waiting thread per (tenant, priority); each records its admission."""
+    threads = []
+    for tenant, priority in specs:
+        def run(tenant=tenant, priority=priority):
+            controller.acquire(tenant, priority)
+            order.append((tenant, priority))
+        thread = threading.Thread(target=run)
+        thread.start()
+        threads.append(thread)
+        while controller.queue_depth < len(threads):
+            time.sleep(0.001)
+    return threads
+
+
+class TestAdmissionController:
+    """Test cases for queuing, fairness and early rejection."""
+
+    def test_admits_immediately_under_capacity(self):
+        controller = AdmissionController(max_concurrency=2, max_queue_size=4)
+
+        with controller.slot("acme") as waited:
+            assert waited == 0.0
+            assert controller.active == 1
+
+        assert controller.active == 0
+
+    def test_interactive_is_served_before_batch(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        free = fill(controller)
+        order = []
+        threads = queue_requests(controller, [("a", "batch"), ("b", "interactive")], order)
+
+        for _ in threads:
+            free()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+
+        assert order == [("b", "interactive"), ("a", "batch")]
+
+    def test_tenants_share_capacity_by_weight(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=20, tenant_weights={"big": 2.0})
+        free = fill(controller)
+        order = []
+        threads = queue_requests(controller, [("noisy", "interactive")] * 4 + [("big", "interactive")] * 4, order)
+
+        for _ in threads:
+            free()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+
+        first_six = [tenant for tenant, _ in order[:6]]
+        assert first_six.count("big") == 4
+        assert first_six.count("noisy") == 2
+
+    def test_full_queue_is_rejected(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        free = fill(controller)
+        threads = queue_requests(controller, [("a", "interactive")], [])
+
+        with pytest.raises(AdmissionRejected) as exc:
+            controller.acquire("b")
+
+        assert exc.value.reason == "overloaded"
+        free()
+        threads[0].join()
+
+    def test_request_that_cannot_meet_deadline_is_rejected_early(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        controller.service_time_ewma = 1.0
+        fill(controller)
+
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected) as exc:
+            controller.acquire("a", deadline=time.monotonic() + 0.5)
+
+        assert exc.value.reason == "deadline"
+        assert time.monotonic() - started < 0.1
+        assert controller.stats()["rejected"]["deadline"] == 1
+
+    def test_deadline_expiring_in_queue_drops_request(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        free = fill(controller)
+
+        with pytest.raises(AdmissionRejected):
+            controller.acquire("a", deadline=time.monotonic() + 0.05)
+        free()
+
+        assert controller.expired == 1
+        assert controller.queue_depth == 0
+        assert controller.active == 0
+
+    def test_queue_wait_is_recorded(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        free = fill(controller)
+        threads = queue_requests(controller, [("a", "interactive")], [])
+
+        time.sleep(0.03)
+        free()
+        threads[0].join()
+
+        wait = controller.stats()["queue_wait"]["interactive"]
+        assert wait["count"] == 2
+        assert wait["max"] >= 0.03
+
+    def test_tenant_tags_are_forgotten_once_the_queue_drains(self):
+        controller = AdmissionController(max_concurrency=1, max_queue_size=100)
+        free = fill(controller)
+        threads = queue_requests(controller, [(f"tenant-{i}", "batch") for i in range(20)], [])
+
+        for _ in threads:
+            free()
+        for thread in threads:
+            thread.join()
+
+        assert controller._tenant_finish == {}
+        assert controller._virtual_time >= 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
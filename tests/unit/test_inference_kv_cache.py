@@ -0,0 +1,157 @@
+"""
+Unit tests for the Inference Pool paged KV cache
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../inference-pool/src'))
+
+from kv_cache import ContinuousBatcher, KVCacheExhausted, PagedKVCache
+
+
+class TestPagedKVCache:
+    """Test cases for the block allocator."""
+
+    def test_allocate_grows_by_block(self):
+        cache = PagedKVCache(num_blocks=8, block_size=4, bytes_per_token=10)
+        assert cache.allocate("a", 5) == [0, 1]
+        cache.append("a", 3)
+        assert cache.block_table("a") == [0, 1]
+        cache.append("a")
+        assert cache.block_table("a") == [0, 1, 2]
+        stats = cache.stats()
+        assert stats["used_blocks"] == 3
+        assert stats["tokens"] == 9
+        assert stats["slot_utilization"] == 0.75
+        assert stats["memory_bytes"] == 3 * 4 * 10
+
+        cache.free("a")
+        assert cache.free_blocks == 8
+        assert cache.stats()["peak_used_blocks"] == 3
+
+    def test_exhaustion_is_all_or_nothing(self):
+        cache = PagedKVCache(num_blocks=2, block_size=4)
+        cache.allocate("a", 4)
+        with pytest.raises(KVCacheExhausted):
+            cache.allocate("b", 8)
+        cache.append("a", 4)
+        with pytest.raises(KVCacheExhausted):
+            cache.append("a")
+        assert cache.num_tokens("a") == 8
+        assert cache.stats()["allocation_failures"] == 2
+
+    def test_fork_copies_on_write(self):
+        copies = []
+        cache = PagedKVCache(num_blocks=6, block_size=4, copy_block=lambda s, d: copies.append((s, d)))
+        cache.allocate("parent", 6)
+        cache.fork("parent", "child")
+        assert cache.block_table("child") == cache.block_table("parent")
+        assert cache.stats()["shared_blocks"] == 2
+        assert cache.free_blocks == 4
+
+        assert cache.append("child") == [(1, 2)]
+        assert copies == [(1, 2)]
+        assert cache.block_table("child") == [0, 2]
+        assert cache.block_table("parent") == [0, 1]
+        # The parent now owns block 1 alone and writes in place.
+        assert cache.append("parent") == []
+
+        cache.free("parent")
+        assert cache.block_table("child") == [0, 2]
+        assert cache.free_blocks == 4
+        cache.free("child")
+        assert cache.free_blocks == 6
+        assert cache.stats()["cow_copies"] == 1
+
+    def test_fork_on_block_boundary_shares_without_copy(self):
+        cache = PagedKVCache(num_blocks=4, block_size=4)
+        cache.allocate("parent", 4)
+        cache.fork("parent", "child")
+        assert cache.append("child") == []
+        assert cache.block_table("child") == [0, 1]
+
+
+class TestContinuousBatcher:
+    """Test cases for the KV-bounded batch scheduler."""
+
+    def test_fits_more_sequences_than_max_tokens_reservation(self):
+        # Reserving 64 tokens per sequence would fit 2 at a time; paging fits all 8.
+        cache = PagedKVCache(num_blocks=8, block_size=16)
+        batcher = ContinuousBatcher(cache, max_batch_size=16)
+        batches = []
+        result = batcher.run([(10, 5)] * 8, lambda running: batches.append(len(running)))
+        assert result == {"steps": 5, "peak_batch": 8, "mean_batch": 8.0, "preemptions": 0}
+        assert cache.free_blocks == 8
+
+    def test_finished_sequences_make_room(self):
+        cache = PagedKVCache(num_blocks=2, block_size=4)
+        batcher = ContinuousBatcher(cache, max_batch_size=4)
+        seen = []
+        result = batcher.run([(3, 1), (3, 1), (3, 2)], lambda running: seen.append(list(running)))
+        assert seen[0] == [0, 1]
+        assert sorted(i for step in seen for i in step) == [0, 1, 2, 2]
+        assert result["preemptions"] == 0
+        assert cache.free_blocks == 2
+
+    def test_preempts_when_cache_fills(self):
+        cache = PagedKVCache(num_blocks=3, block_size=2)
+        batcher = ContinuousBatcher(cache, max_batch_size=4)
+        steps = []
+        result = batcher.run([(2, 3), (2, 3)], lambda running: steps.append(list(running)))
+        assert result["preemptions"] >= 1
+        assert sum(step.count(0) for step in steps) == 3
+        assert steps[-1] == [1]
+        assert cache.free_blocks == 3
+
+    def test_waits_for_blocks_held_by_other_batches(self):
+        cache = PagedKVCache(num_blocks=4, block_size=2)
+        batcher = ContinuousBatcher(cache, poll_interval=0.01)
+        cache.allocate("other", 4)
+        threading.Timer(0.2, cache.free, args=("other",)).start()
+        allocations = []
+        allocate = cache.allocate
+        cache.allocate = lambda seq_id, tokens: allocations.append(seq_id) or allocate(seq_id, tokens)
+
+        result = batcher.run([(4, 2)], lambda running: None)
+
+        assert len(allocations) < 50
+        assert result["preemptions"] == 0 and batcher.preemptions == 0
+        assert cache.free_blocks == 4
+
+    def test_rejects_sequence_larger_than_cache(self):
+        batcher = ContinuousBatcher(PagedKVCache(num_blocks=2, block_size=4))
+        with pytest.raises(KVCacheExhausted):
+            batcher.run([(8, 4)], lambda running: None)
+
+
+class TestInferencePoolBatching:
+    """Test cases for generate_batch running through the KV cache."""
+
+    def test_generate_batch_reports_schedule(self):
+        spec = importlib.util.spec_from_file_location(
+            "inference_pool_main", os.path.join(os.path.dirname(__file__), '../../inference-pool/src/main.py')
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        pool = module.InferencePool()
+        pool.kv_cache = PagedKVCache(num_blocks=64, block_size=4)
+        pool.batcher = ContinuousBatcher(pool.kv_cache, max_batch_size=8)
+
+        result = pool.generate_batch("gpt-4", ["hello"] * 4, max_tokens=20)
+        assert len(result["results"]) == 4
+        assert result["schedule"]["peak_batch"] == 4
+        assert pool.health_check()["kv_cache"]["used_blocks"] == 0
+        assert all(r["tokens_used"] <= 2 for r in pool.generate_batch("gpt-4", ["hello"] * 4, max_tokens=2)["results"])
+
+        pool.kv_cache = PagedKVCache(num_blocks=1, block_size=4)
+        pool.batcher = ContinuousBatcher(pool.kv_cache)
+        assert pool.generate_batch("gpt-4", ["hello"])["rejected"] == "kv_cache"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
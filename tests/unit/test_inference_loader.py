@@ -0,0 +1,115 @@
+"""
+Unit tests for Inference Pool quantized model loading
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), '../../inference-pool/src')
+sys.path.insert(0, SRC)
+
+from loader import PRECISIONS, estimate_footprint, validate_precision
+
+_spec = importlib.util.spec_from_file_location("inference_pool_main", os.path.join(SRC, "main.py"))
+inference_pool_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inference_pool_main)
+
+
+class TestPrecision:
+    """Test cases for precision selection and footprint estimates."""
+
+    def test_quantized_footprints_shrink(self):
+        sizes = [estimate_footprint(1_000_000, p) for p in PRECISIONS]
+
+        assert sizes[0] == 4_000_000
+        assert sizes == sorted(sizes, reverse=True)
+        assert sizes[-1] < sizes[0] / 6
+
+    def test_unknown_precision_is_rejected(self):
+        with pytest.raises(ValueError):
+            validate_precision("fp8")
+
+    def test_pool_records_precision(self):
+        pool = inference_pool_main.InferencePool()
+
+        result = pool.load_model("gpt-4", precision="int8")
+        models = {m["id"]: m for m in pool.list_models()["models"]}
+
+        assert result["precision"] == "int8"
+        assert models["gpt-4"]["precision"] == "int8"
+        assert "error" in pool.load_model("gpt-4", precision="fp8")
+
+
+class TestInt4Linear:
+    """Test cases for the CPU int4 layer (needs torch)."""
+
+    def test_int4_roundtrip_and_footprint(self):
+        torch = pytest.importorskip("torch")
+        from loader import Int4Linear, model_footprint, quantize_int4
+
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(torch.nn.Linear(128, 64), torch.nn.ReLU(), torch.nn.Linear(64, 32))
+        x = torch.randn(4, 128)
+        expected = model(x)
+        fp32_bytes = model_footprint(model)
+
+        quantize_int4(model, group_size=32)
+
+        assert isinstance(model[0], Int4Linear)
+        assert model_footprint(model) < fp32_bytes / 4
+        assert torch.allclose(model(x), expected, atol=0.15)
+
+
+class TestMappedLoad:
+    """Test cases for building a model on memory-mapped weights (needs torch, transformers, accelerate)."""
+
+    def make_checkpoint(self, tmp_path):
+        torch = pytest.importorskip("torch")
+        transformers = pytest.importorskip("transformers")
+        pytest.importorskip("accelerate")
+        from weights import export_state_dict
+
+        config = transformers.GPT2Config(n_layer=1, n_head=2, n_embd=16, vocab_size=32, n_positions=16)
+        config.save_pretrained(str(tmp_path))
+        torch.manual_seed(0)
+        model = transformers.AutoModelForCausalLM.from_config(config)
+        path = str(tmp_path / "weights.safetensors")
+        export_state_dict(model.state_dict(), path)
+        return torch, model, path
+
+    def test_mapped_model_matches_source(self, tmp_path):
+        torch, source, path = self.make_checkpoint(tmp_path)
+        from loader import _load_mapped
+
+        model = _load_mapped(str(tmp_path), path, torch.float32).eval()
+        tokens = torch.tensor([[1, 2, 3]])
+
+        assert torch.allclose(model(tokens).logits, source.eval()(tokens).logits)
+
+    def test_precision_mismatch_is_converted(self, tmp_path):
+        torch, _, path = self.make_checkpoint(tmp_path)
+        from loader import _load_mapped, model_footprint
+
+        model = _load_mapped(str(tmp_path), path, torch.bfloat16)
+
+        assert {p.dtype for p in model.parameters()} == {torch.bfloat16}
+        assert all(t.dtype == torch.bfloat16 for t in model.state_dict().values() if t.is_floating_point())
+        assert model_footprint(model) < os.path.getsize(path) * 0.6
+
+    def test_missing_tensors_are_rejected(self, tmp_path):
+        torch, source, path = self.make_checkpoint(tmp_path)
+        from loader import _load_mapped
+        from weights import export_state_dict
+
+        state = {k: v for k, v in source.state_dict().items() if not k.endswith("ln_f.weight")}
+        export_state_dict(state, path)
+
+        with pytest.raises(ValueError):
+            _load_mapped(str(tmp_path), path, torch.float32)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
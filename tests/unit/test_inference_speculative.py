@@ -0,0 +1,170 @@
+"""
+Unit tests for Inference Pool speculative decoding
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), '../../inference-pool/src')
+sys.path.insert(0, SRC)
+
+from speculative import SpeculativeDecoder, autoregressive_generate
+
+# The services all name their entry module ``main``; load this one under its own name.
+_spec = importlib.util.spec_from_file_location("inference_pool_main", os.path.join(SRC, "main.py"))
+inference_pool_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inference_pool_main)
+
+VOCAB = 16
+
+
+class ToyLM:
+    """Character-level model over 'a'..'p' whose next token depends on the last one."""
+
+    eos_token_id = None
+
+    def __init__(self, rule, confidence=0.9):
+        self.rule = rule
+        self.confidence = confidence
+        self.passes = 0
+        self.scored = 0
+
+    def forward(self, tokens, start=0):
+        self.passes += 1
+        self.scored += len(tokens) - start
+        out = []
+        for token in tokens[start:]:
+            probs = [(1 - self.confidence) / (VOCAB - 1)] * VOCAB
+            probs[self.rule(token)] = self.confidence
+            out.append(probs)
+        return out
+
+    def encode(self, text):
+        return [ord(c) - ord("a") for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(ord("a") + t) for t in tokens)
+
+
+def target_rule(token):
+    return (token * 3 + 1) % VOCAB
+
+
+def draft_rule(token):
+    # Agrees with the target except after multiples of 4.
+    return (token + 1) % VOCAB if token % 4 == 0 else target_rule(token)
+
+
+class TestSpeculativeDecoder:
+    """Test cases for draft-then-verify decoding."""
+
+    def test_greedy_output_matches_target(self):
+        target, draft = ToyLM(target_rule), ToyLM(draft_rule)
+        expected = list(autoregressive_generate(ToyLM(target_rule), [4], 40))
+
+        decoder = SpeculativeDecoder(target, draft, num_speculative_tokens=4)
+        produced = list(decoder.generate([4], 40))
+
+        assert produced == expected
+        stats = decoder.stats.to_dict()
+        assert 0 < stats["acceptance_rate"] < 1
+        assert target.passes < 40
+        assert stats["tokens_per_pass"] > 1
+
+    def test_perfect_draft_is_always_accepted(self):
+        decoder = SpeculativeDecoder(ToyLM(target_rule), ToyLM(target_rule), num_speculative_tokens=3,
+                                     temperature=1.0, seed=7)
+
+        produced = list(decoder.generate([1], 16))
+
+        assert len(produced) == 16
+        assert decoder.stats.acceptance_rate > 0.9
+        assert decoder.stats.target_passes <= 6
+
+    def test_eos_stops_generation(self):
+        target = ToyLM(lambda t: 0 if t == 5 else target_rule(t))
+        target.eos_token_id = 0
+        decoder = SpeculativeDecoder(target, ToyLM(target_rule))
+
+        produced = list(decoder.generate([5], 20))
+
+        assert produced == [0]
+
+    def test_only_needed_positions_are_scored(self):
+        target, draft = ToyLM(target_rule), ToyLM(draft_rule)
+        decoder = SpeculativeDecoder(target, draft, num_speculative_tokens=4)
+
+        list(decoder.generate(list(range(10)) * 5, 8))
+
+        assert target.scored <= target.passes * 5
+        assert draft.scored == draft.passes
+
+    def test_empty_prompt_is_rejected(self):
+        decoder = SpeculativeDecoder(ToyLM(target_rule), ToyLM(draft_rule))
+
+        with pytest.raises(ValueError):
+            list(decoder.generate([], 4))
+        with pytest.raises(ValueError):
+            list(autoregressive_generate(ToyLM(target_rule), [], 4))
+
+
+class TestInferencePoolSpeculative:
+    """Test cases for speculative decoding configured on the pool."""
+
+    def setup_method(self):
+        self.pool = inference_pool_main.InferencePool()
+        self.pool.engines["gpt-4"] = ToyLM(target_rule)
+        self.pool.engines["gpt-3.5-turbo"] = ToyLM(draft_rule)
+        self.pool.models["gpt-4"].update(draft_model="gpt-3.5-turbo", speculative_tokens=4)
+
+    def test_generate_text_reports_acceptance(self):
+        result = self.pool.generate_text("gpt-4", "e", max_tokens=12)
+
+        expected = ToyLM(target_rule).decode(autoregressive_generate(ToyLM(target_rule), [4], 12))
+        assert result["generated_text"] == expected
+        assert result["tokens_used"] == 12
+        assert 0 < result["speculative"]["acceptance_rate"] < 1
+
+    def test_streaming_path(self):
+        chunks = list(self.pool.generate_text_stream("gpt-4", "e", max_tokens=12))
+
+        text = "".join(c.get("text", "") for c in chunks)
+        assert text == self.pool.generate_text("gpt-4", "e", max_tokens=12)["generated_text"]
+        assert chunks[-1]["finish_reason"] == "stop"
+        assert chunks[-1]["speculative"]["proposed"] > 0
+
+    def test_streaming_decodes_incrementally(self):
+        engine = self.pool.engines["gpt-4"]
+        decoded = []
+        decode = engine.decode
+        engine.decode = lambda tokens: decoded.append(len(tokens)) or decode(tokens)
+
+        chunks = list(self.pool.generate_text_stream("gpt-4", "e", max_tokens=40))
+
+        assert chunks[-1]["tokens_used"] == 40
+        assert max(decoded) <= 2
+
+    def test_batch_uses_the_engine(self):
+        result = self.pool.generate_batch("gpt-4", ["e", "c"], max_tokens=6)
+
+        expected = [self.pool.generate_text("gpt-4", p, max_tokens=6)["generated_text"] for p in ("e", "c")]
+        assert [r["generated_text"] for r in result["results"]] == expected
+        assert [r["tokens_used"] for r in result["results"]] == [6, 6]
+
+    def test_unloaded_draft_falls_back_to_target_only(self):
+        self.pool.unload_model("gpt-3.5-turbo")
+
+        result = self.pool.generate_text("gpt-4", "c", max_tokens=5)
+
+        assert result["tokens_used"] == 5
+        assert "speculative" not in result
+
+    def test_stream_for_unknown_model(self):
+        assert list(self.pool.generate_text_stream("nope", "hi")) == [{"error": "Model nope not found", "invalid_request": True}]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
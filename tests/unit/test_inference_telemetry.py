@@ -0,0 +1,88 @@
+"""
+Unit tests for Inference Pool per-model telemetry
+"""
+
+import importlib.util
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../inference-pool/src'))
+
+from telemetry import ModelTelemetry, process_rss
+
+
+def load_pool():
+    spec = importlib.util.spec_from_file_location(
+        "inference_pool_main", os.path.join(os.path.dirname(__file__), '../../inference-pool/src/main.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.InferencePool()
+
+
+class TestModelTelemetry:
+    """Test cases for the lock-free per-model counters."""
+
+    def test_admitted_moves_from_queued_to_in_flight(self):
+        telemetry = ModelTelemetry()
+        seen = {}
+
+        @contextmanager
+        def slot():
+            seen["queued"] = telemetry.snapshot()["queue_depth"]
+            yield 0.25
+
+        with telemetry.admitted(slot()) as queue_wait:
+            snapshot = telemetry.snapshot()
+            assert queue_wait == 0.25
+            assert (snapshot["queue_depth"], snapshot["in_flight"]) == (0, 1)
+        assert seen["queued"] == 1
+        assert telemetry.snapshot()["in_flight"] == 0
+
+    def test_snapshot_aggregates_window(self):
+        telemetry = ModelTelemetry(window=10.0)
+        telemetry._events.extend([
+            (100.0, 50, 0.5, 1.5, 1),
+            (105.0, 30, 0.1, 0.9, 3),
+            (80.0, 999, 1.0, 1.0, 9),  # outside the window
+        ])
+        snapshot = telemetry.snapshot(now=108.0)
+        assert snapshot["requests"] == 2
+        # 80 tokens from the first request's start (t=98) to now.
+        assert snapshot["tokens_per_second"] == 8.0
+        assert snapshot["avg_batch_size"] == 2.0
+        assert snapshot["avg_prefill_time"] == 0.3
+        assert snapshot["avg_decode_time"] == 1.2
+
+    def test_process_rss(self):
+        assert process_rss() > 0
+
+
+class TestHealthCheckTelemetry:
+    """Test cases for live model data in InferencePool.health_check."""
+
+    def test_models_report_load(self):
+        pool = load_pool()
+        pool.generate_text("gpt-4", "hello there")
+        pool.generate_batch("gpt-4", ["a", "b"])
+        health = pool.health_check()
+
+        gpt4 = health["models"]["gpt-4"]
+        assert gpt4["requests"] == 2
+        assert gpt4["tokens_per_second"] > 0
+        assert gpt4["avg_batch_size"] >= 1
+        assert gpt4["avg_decode_time"] > 0
+        assert gpt4["kv_cache_blocks"] == 0
+        assert gpt4["in_flight"] == 0
+        assert health["models"]["claude-v1"]["requests"] == 0
+        assert health["process"]["rss_bytes"] > 0
+
+        pool.unload_model("gpt-4")
+        assert "gpt-4" not in pool.health_check()["models"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
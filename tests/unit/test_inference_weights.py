@@ -0,0 +1,89 @@
+"""
+Unit tests for Inference Pool memory-mapped weights
+"""
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../inference-pool/src'))
+
+from weights import MappedWeights, save_file
+
+
+@pytest.fixture
+def weights_file(tmp_path):
+    path = str(tmp_path / "model.safetensors")
+    save_file({
+        "embed": ("F32", [2, 3], array.array("f", [1, 2, 3, 4, 5, 6]).tobytes()),
+        "step": ("I64", [], array.array("q", [7]).tobytes()),
+        "norm": ("BF16", [2], b"\x80\x3f\x00\x40"),
+        "mask": ("U8", [3], b"\x01\x00\x01"),
+    }, path, metadata={"format": "pt"})
+    return path
+
+
+class TestMappedWeights:
+    """Test cases for the flat weight file and its read-only mapping."""
+
+    def test_roundtrip(self, weights_file):
+        with MappedWeights(weights_file) as weights:
+            assert sorted(weights.names()) == ["embed", "mask", "norm", "step"]
+            assert weights.metadata == {"format": "pt"}
+            assert weights.array("embed").tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+            assert weights.array("step")[0] == 7
+            assert bytes(weights.array("norm")) == b"\x80\x3f\x00\x40"
+            assert weights.nbytes == 24 + 8 + 4 + 3
+
+    def test_views_are_zero_copy_and_read_only(self, weights_file):
+        with MappedWeights(weights_file) as weights:
+            view = weights.array("embed")
+
+            assert isinstance(view.obj, mmap.mmap)
+            assert view.readonly
+
+    def test_tensors_start_aligned(self, weights_file):
+        with MappedWeights(weights_file) as weights:
+            for name, info in weights.tensors.items():
+                size = {"F32": 4, "I64": 8, "BF16": 2, "U8": 1}[info["dtype"]]
+                assert (weights._data_start + info["data_offsets"][0]) % size == 0, name
+
+    def test_open_does_not_read_tensor_data(self, tmp_path):
+        path = str(tmp_path / "big.safetensors")
+        size = 512 * 1024 * 1024
+        header = json.dumps({"w": {"dtype": "U8", "shape": [size], "data_offsets": [0, size]}}).encode()
+        header += b" " * (-(8 + len(header)) % 8)
+        with open(path, "wb") as f:
+            f.write(struct.pack("<Q", len(header)) + header)
+            f.truncate(8 + len(header) + size)
+
+        started = time.perf_counter()
+        weights = MappedWeights(path)
+        first = weights.array("w")[0]
+
+        assert first == 0
+        assert time.perf_counter() - started < 0.5
+        weights.close()
+
+    def test_invalid_files_are_rejected(self, tmp_path):
+        path = str(tmp_path / "bad.safetensors")
+        header = json.dumps({"w": {"dtype": "F32", "shape": [4], "data_offsets": [0, 16]}}).encode()
+        with open(path, "wb") as f:
+            f.write(struct.pack("<Q", len(header)) + header + b"\x00" * 8)
+
+        with pytest.raises(ValueError):
+            MappedWeights(path)
+
+    def test_size_mismatch_on_save(self, tmp_path):
+        with pytest.raises(ValueError):
+            save_file({"w": ("F32", [3], b"\x00" * 8)}, str(tmp_path / "x.safetensors"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+"""
+Unit tests for the Inference Pool worker processes and shared-memory ring
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../inference-pool/src'))
+
+from workers import RingFull, ShmRing, WorkerPool, cpu_sets
+
+
+class EchoEngine:
+    """Streams the prompt back word by word; "crash" kills the process once."""
+
+    def generate_text_stream(self, model_id, prompt, max_tokens=150, **kwargs):
+        if prompt == "crash" and not os.path.exists(kwargs.get("marker", "")):
+            open(kwargs["marker"], "w").close()
+            os._exit(1)
+        if prompt == "crash-always":
+            os._exit(1)
+        if prompt == "hang":
+            time.sleep(2)
+        if model_id != "echo":
+            yield {"error": f"Model {model_id} not found"}
+            return
+        words = prompt.split(" ")[:max_tokens]
+        for i, word in enumerate(words):
+            yield {"text": word if i == 0 else " " + word}
+        yield {"finish_reason": "stop", "tokens_used": len(words), "pid": os.getpid()}
+
+    def list_models(self):
+        return {"models": [{"id": "echo", "type": "text", "loaded": True}]}
+
+
+def echo_factory():
+    return EchoEngine()
+
+
+class TestShmRing:
+    """Test cases for the single-producer/single-consumer ring."""
+
+    def test_fifo_and_wraparound(self):
+        ring = ShmRing(capacity=256, create=True)
+        try:
+            reader = ShmRing(ring.name)
+            sent = []
+            for i in range(200):
+                payload = f"message-{i}".encode() * (i % 5 + 1)
+                ring.put(payload)
+                sent.append(payload)
+                assert reader.get() == payload
+            assert reader.get() is None
+            reader.close()
+        finally:
+            ring.close()
+
+    def test_full_ring(self):
+        ring = ShmRing(capacity=128, create=True)
+        try:
+            ring.put(b"x" * 50)
+            with pytest.raises(RingFull):
+                ring.put(b"y" * 50)
+                ring.put(b"z" * 50)
+            assert ring.get() == b"x" * 50
+            with pytest.raises(ValueError):
+                ring.put(b"w" * 100)
+        finally:
+            ring.close()
+
+
+class TestCpuSets:
+    """Test cases for worker pinning."""
+
+    def test_unpinned(self):
+        assert cpu_sets(3, None) == [None, None, None]
+
+    @pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="no affinity support")
+    def test_core_pinning_uses_allowed_cpus(self):
+        allowed = os.sched_getaffinity(0)
+        sets = cpu_sets(4, "core")
+        assert all(len(cpus) == 1 and cpus[0] in allowed for cpus in sets)
+        assert all(set(cpus) <= allowed for cpus in cpu_sets(2, "numa"))
+
+
+class TestWorkerPool:
+    """Test cases for the multi-process supervisor."""
+
+    @pytest.fixture
+    def pool(self):
+        with WorkerPool(num_workers=2, engine_factory=echo_factory) as pool:
+            yield pool
+
+    def test_stream_and_generate(self, pool):
+        chunks = list(pool.generate_text_stream("echo", "one two three"))
+        assert [c["text"] for c in chunks if "text" in c] == ["one", " two", " three"]
+        assert chunks[-1]["finish_reason"] == "stop"
+
+        result = pool.generate_text("echo", "hello shared memory", max_tokens=2)
+        assert result["generated_text"] == "hello shared"
+        assert result["tokens_used"] == 2
+        assert pool.generate_text("missing", "hi") == {"error": "Model missing not found"}
+        assert pool.list_models()["models"][0]["id"] == "echo"
+
+    def test_spreads_across_workers(self, pool):
+        streams = [pool.generate_text_stream("echo", f"request {i}") for i in range(4)]
+        # Starting every stream before reading any keeps them all outstanding at once.
+        firsts = [next(s) for s in streams]
+        assert all(f["text"] == "request" for f in firsts)
+        pids = {list(s)[-1]["pid"] for s in streams}
+        assert len(pids) == 2
+
+    def test_restarts_crashed_worker_and_retries(self, pool, tmp_path):
+        marker = str(tmp_path / "crashed")
+        result = pool.generate_text("echo", "crash", marker=marker)
+        assert os.path.exists(marker)
+        assert result["generated_text"] == "crash"
+
+        failed = pool.generate_text("echo", "crash-always")
+        assert failed == {"error": "Inference worker crashed"}
+
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            health = pool.health_check()
+            if all(w["alive"] for w in health["workers"]):
+                break
+            time.sleep(0.05)
+        assert health["status"] == "healthy"
+        assert sum(w["restarts"] for w in health["workers"]) == 3
+        assert pool.generate_text("echo", "still serving")["generated_text"] == "still serving"
+
+    def test_concurrent_callers_share_a_worker_ring(self):
+        results = {}
+
+        with WorkerPool(num_workers=1, engine_factory=echo_factory, pin=None) as pool:
+            def call(i):
+                results[i] = pool.generate_text("echo", f"caller {i} " + "word " * 50)
+
+            threads = [threading.Thread(target=call, args=(i,)) for i in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            health = pool.health_check()
+
+        assert all(results[i]["generated_text"].startswith(f"caller {i} word") for i in range(16))
+        assert health["workers"][0]["restarts"] == 0
+
+    def test_crash_looping_worker_is_retired(self):
+        with WorkerPool(num_workers=1, engine_factory=echo_factory, pin=None, max_attempts=1,
+                        restart_backoff=0.01, max_restarts=2) as pool:
+            for _ in range(3):
+                assert pool.generate_text("echo", "crash-always") == {"error": "Inference worker crashed"}
+                deadline = time.time() + 10
+                while time.time() < deadline and not (pool.workers[0].alive or pool.workers[0].retired):
+                    time.sleep(0.01)
+            health = pool.health_check()
+
+            assert health["workers"][0]["retired"]
+            assert health["workers"][0]["restarts"] == 2
+            assert health["status"] == "unhealthy"
+            assert pool.generate_text("echo", "hi") == {"error": "No inference workers available"}
+
+    def test_unresponsive_worker_times_out(self):
+        with WorkerPool(num_workers=1, engine_factory=echo_factory, pin=None, response_timeout=0.2) as pool:
+            result = pool.generate_text("echo", "hang")
+
+            assert "did not respond" in result["error"]
+            assert pool.health_check()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+"""
+Unit tests for shared structured logging
+"""
+
+import io
+import json
+import logging
+import os
+import queue
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from common import log as structured_log
+from common.log import DroppingQueueHandler, EventLogger, StructuredFormatter, parse_sample_rates
+
+
+class CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    logger = logging.getLogger("test_log.events")
+    handler = CaptureHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield handler
+    logger.removeHandler(handler)
+
+
+@pytest.fixture
+def stdlib_only(monkeypatch):
+    monkeypatch.setattr(structured_log, "structlog", None)
+
+
+class TestEventLogger:
+    """Test cases for sampling and rate limiting."""
+
+    def test_fields_travel_unformatted(self, captured, stdlib_only):
+        EventLogger("test_log.events").info("text_generated", model="m", tokens=3)
+        record = captured.records[0]
+        assert record.msg == "text_generated"
+        assert record.fields == {"model": "m", "tokens": 3}
+
+    def test_sampling_keeps_a_fraction(self, captured, stdlib_only, monkeypatch):
+        monkeypatch.delenv("LOG_SAMPLE_RATES", raising=False)
+        events = EventLogger("test_log.events", sample_rates={"hot": 0.1}, rate_limit=1e9)
+        for _ in range(5000):
+            events.info("hot")
+        assert 300 < len(captured.records) < 700
+        assert captured.records[0].fields["sample_rate"] == 0.1
+
+    def test_warnings_are_never_sampled(self, captured, stdlib_only):
+        events = EventLogger("test_log.events", sample_rates={"hot": 0.0}, rate_limit=1e9)
+        events.info("hot")
+        events.warning("hot")
+        assert [r.levelno for r in captured.records] == [logging.WARNING]
+
+    def test_env_overrides_sample_rates(self, monkeypatch):
+        monkeypatch.setenv("LOG_SAMPLE_RATES", "hot=0.5, cold=2")
+        events = EventLogger("test_log.events", sample_rates={"hot": 0.1, "warm": 0.2})
+        assert events.sample_rates == {"hot": 0.5, "warm": 0.2, "cold": 1.0}
+        assert parse_sample_rates("") == {}
+
+    def test_rate_limit_reports_suppressed(self, captured, stdlib_only, monkeypatch):
+        clock = [0.0]
+        monkeypatch.setattr(structured_log.time, "monotonic", lambda: clock[0])
+        events = EventLogger("test_log.events", rate_limit=2)
+        for _ in range(10):
+            events.info("login")
+        events.info("other")
+        assert len(captured.records) == 3
+        clock[0] = 1.0
+        events.info("login")
+        assert captured.records[-1].fields == {"suppressed": 8}
+
+    def test_disabled_level_does_nothing(self, captured, stdlib_only):
+        logging.getLogger("test_log.events").setLevel(logging.WARNING)
+        events = EventLogger("test_log.events")
+        events.info("quiet")
+        assert captured.records == [] and events._buckets == {}
+
+
+class TestQueueOutput:
+    """Test cases for the queue handler and formatter."""
+
+    def test_queue_handler_defers_formatting_and_drops_when_full(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "value %s", ("a",), None)
+        handler.handle(record)
+        handler.handle(record)
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "value %s" and queued.args == ("a",)
+        assert handler.dropped == 1
+
+    def test_formatter_renders_json_and_text(self):
+        record = logging.LogRecord("svc", logging.INFO, __file__, 1, "user_logged_in", (), None)
+        record.fields = {"username": "ana"}
+        data = json.loads(StructuredFormatter().format(record))
+        assert data["event"] == "user_logged_in"
+        assert data["username"] == "ana"
+        assert data["level"] == "info" and data["logger"] == "svc"
+        assert StructuredFormatter(json_output=False).format(record).endswith("user_logged_in username=ana")
+
+    def test_configure_logging_writes_through_listener(self, stdlib_only):
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        stream = io.StringIO()
+        try:
+            structured_log.configure_logging(level="info", json_output=True, force=True, stream=stream)
+            structured_log.configure_logging(stream=io.StringIO())  # already configured: no-op
+            logging.getLogger("test_log.plain").info("plain %d", 1)
+            EventLogger("test_log.plain").info("event", n=2)
+            structured_log.shutdown_logging()
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["event"] for line in lines] == ["plain 1", "event"]
+        assert lines[1]["n"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
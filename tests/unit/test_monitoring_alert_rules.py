@@ -0,0 +1,175 @@
+"""
+Unit tests for Monitoring alert-rule evaluation
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../monitoring/src'))
+
+from alert_rules import AlertRule, RuleEvaluator
+
+
+def load_service():
+    spec = importlib.util.spec_from_file_location(
+        "monitoring_main", os.path.join(os.path.dirname(__file__), '../../monitoring/src/main.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.MonitoringService()
+
+
+class TestRuleEvaluator:
+    """Test cases for incremental rule evaluation."""
+
+    def test_pending_then_firing_then_resolved(self):
+        evaluator = RuleEvaluator()
+        rule = evaluator.add_rule(AlertRule("slow", "latency", ">", 1.0, duration_seconds=60))
+
+        assert evaluator.observe("latency", 2.0, timestamp=0) == []
+        assert evaluator.active()[0]["status"] == "pending"
+        assert evaluator.observe("latency", 3.0, timestamp=30) == []
+        fired = evaluator.observe("latency", 2.5, timestamp=60)
+        assert [e["event"] for e in fired] == ["firing"]
+        assert fired[0]["rule"] is rule
+        assert fired[0]["started_at"] == 0
+        # Still firing: no duplicate transition.
+        assert evaluator.observe("latency", 2.5, timestamp=90) == []
+
+        resolved = evaluator.observe("latency", 0.5, timestamp=120)
+        assert [e["event"] for e in resolved] == ["resolved"]
+        assert evaluator.active() == []
+
+    def test_pending_clears_without_firing(self):
+        evaluator = RuleEvaluator()
+        evaluator.add_rule(AlertRule("slow", "latency", ">", 1.0, duration_seconds=60))
+        evaluator.observe("latency", 2.0, timestamp=0)
+        assert evaluator.observe("latency", 0.1, timestamp=10) == []
+        assert evaluator.observe("latency", 2.0, timestamp=61) == []
+        assert evaluator.active()[0]["since"] == 61
+
+    def test_state_is_per_label_set(self):
+        evaluator = RuleEvaluator()
+        evaluator.add_rule(AlertRule("errors", "error_rate", ">=", 0.5, duration_seconds=0, labels={"team": "ml"}))
+        fired = evaluator.observe("error_rate", 0.9, {"service": "a"}, timestamp=0)
+        assert fired[0]["labels"] == {"team": "ml", "service": "a"}
+        assert evaluator.observe("error_rate", 0.1, {"service": "b"}, timestamp=1) == []
+        assert evaluator.stats()["firing"] == 1
+
+    def test_only_rules_on_the_metric_are_evaluated(self):
+        evaluator = RuleEvaluator()
+        for i in range(1000):
+            evaluator.add_rule(AlertRule(f"rule-{i}", f"metric-{i % 100}", ">", i))
+        evaluator.observe("metric-7", 1.0)
+        evaluator.observe("unknown", 1.0)
+        stats = evaluator.stats()
+        assert stats["evaluations"] == 10
+        assert stats["metrics_indexed"] == 100
+
+    def test_update_and_delete(self):
+        evaluator = RuleEvaluator()
+        rule = evaluator.add_rule(AlertRule("cpu", "cpu", ">", 90, duration_seconds=0))
+        evaluator.update_rule(rule.id, metric_name="gpu", threshold=50)
+        assert evaluator.observe("cpu", 99) == []
+        assert evaluator.observe("gpu", 60)[0]["event"] == "firing"
+        with pytest.raises(ValueError):
+            evaluator.update_rule(rule.id, condition="~")
+        assert rule.condition == ">"
+
+        evaluator.update_rule(rule.id, enabled=False)
+        assert evaluator.observe("gpu", 60) == []
+        assert evaluator.delete_rule(rule.id)
+        assert not evaluator.delete_rule(rule.id)
+        assert evaluator.stats()["metrics_indexed"] == 0
+
+    def test_invalid_updates_change_nothing(self):
+        evaluator = RuleEvaluator()
+        rule = evaluator.add_rule(AlertRule("cpu", "cpu", ">", 90))
+
+        with pytest.raises(ValueError):
+            evaluator.update_rule(rule.id, threshold=50, unknown_field=1)
+        with pytest.raises(ValueError):
+            evaluator.update_rule(rule.id, threshold=50, id="other")
+        with pytest.raises(ValueError):
+            evaluator.update_rule(rule.id, threshold="high")
+
+        assert rule.threshold == 90.0
+        assert "other" not in evaluator.rules
+
+    def test_firing_states_resolve_when_rule_changes(self):
+        evaluator = RuleEvaluator()
+        resolved = []
+        evaluator.listeners.append(resolved.extend)
+        rule = evaluator.add_rule(AlertRule("cpu", "cpu", ">", 90, duration_seconds=0))
+        evaluator.observe("cpu", 99, {"host": "a"})
+        evaluator.observe("cpu", 99, {"host": "b"})
+
+        evaluator.update_rule(rule.id, description="renamed")
+        assert resolved == []
+        evaluator.update_rule(rule.id, enabled=False)
+        assert sorted(e["labels"]["host"] for e in resolved) == ["a", "b"]
+        assert {e["event"] for e in resolved} == {"resolved"}
+
+        evaluator.update_rule(rule.id, enabled=True)
+        evaluator.observe("cpu", 99, {"host": "a"})
+        evaluator.delete_rule(rule.id)
+        assert len(resolved) == 3
+
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            AlertRule("bad", "cpu", "=~", 1)
+        with pytest.raises(ValueError):
+            AlertRule("bad", "cpu", ">", 1, severity="urgent")
+
+
+class TestMonitoringServiceRules:
+    """Test cases for alert rules in MonitoringService."""
+
+    def test_rule_fires_and_resolves_alert(self):
+        service = load_service()
+        created = service.create_alert_rule("slow-gateway", "response_time", ">", 1.0,
+                                            duration_seconds=0, severity="critical",
+                                            notification_channels=["pager"])
+        assert created["success"] is True
+        rule_id = created["alert_rule"]["id"]
+
+        service.record_request(2.0, service="api-gateway")
+        alerts = service.get_alerts("critical")["alerts"]
+        assert len(alerts) == 1
+        assert alerts[0]["rule_id"] == rule_id
+        assert alerts[0]["status"] == "active"
+        assert alerts[0]["labels"] == {"service": "api-gateway"}
+
+        service.record_request(0.2, service="api-gateway")
+        assert alerts[0]["status"] == "resolved"
+        assert "resolved_at" in alerts[0]
+
+    def test_rule_crud(self):
+        service = load_service()
+        rule_id = service.create_alert_rule("deep-queue", "queue_depth", ">", 10)["alert_rule"]["id"]
+        assert service.update_alert_rule(rule_id, threshold=20)["alert_rule"]["threshold"] == 20
+        assert "error" in service.update_alert_rule(rule_id, severity="urgent")
+        assert "error" in service.create_alert_rule("bad", "queue_depth", "~", 1)
+        assert service.list_alert_rules("queue")["total_count"] == 1
+        assert service.delete_alert_rule(rule_id)["success"] is True
+        assert "error" in service.delete_alert_rule(rule_id)
+
+    def test_deleting_a_firing_rule_resolves_its_alert(self):
+        service = load_service()
+        rule_id = service.create_alert_rule("deep-queue", "queue_depth", ">", 10,
+                                            duration_seconds=0)["alert_rule"]["id"]
+        service.record_queue_depth("inference-pool", 50)
+        alert = service.get_alerts()["alerts"][0]
+        assert alert["status"] == "active"
+
+        service.delete_alert_rule(rule_id)
+
+        assert alert["status"] == "resolved"
+        assert service._rule_alerts == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
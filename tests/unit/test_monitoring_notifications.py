@@ -0,0 +1,223 @@
+"""
+Unit tests for Monitoring alert deduplication and notifications
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../monitoring/src'))
+
+from notifications import AlertIdGenerator, AlertPipeline, fingerprint
+
+
+def make_alert(alert_type, severity="warning", labels=None, channels=None):
+    return {
+        "id": alert_type,
+        "type": alert_type,
+        "message": alert_type,
+        "severity": severity,
+        "timestamp": 0,
+        "labels": labels or {},
+        "notification_channels": channels or [],
+        "fingerprint": fingerprint(alert_type, labels),
+    }
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, channel, notification):
+        self.sent.append((channel, notification))
+
+
+class TestAlertIds:
+    """Test cases for alert id generation."""
+
+    def test_unique_and_sorted_within_one_second(self):
+        generator = AlertIdGenerator()
+        ids = [generator.next() for _ in range(1000)]
+        assert len(set(ids)) == 1000
+        assert ids == sorted(ids)
+
+    def test_clock_step_back_stays_monotonic(self, monkeypatch):
+        generator = AlertIdGenerator()
+        monkeypatch.setattr(time, "time", lambda: 2000.0)
+        first = generator.next()
+        monkeypatch.setattr(time, "time", lambda: 1000.0)
+        assert generator.next() > first
+
+
+class TestAlertPipeline:
+    """Test cases for dedupe, grouping and rate limiting."""
+
+    def make_pipeline(self, **kwargs):
+        notifier = RecordingNotifier()
+        options = dict(notifiers={"pager": notifier, "log": notifier}, group_wait=10,
+                       group_interval=60, per_minute=60, burst=2)
+        options.update(kwargs)
+        return AlertPipeline(**options), notifier
+
+    def test_fingerprint_ignores_label_order(self):
+        assert fingerprint("cpu", {"a": "1", "b": "2"}) == fingerprint("cpu", {"b": "2", "a": "1"})
+        assert fingerprint("cpu", {"a": "1"}) != fingerprint("cpu", {"a": "2"})
+
+    def test_duplicates_fold_into_active_alert(self):
+        pipeline, _ = self.make_pipeline()
+        original, is_new = pipeline.submit(make_alert("cpu"), now=0)
+        assert is_new
+        again, is_new = pipeline.submit(make_alert("cpu"), now=1)
+        assert not is_new and again is original
+        assert original["count"] == 2
+        assert pipeline.stats()["deduplicated"] == 1
+
+    def test_group_waits_then_sends_one_batch(self):
+        pipeline, notifier = self.make_pipeline()
+        for i in range(50):
+            pipeline.submit(make_alert(f"disk-{i}", labels={"service": "db"}), now=i * 0.1)
+        assert notifier.sent == []
+        sent = pipeline.flush(now=11)
+        assert len(sent) == 1
+        channel, notification = sent[0]
+        assert channel == "log"
+        assert notification["status"] == "firing"
+        assert notification["group"] == "severity=warning,service=db"
+        assert len(notification["alerts"]) == 50
+
+    def test_groups_by_labels(self):
+        pipeline, _ = self.make_pipeline(burst=10)
+        pipeline.submit(make_alert("a", labels={"service": "api"}), now=0)
+        pipeline.submit(make_alert("b", labels={"service": "db"}), now=0)
+        pipeline.submit(make_alert("c", severity="critical", labels={"service": "db"}), now=0)
+        assert len(pipeline.flush(now=10)) == 3
+
+    def test_group_interval_and_rate_limit(self):
+        pipeline, notifier = self.make_pipeline(burst=1, per_minute=0.5)
+        pipeline.submit(make_alert("a", channels=["pager"]), now=0)
+        assert len(pipeline.flush(now=10)) == 1
+
+        pipeline.submit(make_alert("b", channels=["pager"]), now=20)
+        # Inside group_interval: held back and coalesced.
+        assert pipeline.flush(now=40) == []
+        pipeline.submit(make_alert("c", channels=["pager"]), now=45)
+        # Interval passed but the channel's bucket has not refilled a full token.
+        assert pipeline.flush(now=70) == []
+        assert pipeline.stats()["rate_limited"] == 1
+        sent = pipeline.flush(now=130)
+        assert [a["type"] for a in sent[0][1]["alerts"]] == ["b", "c"]
+        assert len(notifier.sent) == 2
+
+    def test_rate_limited_channel_does_not_resend_to_others(self):
+        pipeline, notifier = self.make_pipeline(group_interval=0, per_minute=0.5, burst=1)
+        channels = ["pager", "log"]
+        pipeline.submit(make_alert("a", channels=channels), now=0)
+        assert len(pipeline.flush(now=10)) == 2
+
+        pipeline.submit(make_alert("b", channels=channels), now=20)
+        pipeline._buckets["log"].tokens = 1
+        assert [channel for channel, _ in pipeline.flush(now=30)] == ["log"]
+
+        pipeline.submit(make_alert("c", channels=channels), now=35)
+        for bucket in pipeline._buckets.values():
+            bucket.tokens = 1
+        sent = {channel: [a["type"] for a in n["alerts"]] for channel, n in pipeline.flush(now=50)}
+        assert sent == {"log": ["c"], "pager": ["b", "c"]}
+
+    def test_unresolved_alert_is_notified_again_after_repeat_interval(self):
+        pipeline, notifier = self.make_pipeline(repeat_interval=3600, group_wait=0, group_interval=0)
+        pipeline.submit(make_alert("cpu"), now=0)
+        assert len(notifier.sent) == 1
+
+        pipeline.submit(make_alert("cpu"), now=1000)
+        assert len(notifier.sent) == 1
+        alert, is_new = pipeline.submit(make_alert("cpu"), now=3700)
+        assert not is_new and alert["count"] == 3
+        assert len(notifier.sent) == 2
+        assert notifier.sent[-1][1]["alerts"][0]["count"] == 3
+        assert pipeline.stats()["repeated"] == 1
+
+    def test_resolution_is_notified(self):
+        pipeline, notifier = self.make_pipeline()
+        alert, _ = pipeline.submit(make_alert("cpu"), now=0)
+        pipeline.flush(now=10)
+        pipeline.resolve(alert["fingerprint"], now=100)
+        sent = pipeline.flush(now=110)
+        assert sent[0][1]["status"] == "resolved"
+        # Once resolved, the same alert is new again.
+        assert pipeline.submit(make_alert("cpu"), now=120)[1]
+
+    def test_resolved_before_sending_is_dropped(self):
+        pipeline, notifier = self.make_pipeline()
+        alert, _ = pipeline.submit(make_alert("blip"), now=0)
+        pipeline.resolve(alert["fingerprint"], now=1)
+        assert pipeline.flush(now=20) == []
+        assert pipeline.stats()["pending_groups"] == 0
+
+    def test_notifier_errors_are_counted(self):
+        def broken(channel, notification):
+            raise RuntimeError("down")
+
+        pipeline = AlertPipeline(notifiers={"log": broken}, group_wait=0)
+        pipeline.submit(make_alert("cpu"), now=0)
+        assert pipeline.stats()["errors"] == 1
+
+
+    def test_background_flush_delivers_a_lone_alert(self):
+        pipeline, notifier = self.make_pipeline(group_wait=0.05)
+        pipeline.start(interval=0.01)
+        try:
+            pipeline.submit(make_alert("high_cpu", channels=["pager"]))
+            deadline = time.monotonic() + 2
+            while not notifier.sent and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            pipeline.stop()
+
+        assert [(channel, n["status"]) for channel, n in notifier.sent] == [("pager", "firing")]
+
+
+class TestMonitoringServiceAlerts:
+    """Test cases for alert creation in MonitoringService."""
+
+    def test_ids_unique_and_repeats_deduplicated(self):
+        spec = importlib.util.spec_from_file_location(
+            "monitoring_main", os.path.join(os.path.dirname(__file__), '../../monitoring/src/main.py')
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        service = module.MonitoringService()
+
+        ids = {service.create_alert(f"type-{i}", "msg", "warning")["id"] for i in range(100)}
+        assert len(ids) == 100
+        first = service.create_alert("high_cpu", "CPU usage above 90%", "warning", labels={"host": "a"})
+        repeat = service.create_alert("high_cpu", "CPU usage above 90%", "warning", labels={"host": "a"})
+        assert repeat["id"] == first["id"] and repeat["count"] == 2
+        assert service.get_alerts()["total_count"] == 101
+
+        resolved = service.resolve_alert(first["id"])
+        assert resolved["status"] == "resolved"
+        assert service.create_alert("high_cpu", "again", "warning", labels={"host": "a"})["id"] != first["id"]
+        assert "error" in service.resolve_alert("alert-missing")
+        service.shutdown()
+
+    def test_notifications_flush_in_background(self):
+        spec = importlib.util.spec_from_file_location(
+            "monitoring_main", os.path.join(os.path.dirname(__file__), '../../monitoring/src/main.py')
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        service = module.MonitoringService()
+        assert service.notifications._thread is None
+
+        service.create_alert("high_cpu", "CPU usage above 90%", "warning")
+        assert service.notifications._thread.is_alive()
+        service.shutdown()
+        assert service.notifications._thread is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
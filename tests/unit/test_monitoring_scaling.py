@@ -0,0 +1,162 @@
+"""
+Unit tests for Monitoring predictive autoscaling
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../monitoring/src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../api-gateway/src'))
+
+from predictive_scaling import (
+    PredictiveAutoscaler,
+    ewma_forecast,
+    forecast,
+    holt_winters_forecast,
+    seasonal_decomposition_forecast,
+)
+
+# Quiet for 9 buckets, then a spike, repeating every 12 buckets.
+PATTERN = [2, 2, 2, 2, 2, 2, 2, 2, 2, 20, 30, 10]
+
+
+class TestForecastModels:
+    """Test cases for the individual forecasting models."""
+
+    def test_ewma_flat_forecast(self):
+        fit = ewma_forecast([10.0] * 20, horizon=3)
+        assert fit["predictions"] == [10.0, 10.0, 10.0]
+        assert fit["sigma"] == 0.0
+
+    def test_holt_follows_trend(self):
+        fit = holt_winters_forecast([float(i) for i in range(10)], horizon=3, season_length=12)
+        assert fit["model"] == "holt"
+        assert fit["predictions"] == pytest.approx([10.0, 11.0, 12.0], abs=0.01)
+
+    def test_seasonal_models_predict_the_next_spike(self):
+        series = [float(v) for v in PATTERN * 4]
+        for fit in (holt_winters_forecast(series, 12, 12), seasonal_decomposition_forecast(series, 12, 12)):
+            assert fit["predictions"][10] == pytest.approx(30.0, abs=1.0)
+            assert fit["predictions"][0] == pytest.approx(2.0, abs=1.0)
+
+    def test_interval_widens_with_horizon(self):
+        fit = ewma_forecast([5.0, 7.0, 4.0, 6.0, 5.0], horizon=4)
+        widths = [u - l for u, l in zip(fit["upper"], fit["lower"])]
+        assert widths == sorted(widths)
+        assert all(l <= p <= u for l, p, u in zip(fit["lower"], fit["predictions"], fit["upper"]))
+
+    def test_selection_prefers_seasonal_model(self):
+        fit = forecast([float(v) for v in PATTERN * 4], horizon=12, season_length=12)
+        assert fit["model"] in ("holt_winters", "seasonal_decomposition")
+        assert forecast([], 3, 12)["predictions"] == [0.0, 0.0, 0.0]
+
+
+class TestPredictiveAutoscaler:
+    """Test cases for replica recommendations."""
+
+    def make_scaler(self, **kwargs):
+        options = dict(interval=60, season_length=12, requests_per_replica=1.0,
+                       target_utilization=1.0, provision_seconds=120)
+        options.update(kwargs)
+        return PredictiveAutoscaler(**options)
+
+    def feed(self, scaler, pattern, start=0.0):
+        for bucket, rate in enumerate(pattern):
+            for _ in range(int(rate * 60)):
+                scaler.record("inference-pool", "request_rate", timestamp=start + bucket * 60)
+        return start + len(pattern) * 60
+
+    def test_scales_up_before_the_spike(self):
+        scaler = self.make_scaler()
+        scaler.set_replicas("inference-pool", 3)
+        # End of history sits just before the spike phase; current load is low.
+        now = self.feed(scaler, PATTERN * 4 + PATTERN[:7])
+        result = scaler.recommend("inference-pool", horizon_minutes=5, now=now)
+        recommendation = result["recommendations"][0]
+
+        assert result["prediction_metrics"]["current_load"] == pytest.approx(2.0)
+        assert result["prediction_metrics"]["predicted_load"] > 20
+        assert recommendation["action"] == "scale_up"
+        assert recommendation["target_replicas"] >= 30
+        assert recommendation["estimated_time"] < result["prediction_metrics"]["predictions"][3]["timestamp"]
+        assert 0 < recommendation["confidence_score"] <= 1
+
+    def test_scale_down_respects_cooldown(self):
+        scaler = self.make_scaler(scale_down_cooldown=600)
+        scaler.set_replicas("inference-pool", 10)
+        now = self.feed(scaler, [1.0] * 30)
+        first = scaler.recommend("inference-pool", horizon_minutes=5, now=now)["recommendations"][0]
+        assert first["action"] == "scale_down"
+        assert first["target_replicas"] < 10
+        # Recommending is read-only: until replicas are actually removed the advice stands.
+        again = scaler.recommend("inference-pool", horizon_minutes=5, now=now)["recommendations"][0]
+        assert again["action"] == "scale_down"
+
+        scaler.set_replicas("inference-pool", 5, timestamp=now)
+        second = scaler.recommend("inference-pool", horizon_minutes=5, now=now + 60)["recommendations"][0]
+        assert second["action"] == "no_action"
+        later = scaler.recommend("inference-pool", horizon_minutes=5, now=now + 660)["recommendations"][0]
+        assert later["action"] == "scale_down"
+
+    def test_queue_depth_can_drive_scaling(self):
+        scaler = self.make_scaler(queue_per_replica=4.0)
+        for bucket in range(20):
+            scaler.record("inference-pool", "queue_depth", 40.0, timestamp=bucket * 60)
+        result = scaler.recommend("inference-pool", horizon_minutes=5, now=20 * 60)
+        assert result["recommendations"][0]["metrics"]["driver"] == "queue_depth"
+        assert result["recommendations"][0]["target_replicas"] >= 10
+
+    def test_unknown_service(self):
+        result = self.make_scaler().recommend("missing")
+        assert result["success"] is False
+
+
+def load_monitoring():
+    spec = importlib.util.spec_from_file_location(
+        "monitoring_main", os.path.join(os.path.dirname(__file__), '../../monitoring/src/main.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestMonitoringServiceScaling:
+    """Test cases for the monitoring service entry point."""
+
+    def test_recommendations_from_recorded_requests(self):
+        module = load_monitoring()
+        service = module.MonitoringService()
+        service.record_request(0.1, service="api-gateway")
+        service.record_queue_depth("api-gateway", 3)
+        result = service.get_scaling_recommendations("api-gateway", 10)
+        assert result["success"] is True
+        assert result["recommendations"][0]["service_name"] == "api-gateway"
+
+    def test_gateway_reports_replicas_and_queue_depth(self):
+        module = load_monitoring()
+        gateway_spec = importlib.util.spec_from_file_location(
+            "api_gateway_main", os.path.join(os.path.dirname(__file__), '../../api-gateway/src/main.py')
+        )
+        gateway_module = importlib.util.module_from_spec(gateway_spec)
+        gateway_spec.loader.exec_module(gateway_module)
+
+        class Replica:
+            def health_check(self):
+                return {"status": "healthy", "in_flight": 1, "queue_depth": 2}
+
+        service = module.MonitoringService()
+        gateway = gateway_module.APIGateway(replicas=[Replica(), Replica(), Replica()], monitoring=service)
+        gateway.shutdown()
+
+        assert service.autoscaler.replicas["inference-pool"] == 3
+        result = service.get_scaling_recommendations("inference-pool", 5)
+        assert result["recommendations"][0]["metrics"]["current_replicas"] == "3"
+        assert service.get_scaling_recommendations("inference-pool", 5, current_replicas=7)[
+            "recommendations"][0]["metrics"]["current_replicas"] == "7"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
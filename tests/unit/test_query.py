@@ -0,0 +1,141 @@
+"""
+Unit tests for the instrumented query layer
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from common.database import PostgresPool, SQLitePool
+from common.metrics import Histogram
+from common.query import QueryRunner
+
+
+class FakeConnection:
+    """asyncpg connection stand-in that records the SQL it was given."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.queries = []
+
+    def get_server_pid(self):
+        return self.pid
+
+    async def fetch(self, sql, *args):
+        self.queries.append(sql)
+        return [{"value": arg} for arg in args]
+
+    async def fetchval(self, sql, *args):
+        self.queries.append(sql)
+        if sql.startswith("EXPLAIN"):
+            return "[{\"Plan\": {}}]"
+        return args[0] if args else None
+
+    async def execute(self, sql, *args):
+        self.queries.append(sql)
+        return "UPDATE 2"
+
+
+class FakePostgresPool(PostgresPool):
+    """PostgresPool backed by in-memory fake connections."""
+
+    def __init__(self, connections):
+        super().__init__(dsn="postgresql://test", max_size=len(connections))
+        self.connections = connections
+        self.next_index = 0
+
+    async def _open(self):
+        pass
+
+    async def _close(self):
+        pass
+
+    async def _checkout(self):
+        conn = self.connections[self.next_index % len(self.connections)]
+        self.next_index += 1
+        return conn
+
+    async def _checkin(self, conn):
+        pass
+
+
+class TestQueryRunner:
+    """Test cases for QueryRunner."""
+
+    def test_queries_use_the_connection_statement_cache(self):
+        """SQL text goes straight to the connection, whose driver caches the prepared statement."""
+        connections = [FakeConnection(1), FakeConnection(2)]
+        pool = FakePostgresPool(connections)
+        runner = QueryRunner(pool)
+        sql = "SELECT * FROM users WHERE id = $1"
+
+        async def run():
+            for i in range(6):
+                await runner.fetch(sql, i)
+
+        asyncio.run(run())
+
+        assert pool.statement_cache_size == 100
+        assert [conn.queries for conn in connections] == [[sql] * 3, [sql] * 3]
+        assert runner.stats[sql].calls == 6
+        assert runner.stats[sql].rows == 6
+
+    def test_execute_reports_affected_rows(self):
+        runner = QueryRunner(FakePostgresPool([FakeConnection(1)]))
+
+        status = asyncio.run(runner.execute("UPDATE api_keys SET last_used = now()"))
+
+        assert status == "UPDATE 2"
+        assert runner.stats["UPDATE api_keys SET last_used = now()"].rows == 2
+
+    def test_sqlite_slow_query_logged_with_plan(self, tmp_path, caplog):
+        """Queries over the threshold should be logged with their query plan."""
+        pool = SQLitePool(db_path=str(tmp_path / "helixflow.db"))
+        runner = QueryRunner(pool, slow_query_threshold=0)
+
+        async def run():
+            await runner.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+            await runner.execute("INSERT INTO users (name) VALUES (?)", "alice")
+            rows = await runner.fetch("SELECT name FROM users WHERE id = ?", 1)
+            await pool.close()
+            return rows
+
+        with caplog.at_level(logging.WARNING, logger="common.query"):
+            rows = asyncio.run(run())
+
+        assert rows[0]["name"] == "alice"
+        assert any("SEARCH users" in record.getMessage() for record in caplog.records)
+        stats = runner.stats["SELECT name FROM users WHERE id = ?"]
+        assert stats.slow_calls == 1
+        assert stats.rows == 1
+
+    def test_errors_are_counted(self, tmp_path):
+        pool = SQLitePool(db_path=str(tmp_path / "helixflow.db"))
+        runner = QueryRunner(pool)
+
+        with pytest.raises(Exception):
+            asyncio.run(runner.fetch("SELECT * FROM missing"))
+
+        assert runner.stats["SELECT * FROM missing"].errors == 1
+
+
+class TestHistogram:
+    """Test cases for the latency histogram."""
+
+    def test_percentiles_use_bucket_bounds(self):
+        histogram = Histogram([0.01, 0.1, 1.0])
+        for value in (0.005, 0.005, 0.05, 2.0):
+            histogram.observe(value)
+
+        assert histogram.count == 4
+        assert histogram.percentile(0.5) == 0.01
+        assert histogram.percentile(0.75) == 0.1
+        assert histogram.percentile(1.0) == 2.0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""
+Unit tests for the asynchronous Python SDK client
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../sdks/python'))
+
+from helixflow import AsyncHelixFlow, AsyncTransport, RateLimitError
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None, lines=()):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body if body is not None else {}
+        self.lines = list(lines)
+        self.text = str(self.body)
+
+    def json(self):
+        return self.body
+
+    async def aclose(self):
+        pass
+
+
+class EchoTransport(AsyncTransport):
+    """Answers chat completions with the prompt and tracks concurrency."""
+
+    def __init__(self, delay=0.01, fail_on=None):
+        super().__init__()
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def request(self, method, url, json=None, stream=False):
+        self.requests_sent += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if stream:
+            return FakeResponse(lines=[b'data: {"delta": "a"}\n\n', b'data: {"delta": "b"}\n\ndata: [DONE]\n\n'])
+        if json is None:
+            return FakeResponse(body={"object": "list", "data": []})
+        prompt = json["messages"][-1]["content"]
+        if prompt == self.fail_on:
+            return FakeResponse(429)
+        return FakeResponse(body={"prompt": prompt})
+
+    async def aiter_bytes(self, response, chunk_size=None):
+        for line in response.lines:
+            yield line
+
+
+def prompt(i):
+    return [{"role": "user", "content": str(i)}]
+
+
+class TestAsyncHelixFlow:
+    """Test cases for AsyncHelixFlow."""
+
+    def test_map_preserves_order_and_bounds_concurrency(self):
+        transport = EchoTransport()
+        client = AsyncHelixFlow("key", transport=transport)
+
+        async def run():
+            return await client.map(
+                lambda i: client.chat_completion("gpt-4", prompt(i)), range(50), limit=8
+            )
+
+        results = asyncio.run(run())
+
+        assert [r["prompt"] for r in results] == [str(i) for i in range(50)]
+        assert transport.peak_in_flight == 8
+
+    def test_map_collects_exceptions(self):
+        transport = EchoTransport(fail_on="3")
+        client = AsyncHelixFlow("key", transport=transport)
+        client.retry_policy.max_retries = 0
+
+        async def run():
+            return await client.map(
+                lambda i: client.chat_completion("gpt-4", prompt(i)),
+                range(5),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+
+        assert isinstance(results[3], RateLimitError)
+        assert results[4] == {"prompt": "4"}
+
+    def test_gather_limits_in_flight_awaitables(self):
+        transport = EchoTransport()
+        client = AsyncHelixFlow("key", transport=transport)
+
+        async def run():
+            return await client.gather(*(client.list_models() for _ in range(10)), limit=3)
+
+        assert len(asyncio.run(run())) == 10
+        assert transport.peak_in_flight == 3
+
+    def test_stream_yields_chunks(self):
+        client = AsyncHelixFlow("key", transport=EchoTransport())
+
+        async def run():
+            stream = client.chat_completion_stream("gpt-4", prompt(0))
+            return [chunk async for chunk in stream], stream.stats
+
+        chunks, stats = asyncio.run(run())
+
+        assert chunks == [{"delta": "a"}, {"delta": "b"}]
+        assert stats.chunks == 2 and len(stats.inter_token_times) == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
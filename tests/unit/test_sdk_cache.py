@@ -0,0 +1,164 @@
+"""
+Unit tests for the SDK response cache
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../sdks/python'))
+
+from helixflow import HelixFlow, ResponseCache, Transport
+from helixflow.cache import DiskCache, SingleFlight, TTLCache, request_key
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def close(self):
+        pass
+
+
+class CountingTransport(Transport):
+    """Echoes the request body and counts calls, optionally slowly."""
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, json=None, stream=False):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return FakeResponse({"url": url, "body": json, "call": self.calls})
+
+
+MESSAGES = [{"role": "user", "content": "What is 2 + 2?"}]
+
+
+class TestResponseCache:
+    """Test cases for caching in the HelixFlow client."""
+
+    def test_model_metadata_is_cached(self):
+        transport = CountingTransport()
+        client = HelixFlow("key", transport=transport, cache=ResponseCache())
+
+        first = client.list_models()
+        first["mutated"] = True
+        second = client.list_models()
+
+        assert transport.calls == 1
+        assert "mutated" not in second
+
+    def test_only_deterministic_completions_are_cached(self):
+        transport = CountingTransport()
+        client = HelixFlow("key", transport=transport, cache=ResponseCache())
+
+        client.chat_completion("gpt-4", MESSAGES, temperature=0)
+        client.chat_completion("gpt-4", MESSAGES, temperature=0)
+        client.chat_completion("gpt-4", MESSAGES, temperature=0.7)
+        client.chat_completion("gpt-4", MESSAGES, temperature=0.7)
+
+        assert transport.calls == 3
+
+    def test_concurrent_identical_requests_are_coalesced(self):
+        transport = CountingTransport(delay=0.05)
+        cache = ResponseCache()
+        client = HelixFlow("key", transport=transport, cache=cache)
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get_model("gpt-4")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert transport.calls == 1
+        assert len(results) == 8
+        assert cache.stats()["coalesced"] + cache.stats()["hits"] == 7
+
+    def test_disk_cache_survives_new_client(self, tmp_path):
+        path = str(tmp_path / "cache" / "completions.db")
+        transport = CountingTransport()
+
+        HelixFlow("key", transport=transport, cache=ResponseCache(disk_path=path)).chat_completion(
+            "gpt-4", MESSAGES, temperature=0
+        )
+        result = HelixFlow("key", transport=transport, cache=ResponseCache(disk_path=path)).chat_completion(
+            "gpt-4", MESSAGES, temperature=0
+        )
+
+        assert transport.calls == 1
+        assert result["call"] == 1
+
+    def test_shared_cache_is_scoped_to_credentials_and_server(self):
+        transport = CountingTransport()
+        cache = ResponseCache()
+
+        HelixFlow("tenant-a", transport=transport, cache=cache).chat_completion("gpt-4", MESSAGES, temperature=0)
+        HelixFlow("tenant-b", transport=transport, cache=cache).chat_completion("gpt-4", MESSAGES, temperature=0)
+        HelixFlow("tenant-a", base_url="https://eu.helixflow.ai", transport=transport, cache=cache).list_models()
+        HelixFlow("tenant-a", transport=transport, cache=cache).list_models()
+
+        assert transport.calls == 4
+
+
+class TestCachePrimitives:
+    """Test cases for TTLCache, SingleFlight and request keys."""
+
+    def test_ttl_and_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == (True, 1)
+        assert cache.get("b") == (False, None)
+
+        cache.set("d", 4, ttl=-1)
+        assert cache.get("d") == (False, None)
+
+    def test_singleflight_propagates_errors(self):
+        flight = SingleFlight()
+
+        with pytest.raises(RuntimeError):
+            flight.do("k", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+
+        assert flight.do("k", lambda: 5) == 5
+
+    def test_request_key_is_canonical(self):
+        assert request_key("post", "/x", {"a": 1, "b": [1, 2]}) == request_key("POST", "/x", {"b": [1, 2], "a": 1})
+        assert request_key("POST", "/x", {"a": 1}) != request_key("POST", "/x", {"a": 2})
+        assert "secret" not in request_key("GET", "/x", api_key="secret")
+
+    def test_disk_cache_expires_and_caps_entries(self, tmp_path):
+        disk = DiskCache(str(tmp_path / "completions.db"), ttl=60, maxsize=2)
+        for key in ("a", "b", "c"):
+            disk.set(key, {"key": key})
+
+        assert len(disk) == 2
+        assert disk.get("a") == (False, None)
+        assert disk.get("c") == (True, {"key": "c"})
+
+        disk.ttl = -1
+        assert disk.get("c") == (False, None)
+        disk.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
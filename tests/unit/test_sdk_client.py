@@ -0,0 +1,197 @@
+"""
+Unit tests for the Python SDK client
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../sdks/python'))
+
+from helixflow import HelixFlow, RateLimitError, RetryPolicy, Transport
+from helixflow.transport import parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None, lines=()):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body if body is not None else {}
+        self.lines = list(lines)
+        self.closed = False
+
+    @property
+    def text(self):
+        return json.dumps(self.body)
+
+    def json(self):
+        return self.body
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnectError(Exception):
+    pass
+
+
+class FakeTransport(Transport):
+    """Transport returning queued responses instead of making HTTP calls."""
+
+    connect_errors = (FakeConnectError,)
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, json=None, stream=False):
+        self.calls.append((method, url, json))
+        self.requests_sent += 1
+        result = self.responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def iter_lines(self, response):
+        return iter(response.lines)
+
+    def iter_bytes(self, response, chunk_size=None):
+        return iter(response.lines)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr("helixflow.client.time.sleep", recorded.append)
+    return recorded
+
+
+class TestHelixFlowTransport:
+    """Test cases for retries and transport handling."""
+
+    def test_retries_429_honoring_retry_after(self, sleeps):
+        transport = FakeTransport([
+            FakeResponse(429, headers={"Retry-After": "2"}),
+            FakeResponse(200, {"object": "list", "data": []}),
+        ])
+        client = HelixFlow("key", transport=transport)
+
+        result = client.list_models()
+
+        assert result["object"] == "list"
+        assert sleeps == [2.0]
+        assert client.transport_stats()["retries"] == 1
+
+    def test_raises_rate_limit_after_retries_exhausted(self, sleeps):
+        transport = FakeTransport([FakeResponse(429, headers={"Retry-After": "1"})] * 3)
+        client = HelixFlow("key", transport=transport, retry_policy=RetryPolicy(max_retries=2))
+
+        with pytest.raises(RateLimitError) as excinfo:
+            client.chat_completion("gpt-4", [{"role": "user", "content": "hi"}])
+
+        assert excinfo.value.retry_after == 1.0
+        assert len(transport.calls) == 3
+
+    def test_connect_errors_are_retried_with_backoff(self, sleeps):
+        transport = FakeTransport([FakeConnectError(), FakeResponse(200, {"id": "gpt-4"})])
+        client = HelixFlow("key", transport=transport, retry_policy=RetryPolicy(backoff_base=0.1))
+
+        assert client.get_model("gpt-4") == {"id": "gpt-4"}
+        assert len(sleeps) == 1
+        assert 0 <= sleeps[0] <= 0.1
+
+    def test_server_errors_not_retried_for_completions(self, sleeps):
+        """A 5xx on POST may follow a billed completion, so it is not resent."""
+        transport = FakeTransport([FakeResponse(503, {"error": "unavailable"}), FakeResponse(200, {})])
+        client = HelixFlow("key", transport=transport)
+
+        with pytest.raises(Exception, match="unavailable"):
+            client.chat_completion("gpt-4", [{"role": "user", "content": "hi"}])
+
+        assert len(transport.calls) == 1
+        assert sleeps == []
+
+    def test_server_errors_retried_for_idempotent_requests(self, sleeps):
+        transport = FakeTransport([FakeResponse(503), FakeResponse(200, {"id": "gpt-4"})])
+        client = HelixFlow("key", transport=transport)
+
+        assert client.get_model("gpt-4") == {"id": "gpt-4"}
+        assert len(transport.calls) == 2
+
+    def test_retry_after_beyond_budget_is_not_waited(self, sleeps):
+        transport = FakeTransport([FakeResponse(429, headers={"Retry-After": "120"})])
+        client = HelixFlow("key", transport=transport)
+
+        with pytest.raises(RateLimitError) as excinfo:
+            client.list_models()
+
+        assert excinfo.value.retry_after == 120.0
+        assert sleeps == []
+
+    def test_client_errors_are_not_retried(self, sleeps):
+        transport = FakeTransport([FakeResponse(400, {"error": "bad request"})])
+        client = HelixFlow("key", transport=transport)
+
+        with pytest.raises(Exception, match="bad request"):
+            client.list_models()
+
+        assert sleeps == []
+
+    def test_stream_yields_chunks_until_done(self):
+        body = [b'data: {"id": 1}\n\ndata: {"i', b'd": 2}\n\n', b"data: [DONE]\n\n", b'data: {"id": 3}\n\n']
+        response = FakeResponse(200, lines=body)
+        client = HelixFlow("key", transport=FakeTransport([response]))
+
+        stream = client.chat_completion_stream("gpt-4", [{"role": "user", "content": "hi"}])
+        chunks = list(stream)
+
+        assert chunks == [{"id": 1}, {"id": 2}]
+        assert stream.stats.chunks == 2
+        assert stream.stats.ttft is not None
+        assert response.closed
+
+    def test_batch_sends_defaults_and_streams_results(self):
+        lines = [b'{"index": 1, "response": {}}', b'{"index": 0, "response": {}}']
+        transport = FakeTransport([FakeResponse(200, lines=lines)])
+        client = HelixFlow("key", transport=transport)
+
+        results = list(client.chat_completion_batch(
+            [[{"role": "user", "content": "a"}], {"messages": [{"role": "user", "content": "b"}]}],
+            model="gpt-4",
+            max_tokens=20,
+        ))
+
+        method, url, body = transport.calls[0]
+        assert url.endswith("/v1/chat/completions/batch")
+        assert body["model"] == "gpt-4" and body["max_tokens"] == 20 and body["stream"] is True
+        assert body["requests"][0] == {"messages": [{"role": "user", "content": "a"}]}
+        assert [r["index"] for r in results] == [1, 0]
+
+
+class TestRetryPolicy:
+    """Test cases for backoff calculation."""
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(backoff_base=1.0, backoff_max=4.0)
+
+        assert all(0 <= policy.delay(attempt) <= 4.0 for attempt in range(10))
+
+    def test_retry_after_is_slept_in_full_within_budget(self):
+        policy = RetryPolicy(backoff_max=4.0, max_retry_after=90.0)
+
+        assert policy.delay(0, retry_after=60) == 60.0
+        assert policy.should_retry(0, 429, "POST", retry_after=60)
+        assert not policy.should_retry(0, 429, "POST", retry_after=120)
+        assert not policy.should_retry(0, 502, "POST")
+        assert policy.should_retry(0, 502, "GET")
+
+    def test_parse_retry_after_http_date(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") < 0
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("soon") is None
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,204 @@
+"""
+Unit tests for CogneeMemoryEngine retrieval and write-back
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../sdks/python'))
+
+from helixflow.client import CogneeMemoryEngine
+from helixflow.memory import (
+    CachedEmbedder,
+    HashingEmbedder,
+    LocalVectorIndex,
+    MemoryRecord,
+    MemoryWriter,
+    merge_memories,
+)
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+
+    def chat_completion(self, model, messages, **kwargs):
+        self.calls.append((model, messages, kwargs))
+        return {
+            "object": "chat.completion",
+            "choices": [{"message": {"role": "assistant", "content": "Noted, you enjoy hiking"}}],
+        }
+
+
+def engine(**kwargs):
+    return CogneeMemoryEngine("key", client=RecordingClient(), **kwargs)
+
+
+class TestCogneeMemoryEngine:
+    """Test cases for memory retrieval."""
+
+    def test_relevant_memory_is_added_for_the_same_user(self):
+        memory = engine()
+        memory.add_memory("alice", "Alice's favourite programming language is Rust")
+        memory.add_memory("alice", "Alice lives in Lisbon")
+        memory.add_memory("bob", "Bob's favourite programming language is Go")
+
+        memory.enhance_chat(
+            "gpt-4",
+            [{"role": "system", "content": "Be brief."},
+             {"role": "user", "content": "Which programming language is my favourite?"}],
+            user_id="alice",
+        )
+
+        _, messages, kwargs = memory.client.calls[0]
+        assert messages[0]["content"] == "Be brief."
+        assert messages[1]["role"] == "system"
+        assert "Rust" in messages[1]["content"]
+        assert "Go" not in messages[1]["content"]
+        assert kwargs["user"] == "alice"
+
+    def test_no_memories_leaves_messages_unchanged(self):
+        memory = engine()
+        messages = [{"role": "user", "content": "Hello"}]
+
+        assert memory._add_memory_context(messages, user_id="nobody") == messages
+
+    def test_failed_retrieval_is_skipped(self):
+        class TimingOutIndex(LocalVectorIndex):
+            def search(self, *args, **kwargs):
+                raise TimeoutError("vector search timed out")
+
+        memory = engine(index=TimingOutIndex(), write_back=False)
+        memory.add_memory("alice", "Alice likes tea")
+
+        memory.enhance_chat("gpt-4", [{"role": "user", "content": "Does Alice like tea?"}], user_id="alice")
+
+        assert memory.retrieval_failures == 1
+        assert len(memory.client.calls[0][1]) == 1
+
+    def test_user_is_only_sent_when_given(self):
+        memory = engine(write_back=False)
+
+        memory.enhance_chat("gpt-4", [{"role": "user", "content": "Hello"}])
+
+        assert "user" not in memory.client.calls[0][2]
+
+
+class TestMemoryHelpers:
+    """Test cases for embeddings and budgeted merging."""
+
+    def test_embeddings_are_cached(self):
+        calls = []
+
+        def embed(text):
+            calls.append(text)
+            return HashingEmbedder(dim=8)(text)
+
+        embedder = CachedEmbedder(embed)
+        assert embedder("same text") == embedder("same text")
+        assert calls == ["same text"]
+
+    def test_similar_text_scores_higher(self):
+        index = LocalVectorIndex()
+        memory = engine()
+        memory.index = index
+        memory.add_memory("u", "the deployment uses kubernetes on aws")
+        memory.add_memory("u", "lunch was pasta")
+
+        hits = index.search("u", memory.embed("how is the deployment run on kubernetes"), 2)
+
+        assert hits[0]["record"].text == "the deployment uses kubernetes on aws"
+        assert hits[0]["score"] > hits[1]["score"]
+
+    def test_merge_respects_token_budget(self):
+        messages = [{"role": "user", "content": "hi"}]
+        memories = ["a" * 40, "b" * 40, "c" * 40]
+
+        merged = merge_memories(messages, memories, token_budget=15)
+
+        assert "a" * 40 in merged[0]["content"]
+        assert "b" * 40 not in merged[0]["content"]
+        assert merged[1] == messages[0]
+
+
+class TestMemoryWriter:
+    """Test cases for background memory ingestion."""
+
+    def test_chat_turns_are_written_back_in_the_background(self):
+        memory = engine()
+        memory.enhance_chat("gpt-4", [{"role": "user", "content": "I go hiking every weekend"}], user_id="alice")
+
+        assert memory.flush(timeout=5)
+        texts = sorted(r.text for r in memory.index.records("alice"))
+        assert texts == ["I go hiking every weekend", "Noted, you enjoy hiking"]
+        memory.close()
+
+    def test_near_duplicates_are_skipped(self):
+        index = LocalVectorIndex()
+        writer = MemoryWriter(index, HashingEmbedder(), flush_interval=0.01)
+        writer.enqueue("alice", "Alice likes green tea")
+        writer.enqueue("alice", "alice likes green tea!")
+        writer.enqueue("bob", "Alice likes green tea")
+        assert writer.flush(timeout=5)
+        writer.enqueue("alice", "Alice likes green tea")
+        assert writer.flush(timeout=5)
+
+        assert index.count("alice") == 1
+        assert index.count("bob") == 1
+        assert writer.stats["duplicates"] == 2
+        writer.close()
+
+    def test_compaction_caps_memories_per_user(self):
+        index = LocalVectorIndex()
+        embed = HashingEmbedder()
+        writer = MemoryWriter(index, embed, max_memories_per_user=5, compact_batch=4)
+        index.upsert([
+            MemoryRecord("alice", f"fact number {i} about topic {i * 7}", embed(f"fact {i}"), created_at=i)
+            for i in range(10)
+        ])
+
+        assert writer.compact("alice") == 8
+        records = index.records("alice")
+        assert len(records) == 4
+        summaries = [r for r in records if r.metadata.get("summary")]
+        assert len(summaries) == 1
+        assert "fact number 0" in summaries[0].text
+        assert "fact number 6" in summaries[0].text
+        writer.close()
+
+    def test_full_queue_drops_writes(self):
+        class BlockedIndex(LocalVectorIndex):
+            def search(self, *args, **kwargs):
+                time.sleep(0.2)
+                return []
+
+        writer = MemoryWriter(BlockedIndex(), HashingEmbedder(), batch_size=1, max_queue_size=1)
+        results = [writer.enqueue("alice", f"memory {i}") for i in range(5)]
+
+        assert not all(results)
+        assert writer.stats["dropped"] >= 1
+        writer.close()
+
+    def test_close_does_not_block_on_a_full_queue(self):
+        class BlockedIndex(LocalVectorIndex):
+            def search(self, *args, **kwargs):
+                time.sleep(0.2)
+                return []
+
+        writer = MemoryWriter(BlockedIndex(), HashingEmbedder(), batch_size=1, max_queue_size=1, flush_interval=0.01)
+        for i in range(3):
+            writer.enqueue("alice", f"memory {i}")
+
+        started = time.monotonic()
+        writer.close(timeout=0.05)
+
+        assert time.monotonic() - started < 0.15
+        writer._thread.join(5)
+        assert not writer._thread.is_alive()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
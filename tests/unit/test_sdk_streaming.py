@@ -0,0 +1,86 @@
+"""
+Unit tests for the SDK's incremental SSE decoder
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../sdks/python'))
+
+from helixflow import APIError, ChatCompletionStream, SSEDecoder, StreamError
+from helixflow.streaming import get_json_loads
+
+
+class TestSSEDecoder:
+    """Test cases for SSEDecoder."""
+
+    def test_events_split_across_chunks(self):
+        decoder = SSEDecoder()
+        body = b'data: {"a": 1}\r\n\r\ndata: {"b": 2}\n\n'
+
+        events = []
+        for i in range(len(body)):
+            events.extend(decoder.feed(body[i:i + 1]))
+
+        assert [json.loads(e.data) for e in events] == [{"a": 1}, {"b": 2}]
+
+    def test_multiline_data_and_fields(self):
+        decoder = SSEDecoder()
+
+        events = decoder.feed(
+            b": keep-alive\n"
+            b"event: delta\nid: 7\nretry: 1500\n"
+            b"data: line one\ndata:line two\n\n"
+        )
+
+        assert len(events) == 1
+        event = events[0]
+        assert (event.event, event.id, event.retry) == ("delta", "7", 1500)
+        assert event.data == b"line one\nline two"
+        assert decoder.last_event_id == "7"
+
+    def test_flush_dispatches_unterminated_event(self):
+        decoder = SSEDecoder()
+
+        assert decoder.feed(b"data: [DONE]") == []
+        assert [e.data for e in decoder.flush()] == [b"[DONE]"]
+
+    def test_event_without_data_is_ignored(self):
+        assert SSEDecoder().feed(b"event: ping\n\n") == []
+
+
+class TestChatCompletionStream:
+    """Test cases for chunk parsing and timing."""
+
+    def test_malformed_chunk_raises(self):
+        stream = ChatCompletionStream([b"data: {not json}\n\n"])
+
+        with pytest.raises(StreamError):
+            list(stream)
+
+    def test_error_event_raises_api_error(self):
+        stream = ChatCompletionStream([b'event: error\ndata: {"error": {"message": "overloaded"}}\n\n'])
+
+        with pytest.raises(APIError, match="overloaded"):
+            list(stream)
+
+    def test_stats_track_inter_token_timing(self):
+        chunks = [b'data: {"n": %d}\n\n' % i for i in range(5)] + [b"data: [DONE]\n\n"]
+        stream = ChatCompletionStream(chunks)
+
+        assert [c["n"] for c in stream] == list(range(5))
+        stats = stream.stats.to_dict()
+        assert stats["chunks"] == 5
+        assert len(stream.stats.inter_token_times) == 4
+        assert stats["ttft"] >= 0
+
+    def test_json_backend_selection(self):
+        assert get_json_loads("json") is json.loads
+        with pytest.raises(ValueError):
+            get_json_loads("yaml")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
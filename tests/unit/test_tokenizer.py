@@ -0,0 +1,94 @@
+"""
+Unit tests for shared token counting
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from common.tokenizer import TOKENS_PER_MESSAGE, TOKENS_PER_REPLY, ApproxTokenizer, TokenCounter
+
+
+class SpyTokenizer(ApproxTokenizer):
+    def __init__(self):
+        self.batches = []
+
+    def count_batch(self, texts):
+        self.batches.append(list(texts))
+        return super().count_batch(texts)
+
+
+def counter_with_spy():
+    counter = TokenCounter(model_tokenizers={"m": ("approx", "approx")})
+    spy = SpyTokenizer()
+    counter._tokenizers[("approx", "approx")] = spy
+    return counter, spy
+
+
+class TestTokenCounter:
+    """Test cases for cached, batched token counting."""
+
+    def test_approximate_counts(self):
+        tokenizer = ApproxTokenizer()
+
+        assert tokenizer.count("") == 0
+        assert tokenizer.count("Hello, world!") == 4
+        assert tokenizer.count("internationalization") == 5
+        assert tokenizer.count("Hi") == 1
+
+    def test_batch_tokenizes_only_unique_misses(self):
+        counter, spy = counter_with_spy()
+
+        counts = counter.count_tokens("m", ["a b", "c", "a b"])
+        again = counter.count_tokens("m", ["c", "d e f"])
+
+        assert counts == [2, 1, 2]
+        assert again == [1, 3]
+        assert spy.batches == [["a b", "c"], ["d e f"]]
+        assert counter.stats()["hits"] == 1
+
+    def test_cache_is_per_model(self):
+        counter = TokenCounter(model_tokenizers={"a": ("approx", "approx"), "b": ("approx", "approx")})
+
+        counter.count("a", "same text")
+        counter.count("b", "same text")
+
+        assert counter.misses == 2
+
+    def test_lru_evicts_oldest(self):
+        counter, spy = counter_with_spy()
+        counter.cache_size = 2
+
+        counter.count_tokens("m", ["one", "two", "three"])
+        counter.count("m", "one")
+
+        assert spy.batches[-1] == ["one"]
+
+    def test_message_counts_include_overhead(self):
+        counter, _ = counter_with_spy()
+        messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hi"}]
+
+        total = counter.count_messages("m", messages)
+
+        assert total == 3 + 1 + 2 * TOKENS_PER_MESSAGE + TOKENS_PER_REPLY
+
+    def test_unavailable_tokenizer_falls_back(self):
+        counter = TokenCounter(model_tokenizers={"m": ("hf", "definitely/not-a-real-tokenizer")})
+
+        assert counter.count("m", "hello world") == 2
+        assert counter.stats()["fallbacks"] == ["hf:definitely/not-a-real-tokenizer"]
+
+    def test_preload_loads_every_configured_tokenizer(self):
+        counter = TokenCounter(model_tokenizers={"a": ("approx", "approx"), "b": ("approx", "approx")})
+
+        counter.preload()
+
+        assert counter.stats()["tokenizers"] == ["approx:approx", "tiktoken:cl100k_base"]
+        assert counter.stats()["misses"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+"""
+Unit tests for distributed tracing
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '../..')
+sys.path.insert(0, ROOT)
+for service in ("api-gateway", "inference-pool", "monitoring"):
+    sys.path.insert(0, os.path.join(ROOT, service, 'src'))
+
+from common.tracing import SpanContext, Tracer, current_span, exporter_from_env, extract, inject
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Collector:
+    def __init__(self):
+        self.spans = []
+
+    def __call__(self, spans):
+        self.spans.extend(spans)
+
+
+class TestPropagation:
+    """Test cases for trace context in headers and metadata."""
+
+    def test_traceparent_round_trip(self):
+        context = SpanContext("ab" * 16, "cd" * 8, True)
+        parsed = SpanContext.from_traceparent(context.to_traceparent())
+        assert (parsed.trace_id, parsed.span_id, parsed.sampled) == (context.trace_id, context.span_id, True)
+        for bad in (None, "", "00-xyz-abc-01", "00-" + "0" * 32 + "-" + "1" * 16 + "-01"):
+            assert SpanContext.from_traceparent(bad) is None
+
+    def test_headers_are_case_insensitive(self):
+        tracer = Tracer("svc", sample_rate=1.0, exporter=Collector())
+        with tracer.span("root") as span:
+            headers = {"Traceparent": inject({})["traceparent"]}
+        assert extract(headers).span_id == span.context.span_id
+        assert extract(None) is None
+
+    def test_children_inherit_trace_and_sampling(self):
+        collector = Collector()
+        tracer = Tracer("svc", sample_rate=1.0, exporter=collector)
+        with tracer.span("root") as root:
+            with tracer.span("child") as child:
+                assert current_span() is child
+            tracer.record("queue", root.start_time, 0.25)
+        assert current_span() is None
+        tracer.flush()
+        by_name = {s["name"]: s for s in collector.spans}
+        assert {s["trace_id"] for s in collector.spans} == {root.context.trace_id}
+        assert by_name["child"]["parent_id"] == root.context.span_id
+        assert by_name["queue"]["duration"] == 0.25
+        assert by_name["root"]["parent_id"] is None
+
+    def test_unsampled_traces_record_nothing_but_propagate(self):
+        collector = Collector()
+        tracer = Tracer("svc", sample_rate=0.0, exporter=collector)
+        with tracer.span("root", attr=1) as span:
+            carrier = inject({})
+        assert not span.recording and span.attributes == {}
+        assert carrier["traceparent"].endswith("-00")
+        # A sampled upstream decision is honoured even where this service would not sample.
+        upstream = SpanContext("ab" * 16, "cd" * 8, True)
+        with tracer.span("child", upstream):
+            pass
+        tracer.flush()
+        assert [s["name"] for s in collector.spans] == ["child"]
+
+    def test_without_exporter_the_decision_still_propagates(self):
+        tracer = Tracer("svc", sample_rate=1.0, exporter=None)
+        tracer.exporter = None
+        with tracer.span("root") as span:
+            assert not span.recording
+            assert inject({})["traceparent"].endswith("-01")
+        assert tracer.stats()["pending"] == 0
+
+    def test_errors_mark_the_span(self):
+        collector = Collector()
+        tracer = Tracer("svc", sample_rate=1.0, exporter=collector)
+        with pytest.raises(RuntimeError):
+            with tracer.span("boom"):
+                raise RuntimeError("bad")
+        tracer.flush()
+        assert collector.spans[0]["status"] == "error"
+        assert collector.spans[0]["attributes"]["error"] == "bad"
+
+
+class TestExport:
+    """Test cases for span exporters."""
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        tracer = Tracer("svc", sample_rate=1.0, exporter=exporter_from_env(f"file:{path}"))
+        with tracer.span("a"):
+            pass
+        tracer.close()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["a"]
+        assert exporter_from_env("") is None
+
+    def test_export_errors_are_counted(self):
+        def broken(spans):
+            raise OSError("collector down")
+
+        tracer = Tracer("svc", sample_rate=1.0, exporter=broken)
+        with tracer.span("a"):
+            pass
+        assert tracer.flush() == 0
+        assert tracer.stats()["export_errors"] == 1
+
+
+class TestEndToEnd:
+    """Test cases for a traced request through gateway, auth and inference."""
+
+    def test_request_trace_reaches_monitoring(self):
+        monitoring = load("monitoring_main", "monitoring/src/main.py").MonitoringService()
+        auth = load("auth_service_main", "auth-service/src/main.py").AuthService()
+        pool = load("inference_pool_main", "inference-pool/src/main.py").InferencePool()
+        gateway_module = load("api_gateway_main", "api-gateway/src/main.py")
+
+        for service in (auth, pool):
+            service.tracer = Tracer(service.tracer.service, sample_rate=0.0, exporter=monitoring.record_spans)
+        gateway = gateway_module.APIGateway(
+            inference_pool=pool,
+            tracer=Tracer("api-gateway", sample_rate=1.0, exporter=monitoring.record_spans),
+        )
+        auth.register_user("ana", "ana@example.com", "pw")
+        upstream = SpanContext("ab" * 16, "cd" * 8, True)
+        assert "access_token" in auth.login_user("ana", "pw", headers={"traceparent": upstream.to_traceparent()})
+
+        body = json.dumps({"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]})
+        payload, headers = gateway.chat_completions_http(body, {})
+        assert json.loads(payload)["choices"]
+        for tracer in (gateway.tracer, auth.tracer, pool.tracer):
+            tracer.flush()
+
+        trace_id = extract(headers).trace_id
+        spans = monitoring.get_trace(trace_id)["spans"]
+        names = {(s["service"], s["name"]) for s in spans}
+        assert {
+            ("api-gateway", "gateway.chat_completions"), ("api-gateway", "inference"),
+            ("inference-pool", "inference.generate_text"), ("inference-pool", "queue"),
+            ("inference-pool", "prefill"), ("inference-pool", "decode"),
+            ("api-gateway", "serialization"),
+        } <= names
+        ids = {s["span_id"] for s in spans}
+        assert all(s["parent_id"] in ids for s in spans if s["name"] != "gateway.chat_completions")
+        breakdown = monitoring.get_latency_breakdown("inference-pool")["spans"]
+        assert {row["name"] for row in breakdown} >= {"prefill", "decode"}
+
+        login = monitoring.get_trace(upstream.trace_id)["spans"]
+        assert [(s["service"], s["name"], s["parent_id"]) for s in login] == \
+            [("auth-service", "auth.login", upstream.span_id)]
+
+        for invalid in (json.dumps({"model": "gpt-4"}), "null", "[1]", "{"):
+            payload, headers = gateway.chat_completions_http(invalid)
+            assert "error" in json.loads(payload)
+            gateway.tracer.flush()
+            rejected = monitoring.get_trace(extract(headers).trace_id)["spans"]
+            root = next(s for s in rejected if s["name"] == "gateway.chat_completions")
+            assert root["status"] == "error"
+        gateway.shutdown()
+        monitoring.shutdown()
+
+    def test_inference_metadata_round_trip(self):
+        pool = load("inference_pool_main", "inference-pool/src/main.py").InferencePool()
+        upstream = SpanContext("ab" * 16, "cd" * 8, False)
+        result = pool.generate_text("gpt-4", "hi", metadata={"traceparent": upstream.to_traceparent()})
+        assert extract(result["metadata"]).trace_id == upstream.trace_id
+        final = list(pool.generate_text_stream("gpt-4", "hi", metadata={"traceparent": upstream.to_traceparent()}))[-1]
+        assert extract(final["metadata"]).trace_id == upstream.trace_id
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])